@@ -0,0 +1,118 @@
+"""
+Cold-start import time of the server module, with a budget check.
+
+stdio MCP clients start a fresh ``yokatlas-mcp`` process per session, so the
+time to import yokatlas_mcp_server is paid on every session start. Each run
+imports the module in a new interpreter with ``-X importtime`` and records:
+
+- wall time of the process, minus a bare interpreter start (``python -c pass``),
+- the cumulative import time of yokatlas_mcp_server reported by -X importtime,
+- whether modules that must load lazily (yokatlas_py, reportlab, numpy) were
+  imported anyway.
+
+The exit status is 1 if a lazy module was imported at startup or, with
+--budget-ms, if the median import time exceeds the budget.
+
+Run from the repository root:
+
+    python benchmarks/bench_import.py --runs 10 --budget-ms 1500
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_MODULE = "yokatlas_mcp_server"
+# Loaded on first use of the tools that need them, never at startup
+LAZY_MODULES = ("yokatlas_py", "reportlab", "numpy")
+
+_PROBE = (
+    f"import sys, json; import {_MODULE}; "
+    f"print(json.dumps([m for m in {LAZY_MODULES!r} if m in sys.modules]))"
+)
+
+
+def _run(args: list[str]) -> tuple[float, str, str]:
+    started = time.perf_counter()
+    proc = subprocess.run([sys.executable, *args], cwd=_ROOT, capture_output=True, text=True, check=True)
+    return time.perf_counter() - started, proc.stdout, proc.stderr
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int]]:
+    """Return (indented module name, cumulative microseconds) for each line of -X importtime output."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, total_us, name = line.split(":", 1)[1].split("|")
+        entries.append((name.rstrip(), int(total_us)))
+    return entries
+
+
+def measure(runs: int) -> dict:
+    """Import the server module in `runs` fresh interpreters and summarize."""
+    bare = [_run(["-c", "pass"])[0] for _ in range(max(3, runs // 2))]
+    walls, imports, loaded = [], [], set()
+    slowest: dict[str, list[int]] = {}
+    for _ in range(runs):
+        wall, stdout, stderr = _run(["-X", "importtime", "-c", _PROBE])
+        walls.append(wall)
+        loaded.update(json.loads(stdout.strip().splitlines()[-1]))
+        for name, total_us in parse_importtime(stderr):
+            if name == f" {_MODULE}":
+                imports.append(total_us / 1000)
+            # Direct imports of the server module are indented by three spaces
+            elif name.startswith("   ") and not name.startswith("    "):
+                slowest.setdefault(name.strip(), []).append(total_us)
+
+    interpreter_ms = statistics.median(bare) * 1000
+    return {
+        "python": sys.version.split()[0],
+        "runs": runs,
+        "interpreter_ms": round(interpreter_ms, 1),
+        "wall_ms": round(statistics.median(walls) * 1000, 1),
+        "startup_ms": round(statistics.median(walls) * 1000 - interpreter_ms, 1),
+        "import_ms": round(statistics.median(imports), 1),
+        "import_min_ms": round(min(imports), 1),
+        "slowest_imports_ms": {
+            name: round(statistics.median(samples) / 1000, 1)
+            for name, samples in sorted(slowest.items(), key=lambda item: -statistics.median(item[1]))[:10]
+        },
+        "eager_lazy_modules": sorted(loaded),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=10, help="Fresh interpreters to import the server in")
+    parser.add_argument("--budget-ms", type=float, help="Fail if the median import time exceeds this")
+    parser.add_argument("--output", help="Write results as JSON")
+    args = parser.parse_args()
+
+    result = measure(max(1, args.runs))
+    print(f"{_MODULE} import: median {result['import_ms']} ms (min {result['import_min_ms']} ms); "
+          f"process start {result['wall_ms']} ms, {result['startup_ms']} ms above a bare interpreter")
+    print("slowest direct imports (ms):")
+    for name, ms in result["slowest_imports_ms"].items():
+        print(f"  {name:<40} {ms:>8.1f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+    failures = []
+    if result["eager_lazy_modules"]:
+        failures.append(f"imported at startup: {', '.join(result['eager_lazy_modules'])}")
+    if args.budget_ms is not None and result["import_ms"] > args.budget_ms:
+        failures.append(f"median import {result['import_ms']} ms exceeds the {args.budget_ms:.0f} ms budget")
+    if failures:
+        sys.exit("; ".join(failures))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""
+Concurrent MCP load benchmark against an offline YOKATLAS stand-in.
+
+Sends a seeded, reproducible mix of tool calls to the server ``app`` over
+FastMCP's in-memory transport, with yokatlas-py replaced by
+benchmarks/fake_yokatlas.py (recorded or synthetic payloads replayed after
+a simulated latency). Program codes are drawn from a Zipf-like distribution,
+so popular programs are requested more often, as in real traffic.
+
+Calls are sent as raw tools/call requests: the MCP client SDK otherwise
+validates every structured result against the tool's JSON schema, which
+costs more CPU than the server itself and would dominate the numbers.
+
+Reports p50/p95/p99 latency per tool and overall, throughput and RSS. With
+--output the results are written as JSON; with --baseline they are compared
+against an earlier run, and the exit status is 1 if any latency grew (or
+throughput fell) by more than --max-regression.
+
+Run from the repository root:
+
+    python benchmarks/bench_load.py --requests 2000 --concurrency 32 --output base.json
+    python benchmarks/bench_load.py --requests 2000 --concurrency 32 --baseline base.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import sys
+import time
+from collections import defaultdict
+from typing import Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+_UNIVERSITIES = ["boğaziçi", "odtü", "itü", "hacettepe", "ege", "ankara"]
+_PROGRAMS = ["bilgisayar", "elektrik", "işletme", "tıp", "hukuk", "makine"]
+_DEFAULT_MIX = "atlas=5,search=3,trend=1,batch=1"
+
+
+def parse_mix(text: str) -> dict[str, int]:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in ("atlas", "search", "trend", "batch"):
+            raise argparse.ArgumentTypeError(f"Unknown scenario: {name}")
+        mix[name.strip()] = int(weight or 1)
+    return mix
+
+
+def build_calls(count: int, mix: dict[str, int], keys: int, skew: float, seed: int) -> list[tuple[str, dict]]:
+    """Generate the (tool, arguments) sequence for a run."""
+    rng = random.Random(seed)
+    codes = [str(102210000 + i) for i in range(keys)]
+    weights = [1 / (rank + 1) ** skew for rank in range(keys)]
+    scenarios = list(mix)
+    scenario_weights = [mix[name] for name in scenarios]
+
+    def code() -> str:
+        return rng.choices(codes, weights)[0]
+
+    calls = []
+    for _ in range(count):
+        scenario = rng.choices(scenarios, scenario_weights)[0]
+        if scenario == "atlas":
+            calls.append(("get_bachelor_degree_atlas_details", {"yop_kodu": code(), "year": rng.choice([2024, 2025])}))
+        elif scenario == "search":
+            calls.append(("search_bachelor_degree_programs", {
+                "university": rng.choice(_UNIVERSITIES), "program": rng.choice(_PROGRAMS), "results_limit": 50,
+            }))
+        elif scenario == "trend":
+            calls.append(("get_program_trend", {"yop_kodu": code(), "start_year": 2022, "end_year": 2025}))
+        else:
+            calls.append(("get_atlas_details_batch", {
+                "bachelor_codes": sorted({code() for _ in range(5)}), "years": [2025], "sections": ["genel_bilgiler"],
+            }))
+    return calls
+
+
+def percentiles(samples: list[float]) -> dict:
+    """Return count, mean and p50/p95/p99 in milliseconds."""
+    if not samples:
+        return {"count": 0}
+    ms = [s * 1000 for s in samples]
+    if len(ms) == 1:
+        p50 = p95 = p99 = ms[0]
+    else:
+        cuts = statistics.quantiles(ms, n=100, method="inclusive")
+        p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+    return {"count": len(ms), "mean_ms": round(statistics.fmean(ms), 3), "p50_ms": round(p50, 3),
+            "p95_ms": round(p95, 3), "p99_ms": round(p99, 3), "max_ms": round(max(ms), 3)}
+
+
+def rss_mib() -> dict:
+    """Current and peak resident set size of this process."""
+    peak_kib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        peak_kib //= 1024
+    current = None
+    try:
+        with open("/proc/self/statm") as f:
+            current = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except OSError:
+        pass
+    return {"current_mib": round(current, 1) if current is not None else None, "peak_mib": round(peak_kib / 1024, 1)}
+
+
+def _is_error(result) -> bool:
+    if result.isError:
+        return True
+    data = result.structuredContent
+    return isinstance(data, dict) and "error" in data
+
+
+async def call_tool(client, name: str, arguments: dict):
+    """tools/call without client-side output schema validation."""
+    from mcp import types
+
+    return await client.session.send_request(
+        types.ClientRequest(types.CallToolRequest(params=types.CallToolRequestParams(name=name, arguments=arguments))),
+        types.CallToolResult,
+    )
+
+
+async def run(args: argparse.Namespace) -> dict:
+    import yokatlas_mcp_server as server
+    from fastmcp import Client
+    from fake_yokatlas import FakeUpstream, load_payloads
+
+    upstream = FakeUpstream(args.latency_ms, args.jitter_ms, load_payloads(args.payloads), seed=args.seed)
+    upstream.install(server)
+
+    calls = build_calls(args.warmup + args.requests, parse_mix(args.mix), args.keys, args.skew, args.seed)
+    warmup, measured = calls[:args.warmup], calls[args.warmup:]
+    latencies: dict[str, list[float]] = defaultdict(list)
+    errors: dict[str, int] = defaultdict(int)
+    wall = 0.0
+
+    async with Client(server.app) as client:
+        async def worker(queue: list, record: bool) -> None:
+            while queue:
+                tool, arguments = queue.pop()
+                start = time.perf_counter()
+                result = await call_tool(client, tool, arguments)
+                elapsed = time.perf_counter() - start
+                if record:
+                    latencies[tool].append(elapsed)
+                    if _is_error(result):
+                        errors[tool] += 1
+
+        for queue, record in ((warmup[::-1], False), (measured[::-1], True)):
+            if not queue:
+                continue
+            started = time.perf_counter()
+            await asyncio.gather(*(worker(queue, record) for _ in range(args.concurrency)))
+            wall = time.perf_counter() - started
+
+    all_samples = [s for samples in latencies.values() for s in samples]
+    return {
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "baseline", "max_regression")},
+        "python": platform.python_version(),
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(len(all_samples) / wall, 2) if wall else 0.0,
+        "overall": percentiles(all_samples),
+        "tools": {tool: dict(percentiles(samples), errors=errors[tool]) for tool, samples in sorted(latencies.items())},
+        "upstream_calls": dict(upstream.calls),
+        "rss": rss_mib(),
+    }
+
+
+def compare(result: dict, baseline: dict, max_regression: float) -> list[str]:
+    """Print deltas against a baseline run and return the regressions found."""
+    regressions = []
+
+    def check(label: str, new: Optional[float], old: Optional[float], higher_is_worse: bool = True) -> None:
+        if not new or not old:
+            return
+        change = (new - old) / old
+        worse = change > max_regression if higher_is_worse else -change > max_regression
+        flag = "  REGRESSION" if worse else ""
+        print(f"  {label:<55} {old:>10.2f} -> {new:>10.2f} ({change:+.1%}){flag}")
+        if worse:
+            regressions.append(label)
+
+    print("\nAgainst baseline:")
+    check("throughput_rps", result["throughput_rps"], baseline.get("throughput_rps"), higher_is_worse=False)
+    for key in ("p50_ms", "p95_ms", "p99_ms"):
+        check(f"overall {key}", result["overall"].get(key), baseline.get("overall", {}).get(key))
+    for tool, stats in result["tools"].items():
+        old = baseline.get("tools", {}).get(tool, {})
+        for key in ("p50_ms", "p95_ms"):
+            check(f"{tool} {key}", stats.get(key), old.get(key))
+    check("rss peak_mib", result["rss"]["peak_mib"], baseline.get("rss", {}).get("peak_mib"))
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=1000, help="Measured tool calls")
+    parser.add_argument("--warmup", type=int, default=0, help="Unmeasured tool calls sent first")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients")
+    parser.add_argument("--mix", default=_DEFAULT_MIX, help=f"Scenario weights (default: {_DEFAULT_MIX})")
+    parser.add_argument("--keys", type=int, default=200, help="Distinct program codes")
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of program popularity (0 = uniform)")
+    parser.add_argument("--latency-ms", type=float, default=80.0, help="Simulated upstream latency")
+    parser.add_argument("--jitter-ms", type=float, default=40.0, help="Uniform extra upstream latency")
+    parser.add_argument("--payloads", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "payloads"),
+                        help="Directory of recorded payloads (synthetic payloads fill gaps)")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the response caches")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Write results as JSON")
+    parser.add_argument("--baseline", help="Compare against results JSON from an earlier run")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="Allowed relative slowdown vs. the baseline")
+    args = parser.parse_args()
+
+    # Server settings are read at import time. The fake upstream is local, so
+    # the YOKATLAS rate limit would only measure the limiter; lift it unless set.
+    os.environ.setdefault("YOKATLAS_MCP_RATE_LIMIT", "100000")
+    os.environ.setdefault("YOKATLAS_MCP_RATE_BURST", "100000")
+    # All simulated users share one in-process client, so lift the per-client quotas too
+    for name in ("CLIENT_RATE_LIMIT", "CLIENT_RATE_BURST", "CLIENT_CONCURRENCY", "CLIENT_QUEUE"):
+        os.environ.setdefault(f"YOKATLAS_MCP_{name}", "100000")
+    if args.no_cache:
+        for name in ("ATLAS_TTL_PAST_YEAR", "ATLAS_TTL_CURRENT_YEAR", "SEARCH_CACHE_TTL", "STALE_TTL"):
+            os.environ[f"YOKATLAS_MCP_{name}"] = "0"
+
+    result = asyncio.run(run(args))
+
+    print(f"{result['overall']['count']} calls in {result['wall_seconds']}s "
+          f"({result['throughput_rps']} calls/s, concurrency {args.concurrency})")
+    print(f"{'tool':<38} {'count':>6} {'errors':>6} {'p50_ms':>9} {'p95_ms':>9} {'p99_ms':>9}")
+    for tool, stats in list(result["tools"].items()) + [("overall", dict(result["overall"], errors=sum(t["errors"] for t in result["tools"].values())))]:
+        print(f"{tool:<38} {stats['count']:>6} {stats['errors']:>6} {stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f}")
+    print(f"upstream calls: {result['upstream_calls']}  rss: {result['rss']}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(result, baseline, args.max_regression)
+        if regressions:
+            sys.exit(f"\n{len(regressions)} regression(s) beyond {args.max_regression:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Search-result PDF rendering benchmark.
+
+Renders synthetic bachelor search results of increasing size and reports
+wall time and peak traced memory for three layouts:
+
+- legacy: one Table over every row (how reports were built originally)
+- chunked: page-sized Table chunks with shared styles (default layout)
+- plain: PlainRowsTable (high-volume layout)
+
+Run from the repository root:
+
+    python benchmarks/bench_pdf.py --rows 50 100 250 500 1000 2000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reportlab.lib import colors  # noqa: E402
+from reportlab.platypus import Table, TableStyle  # noqa: E402
+
+import yokatlas_pdf_generator as pdf  # noqa: E402
+
+_UNIVERSITIES = ["BOĞAZİÇİ ÜNİVERSİTESİ", "ORTA DOĞU TEKNİK ÜNİVERSİTESİ", "İSTANBUL TEKNİK ÜNİVERSİTESİ (İTÜ)"]
+_PROGRAMS = ["Bilgisayar Mühendisliği", "Elektrik-Elektronik Mühendisliği (İngilizce)", "İşletme"]
+
+
+def make_programs(count: int) -> list[dict]:
+    """Synthetic search records shaped like search_lisans_programs output."""
+    return [
+        {
+            "yop_kodu": str(100000000 + i),
+            "uni_adi": _UNIVERSITIES[i % len(_UNIVERSITIES)],
+            "program_adi": _PROGRAMS[i % len(_PROGRAMS)],
+            "sehir_adi": "İSTANBUL",
+            "puan_turu": "say",
+            "taban": {"2025": f"{500 - i * 0.1:.5f}"},
+            "tbs": {"2025": str(1000 + i * 37)},
+        }
+        for i in range(count)
+    ]
+
+
+def legacy_table(programs: list[dict]) -> list:
+    """Single Table over all rows with per-call styles, as before chunking."""
+    rows = [["Program Kodu", "Üniversite", "Program", "Şehir", "Puan Türü", "Taban Puanı", "Başarı Sırası"]]
+    rows += pdf._search_rows(programs, "bachelor_search")
+    table = Table(rows, repeatRows=1)
+    table.setStyle(TableStyle([
+        ("BACKGROUND", (0, 0), (-1, 0), colors.lightblue),
+        ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+        ("BOTTOMPADDING", (0, 0), (-1, 0), 12),
+        ("GRID", (0, 0), (-1, -1), 1, colors.black),
+        ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.white, colors.lightgrey]),
+    ]))
+    return [table]
+
+
+def render(layout: str, programs: list[dict], path: str) -> None:
+    data = {"programs": programs}
+    if layout == "legacy":
+        original = pdf._search_table
+        pdf._search_table = lambda programs, report_type, high_volume: legacy_table(programs)
+        try:
+            pdf.render_pdf(data, "bachelor_search", path)
+        finally:
+            pdf._search_table = original
+    else:
+        pdf.render_pdf(data, "bachelor_search", path, high_volume=(layout == "plain"))
+
+
+def measure(layout: str, programs: list[dict], path: str, repeat: int) -> tuple[float, float]:
+    """Return (best wall time in ms, peak traced memory in MiB)."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        render(layout, programs, path)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    render(layout, programs, path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best * 1000, peak / (1024 * 1024)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=[50, 100, 250, 500, 1000, 2000])
+    parser.add_argument("--layouts", nargs="+", default=["legacy", "chunked", "plain"])
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per point (best is reported)")
+    args = parser.parse_args()
+
+    # Warm up imports, font metrics and the cached styles
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.pdf")
+        render("chunked", make_programs(10), path)
+
+        print(f"{'rows':>6} {'layout':>8} {'time_ms':>10} {'peak_mib':>9} {'size_kib':>9}")
+        for count in args.rows:
+            programs = make_programs(count)
+            for layout in args.layouts:
+                elapsed, peak = measure(layout, programs, path, args.repeat)
+                size = os.path.getsize(path) / 1024
+                print(f"{count:>6} {layout:>8} {elapsed:>10.1f} {peak:>9.2f} {size:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Tool scheduler admission benchmark and behaviour checks.
+
+Measures the overhead of ToolScheduler.acquire()/release() per call with
+many concurrent clients, and checks the admission rules the server relies on:
+
+- idle-slot: a client under its concurrency cap is admitted at once while
+  another client's calls wait only on that client's own cap,
+- priority: when slots free up, queued interactive calls run before bulk ones,
+- displacement: with the queue full, a higher-priority call displaces a
+  queued bulk call.
+
+The exit status is 1 if a check fails.
+
+Run from the repository root:
+
+    python benchmarks/bench_scheduler.py --calls 20000 --clients 50 --concurrency 32 --queue 128
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from yokatlas_scheduler import (  # noqa: E402
+    PRIORITY_BULK, PRIORITY_INTERACTIVE, PRIORITY_NORMAL, Overloaded, ToolScheduler,
+)
+
+
+def _scheduler(**overrides) -> ToolScheduler:
+    settings = dict(max_concurrency=4, max_queue=16, client_concurrency=4, client_queue=16,
+                    client_rate=1e6, client_burst=1e6, max_wait=2.0)
+    settings.update(overrides)
+    return ToolScheduler(**settings)
+
+
+async def check_idle_slot() -> str:
+    """A call must not wait behind queued calls of a client that is at its own cap."""
+    scheduler = _scheduler(client_concurrency=1)
+    await scheduler.acquire("a")
+    queued = asyncio.create_task(scheduler.acquire("a"))
+    await asyncio.sleep(0)
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(scheduler.acquire("b"), 0.5)
+    except (asyncio.TimeoutError, Overloaded):
+        queued.cancel()
+        return "client b waited although 3 of 4 slots were free"
+    waited = time.perf_counter() - started
+    scheduler.release("b")
+    scheduler.release("a")
+    await queued
+    scheduler.release("a")
+    return "" if waited < 0.1 else f"client b waited {waited:.2f}s for a free slot"
+
+
+async def check_priority() -> str:
+    """Queued calls run in priority order once slots free up."""
+    scheduler = _scheduler(max_concurrency=1)
+    order = []
+
+    async def call(name: str, priority: int) -> None:
+        async with scheduler.slot(name, priority):
+            order.append(name)
+            await asyncio.sleep(0.01)
+
+    await scheduler.acquire("holder")
+    tasks = [asyncio.create_task(call(name, priority)) for name, priority in
+             (("bulk", PRIORITY_BULK), ("normal", PRIORITY_NORMAL), ("interactive", PRIORITY_INTERACTIVE))]
+    await asyncio.sleep(0)
+    scheduler.release("holder")
+    await asyncio.gather(*tasks)
+    return "" if order == ["interactive", "normal", "bulk"] else f"ran in order {order}"
+
+
+async def check_displacement() -> str:
+    """With the queue full, a higher-priority call displaces a queued bulk call."""
+    scheduler = _scheduler(max_concurrency=1, max_queue=1)
+    await scheduler.acquire("holder")
+    bulk = asyncio.create_task(scheduler.acquire("bulk", PRIORITY_BULK))
+    await asyncio.sleep(0)
+    interactive = asyncio.create_task(scheduler.acquire("interactive", PRIORITY_INTERACTIVE))
+    await asyncio.sleep(0)
+    scheduler.release("holder")
+    results = await asyncio.gather(bulk, interactive, return_exceptions=True)
+    if not isinstance(results[0], Overloaded) or results[1] is not None:
+        return f"expected the bulk call to be displaced, got {results}"
+    scheduler.release("interactive")
+    return ""
+
+
+async def measure(calls: int, clients: int, concurrency: int, queue: int) -> dict:
+    """Push `calls` zero-work tool calls from `clients` clients through one scheduler."""
+    scheduler = _scheduler(max_concurrency=concurrency, max_queue=queue, client_queue=queue,
+                           client_concurrency=max(1, concurrency // 4), max_wait=60.0)
+    # Like a loaded server: every slot busy and the queue full, but never beyond
+    callers = asyncio.Semaphore(concurrency + queue)
+
+    async def call(i: int) -> None:
+        async with callers:
+            async with scheduler.slot(f"client-{i % clients}", i % 3):
+                await asyncio.sleep(0)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(call(i) for i in range(calls)))
+    elapsed = time.perf_counter() - started
+    stats = scheduler.stats()
+    return {
+        "calls": calls,
+        "seconds": round(elapsed, 3),
+        "us_per_call": round(elapsed / calls * 1e6, 1),
+        "waited": stats["waited"],
+        "shed": sum(stats["shed"].values()),
+    }
+
+
+async def run(args: argparse.Namespace) -> list[str]:
+    failures = []
+    for check in (check_idle_slot, check_priority, check_displacement):
+        problem = await check()
+        print(f"{check.__name__:<20} {'FAIL: ' + problem if problem else 'ok'}")
+        if problem:
+            failures.append(f"{check.__name__}: {problem}")
+
+    result = await measure(args.calls, args.clients, args.concurrency, args.queue)
+    print(f"{result['calls']} calls from {args.clients} clients in {result['seconds']}s "
+          f"({result['us_per_call']} us/call, {result['waited']} queued, {result['shed']} shed)")
+    if result["shed"]:
+        failures.append(f"{result['shed']} calls shed without overload")
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=20000, help="Tool calls to push through the scheduler")
+    parser.add_argument("--clients", type=int, default=50, help="Distinct clients issuing them")
+    parser.add_argument("--concurrency", type=int, default=32, help="Scheduler slots (TOOL_CONCURRENCY)")
+    parser.add_argument("--queue", type=int, default=128, help="Scheduler queue length (TOOL_QUEUE)")
+    args = parser.parse_args()
+
+    failures = asyncio.run(run(args))
+    if failures:
+        sys.exit("; ".join(failures))
+
+
+if __name__ == "__main__":
+    main()
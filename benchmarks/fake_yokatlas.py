@@ -0,0 +1,244 @@
+"""
+Offline stand-in for YOKATLAS used by the load benchmark.
+
+Replaces yokatlas-py's search functions and atlas classes inside the server
+module with fakes that replay recorded payloads after a configurable
+latency (plus uniform jitter), so server-side performance can be measured
+without network access. Payloads recorded from the live site with
+
+    python benchmarks/fake_yokatlas.py --output benchmarks/payloads --yop 102210277
+
+are used when present; otherwise synthetic payloads shaped like yokatlas-py
+output are generated. Replayed payloads are re-keyed to the requested YÖP
+code, so every code gets a distinct (but equally sized) response.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from typing import Optional
+
+_PAYLOAD_FILES = {
+    "search_bachelor": "search_bachelor.json",
+    "search_associate": "search_associate.json",
+    "atlas_bachelor": "atlas_bachelor.json",
+    "atlas_associate": "atlas_associate.json",
+}
+
+_UNIVERSITIES = ["BOĞAZİÇİ ÜNİVERSİTESİ", "ORTA DOĞU TEKNİK ÜNİVERSİTESİ", "İSTANBUL TEKNİK ÜNİVERSİTESİ (İTÜ)",
+                 "ANKARA ÜNİVERSİTESİ", "EGE ÜNİVERSİTESİ", "HACETTEPE ÜNİVERSİTESİ"]
+_PROGRAMS = ["Bilgisayar Mühendisliği", "Elektrik-Elektronik Mühendisliği (İngilizce)", "İşletme", "Tıp", "Hukuk"]
+_CITIES = ["İSTANBUL", "ANKARA", "İZMİR"]
+
+
+def synthetic_search(count: int = 50, program_type: str = "bachelor") -> list[dict]:
+    """Search records shaped like search_lisans_programs / search_onlisans_programs output."""
+    base = 100000000 if program_type == "bachelor" else 200000000
+    return [
+        {
+            "yop_kodu": str(base + i),
+            "uni_adi": _UNIVERSITIES[i % len(_UNIVERSITIES)],
+            "program_adi": _PROGRAMS[i % len(_PROGRAMS)],
+            "fakulte": "Mühendislik Fakültesi",
+            "sehir_adi": _CITIES[i % len(_CITIES)],
+            "universite_turu": "Devlet",
+            "ucret_burs": "Ücretsiz",
+            "ogretim_turu": "Örgün",
+            "puan_turu": "say",
+            "kontenjan": {"2025": "80+2", "2024": "80+2", "2023": "75+2"},
+            "yerlesen": {"2025": "82", "2024": "82", "2023": "77"},
+            "taban": {year: f"{500 - i * 0.7 - offset:.5f}" for offset, year in enumerate(("2025", "2024", "2023"))},
+            "tbs": {year: str(1000 + i * 137 + offset * 50) for offset, year in enumerate(("2025", "2024", "2023"))},
+        }
+        for i in range(count)
+    ]
+
+
+def _rows(count: int, **columns) -> list[dict]:
+    return [{key: value.format(i=i) for key, value in columns.items()} for i in range(count)]
+
+
+def synthetic_atlas(program_type: str = "bachelor") -> dict:
+    """An atlas payload shaped like fetch_all_details() output (about 30 KB of JSON)."""
+    genel = {
+        "program_info": {"ÖSYM Program Kodu": "102210277", "Üniversite": _UNIVERSITIES[0], "Fakülte / Yüksekokul": "Mühendislik Fakültesi",
+                         "Puan Türü": "SAY", "Burs Türü": "Ücretsiz", "Program": _PROGRAMS[0]},
+        "kontenjan_info": {"Genel Kontenjan": "80", "Okul Birincisi Kontenjanı": "2", "Toplam Kontenjan": "82",
+                           "Genel Kontenjana Yerleşen": "80", "Toplam Yerleşen": "82"},
+        "puan_info": {"0,12 Katsayı ile Yerleşen Son Kişinin Puanı": "512,34567", "0,12 Katsayı ile Yerleşen Son Kişinin Başarı Sırası": "1.234"},
+    }
+    girdi = {
+        "genel_bilgiler": genel,
+        "kontenjan_yerlesme": _rows(6, **{"Kontenjan Türü": "Tür {i}", "Kontenjan": "{i}0", "Yerleşen": "{i}0"}),
+        "cinsiyet_dagilimi": _rows(2, **{"Cinsiyet": "C{i}", "Sayı": "4{i}", "Oran": "%5{i},0"}),
+        "sehir_dagilimi": _rows(40, **{"İl": "İL {i}", "Sayı": "{i}", "Oran": "%{i},5"}),
+        "cografi_bolge_dagilimi": _rows(7, **{"Bölge": "Bölge {i}", "Sayı": "{i}", "Oran": "%{i},1"}),
+        "yerlesen_il_dagilimi": _rows(40, **{"İl": "İL {i}", "Sayı": "{i}", "Oran": "%{i},2"}),
+        "yerlesen_il_toplam": {"Sayı": "82"},
+        "ogrenim_durumu": _rows(4, **{"Öğrenim Durumu": "Durum {i}", "Sayı": "{i}"}),
+        "ogrenim_durumu_toplam": {"Sayı": "82"},
+        "mezuniyet_yili_dagilimi": _rows(6, **{"Mezuniyet Yılı": "202{i}", "Sayı": "{i}"}),
+        "mezuniyet_yili_toplam": {"Sayı": "82"},
+        "lise_alani_dagilimi": _rows(5, **{"Alan": "Alan {i}", "Sayı": "{i}"}),
+        "lise_alani_toplam": {"Sayı": "82"},
+        "lise_grubu_ve_tipi_dagilimi": _rows(10, **{"Lise Grubu": "Grup {i}", "Sayı": "{i}"}),
+        "lise_bazinda_yerlesen_dagilimi": _rows(60, **{"Lise": "LİSE {i}", "Toplam": "{i}", "Yeni Mezun": "{i}"}),
+        "okul_birincisi_yerlesen": _rows(2, **{"Lise": "LİSE {i}"}),
+        "taban_puan_ve_basari_sirasi_istatistikleri": {
+            "son_kisi_puan_bilgileri": [{"Kontenjan Türü": "Genel Kontenjan", "Kontenjan": "80", "Yerleşen Sayısı": "80",
+                                         "0,12 Katsayı ile": "512,34567", "0,06 Katsayı ile": "498,1"}],
+            "son_kisi_basari_sirasi_bilgileri": [{"Kontenjan Türü": "Genel Kontenjan", "0,12 Katsayı ile": "1.234", "0,06 Katsayı ile": "1.456"}],
+        },
+        "yerlesen_son_kisi_bilgileri": {"OBP": "95,1", "Puan": "512,34567"},
+        "yerlesen_ortalama_netler": _rows(8, **{"Test": "Test {i}", "Ortalama Net": "3{i},5"}),
+        "yerlesen_puan_bilgileri": _rows(4, **{"Puan": "Puan {i}", "Değer": "50{i},1"}),
+        "yerlesen_basari_siralari": _rows(4, **{"Sıra": "Sıra {i}", "Değer": "1.{i}00"}),
+        "tercih_istatistikleri": _rows(10, **{"Tercih Sırası": "{i}", "Sayı": "{i}0"}),
+        "yerlesen_tercih_istatistikleri": _rows(24, **{"Tercih Sırası": "{i}", "Sayı": "{i}"}),
+        "tercih_kullanma_oranlari": _rows(3, **{"Tür": "Tür {i}", "Oran": "%{i}0"}),
+        "tercih_edilen_universite_turleri": _rows(3, **{"Tür": "Tür {i}", "Sayı": "{i}00"}),
+        "tercih_edilen_universiteler": _rows(50, **{"Üniversite": "ÜNİVERSİTE {i}", "Sayı": "{i}"}),
+        "tercih_edilen_iller": _rows(40, **{"İl": "İL {i}", "Sayı": "{i}"}),
+        "tercih_edilen_program_turleri": _rows(20, **{"Program": "PROGRAM {i}", "Sayı": "{i}"}),
+        "tercih_edilen_programlar": _rows(60, **{"Program": "PROGRAM {i}", "Üniversite": "ÜNİVERSİTE {i}", "Sayı": "{i}"}),
+    }
+    surec = {
+        "akademisyen_sayilari": _rows(4, **{"Unvan": "Unvan {i}", "Sayı": "{i}"}),
+        "kayitli_ogrenci_cinsiyet_dagilimi": _rows(2, **{"Cinsiyet": "C{i}", "Sayı": "{i}00"}),
+        "mezuniyet_yili_cinsiyet_dagilimi": _rows(6, **{"Yıl": "202{i}", "Sayı": "{i}0"}),
+        "degisim_programi_bilgileri": _rows(3, **{"Program": "Değişim {i}", "Giden": "{i}", "Gelen": "{i}"}),
+        "yatay_gecis_bilgileri": _rows(3, **{"Tür": "Yatay {i}", "Gelen": "{i}", "Giden": "{i}"}),
+    }
+    if program_type == "associate_degree":
+        girdi.pop("yerlesen_puan_bilgileri")
+        girdi.pop("yerlesen_basari_siralari")
+    return {"girdi_gostergeleri": girdi, "surec_ve_cikti_gostergeleri": surec}
+
+
+def load_payloads(directory: Optional[str]) -> dict:
+    """Load recorded payloads from directory, filling gaps with synthetic ones."""
+    payloads = {
+        "search_bachelor": synthetic_search(program_type="bachelor"),
+        "search_associate": synthetic_search(program_type="associate_degree"),
+        "atlas_bachelor": synthetic_atlas("bachelor"),
+        "atlas_associate": synthetic_atlas("associate_degree"),
+    }
+    if directory:
+        for name, filename in _PAYLOAD_FILES.items():
+            path = os.path.join(directory, filename)
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as f:
+                    payloads[name] = json.load(f)
+    return payloads
+
+
+class FakeUpstream:
+    """
+    Replays payloads with simulated latency and counts calls.
+
+    Args:
+        latency_ms: Base latency of one upstream round trip
+        jitter_ms: Uniform extra latency in [0, jitter_ms]
+        payloads: Output of load_payloads()
+        seed: Seed for the jitter generator
+    """
+
+    def __init__(self, latency_ms: float, jitter_ms: float, payloads: dict, seed: int = 0):
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.payloads = payloads
+        self._random = random.Random(seed)
+        self.calls = {"search": 0, "atlas": 0}
+
+    def _delay(self) -> float:
+        return self.latency + self._random.uniform(0, self.jitter)
+
+    def search_function(self, program_type: str):
+        # Payloads are kept serialized so every call returns fresh objects cheaply
+        records = json.dumps(self.payloads["search_bachelor" if program_type == "bachelor" else "search_associate"])
+
+        def search(params: dict, smart_search: bool = True) -> list:
+            # Blocking, like yokatlas-py: runs on the server's search worker pool
+            self.calls["search"] += 1
+            time.sleep(self._delay())
+            return json.loads(records)[:params.get("length", 50)]
+
+        return search
+
+    def atlas_class(self, program_type: str) -> type:
+        upstream = self
+        template = json.dumps(self.payloads["atlas_bachelor" if program_type == "bachelor" else "atlas_associate"])
+
+        class FakeAtlas:
+            def __init__(self, params: dict, keys="all"):
+                self.program_id = params["program_id"]
+                self.keys = keys
+
+            async def fetch_all_details(self) -> dict:
+                # Sections are fetched concurrently upstream, so one round trip of latency
+                upstream.calls["atlas"] += 1
+                await asyncio.sleep(upstream._delay())
+                payload = json.loads(template)
+                if self.keys != "all":
+                    wanted = set(self.keys)
+                    for group in payload.values():
+                        if isinstance(group, dict):
+                            for key in group:
+                                if key not in wanted:
+                                    group[key] = None
+                genel = payload["girdi_gostergeleri"].get("genel_bilgiler")
+                if isinstance(genel, dict) and isinstance(genel.get("program_info"), dict):
+                    genel["program_info"]["ÖSYM Program Kodu"] = self.program_id
+                return payload
+
+        FakeAtlas.__name__ = f"Fake{program_type.title().replace('_', '')}Atlas"
+        return FakeAtlas
+
+    def install(self, server) -> None:
+        """Replace the upstream entry points used by the server module."""
+        server.search_lisans_programs = self.search_function("bachelor")
+        server.search_onlisans_programs = self.search_function("associate_degree")
+        server.YOKATLASLisansAtlasi = self.atlas_class("bachelor")
+        server.YOKATLASOnlisansAtlasi = self.atlas_class("associate_degree")
+        server._ATLAS_CLASSES["bachelor"] = server.YOKATLASLisansAtlasi
+        server._ATLAS_CLASSES["associate_degree"] = server.YOKATLASOnlisansAtlasi
+
+
+def record(output: str, bachelor_code: str, associate_code: Optional[str], year: int) -> None:
+    """Fetch one live payload of each kind with yokatlas-py and save it for replay (needs network)."""
+    from yokatlas_py import YOKATLASLisansAtlasi, YOKATLASOnlisansAtlasi, search_lisans_programs, search_onlisans_programs
+
+    os.makedirs(output, exist_ok=True)
+    payloads = {
+        "search_bachelor": search_lisans_programs({"program": "bilgisayar", "length": 50}, smart_search=True),
+        "search_associate": search_onlisans_programs({"program": "bilgisayar", "length": 50}, smart_search=True),
+        "atlas_bachelor": asyncio.run(YOKATLASLisansAtlasi({"program_id": bachelor_code, "year": year}).fetch_all_details()),
+    }
+    if associate_code:
+        payloads["atlas_associate"] = asyncio.run(YOKATLASOnlisansAtlasi({"program_id": associate_code, "year": year}).fetch_all_details())
+    for name, payload in payloads.items():
+        path = os.path.join(output, _PAYLOAD_FILES[name])
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False)
+        print(f"wrote {path} ({os.path.getsize(path) / 1024:.1f} KiB)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Record YOKATLAS payloads for benchmarks/bench_load.py")
+    parser.add_argument("--output", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "payloads"))
+    parser.add_argument("--yop", default="102210277", help="Bachelor program YÖP code to record")
+    parser.add_argument("--associate-yop", default=None, help="Associate degree program YÖP code to record")
+    parser.add_argument("--year", type=int, default=2025)
+    args = parser.parse_args()
+    try:
+        record(args.output, args.yop, args.associate_yop, args.year)
+    except Exception as e:
+        sys.exit(f"Recording failed: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+"""
+YOKATLAS MCP Server - In-process response caches
+
+YOKATLAS data for a given year changes rarely, while agents ask for the same
+popular programs over and over. The caches here keep recent responses in
+memory with a size cap and per-entry TTL, and coalesce concurrent identical
+requests so they share a single upstream fetch.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Optional, Union
+
+from yokatlas_text import fold_turkish
+
+__all__ = ["TTLCache", "SearchResultCache", "search_cache_key"]
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    LRU cache with per-entry expiry and request coalescing.
+
+    Expired entries are kept for another ``stale_ttl`` seconds (until LRU
+    eviction pushes them out) so get_stale() can still serve them while
+    the upstream is unavailable.
+
+    Args:
+        max_entries: Maximum number of entries kept; least recently used
+            entries are evicted first
+        name: Name used in statistics output
+        stale_ttl: Seconds an expired entry remains available to get_stale()
+    """
+
+    def __init__(self, max_entries: int, name: str = "cache", stale_ttl: float = 0):
+        self.max_entries = max(1, max_entries)
+        self.name = name
+        self.stale_ttl = max(0.0, stale_ttl)
+        self._entries: OrderedDict[Hashable, tuple[Any, float]] = OrderedDict()
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.coalesced = 0
+        self.stale_hits = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Return a cached value, or default if it is missing or expired.
+
+        Args:
+            key: Cache key
+            default: Value returned on a miss
+
+        Returns:
+            The cached value or default
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+
+        value, expires_at = entry
+        now = time.monotonic()
+        if expires_at <= now:
+            if expires_at + self.stale_ttl <= now:
+                del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return default
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def peek(self, key: Hashable, default: Any = None, stale: bool = False) -> Any:
+        """
+        Return a cached value without touching LRU order or hit/miss counters.
+
+        Only live entries are returned unless stale is True, which also
+        returns expired entries within the stale window.
+        """
+        entry = self._entries.get(key)
+        if entry is None or entry[1] + (self.stale_ttl if stale else 0) <= time.monotonic():
+            return default
+        return entry[0]
+
+    def expires_in(self, key: Hashable) -> Optional[float]:
+        """Seconds until an entry expires (negative once expired), or None if it is not cached."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        return entry[1] - time.monotonic()
+
+    def get_stale(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Return a cached value even if it has expired, as long as it is within stale_ttl.
+
+        Args:
+            key: Cache key
+            default: Value returned if there is no usable entry
+
+        Returns:
+            The cached value or default
+        """
+        entry = self._entries.get(key)
+        if entry is None or entry[1] + self.stale_ttl <= time.monotonic():
+            return default
+        self.stale_hits += 1
+        return entry[0]
+
+    def set(self, key: Hashable, value: Any, ttl: float) -> None:
+        """
+        Store a value for ttl seconds, evicting the oldest entries if full.
+
+        Args:
+            key: Cache key
+            value: Value to store
+            ttl: Time to live in seconds; values <= 0 are not stored
+        """
+        if ttl <= 0:
+            return
+
+        self._entries[key] = (value, time.monotonic() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop all entries (counters are kept)."""
+        self._entries.clear()
+
+    async def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: Union[float, Callable[[Any], float]]
+    ) -> Any:
+        """
+        Return a cached value or load it, sharing one load between concurrent callers.
+
+        Args:
+            key: Cache key
+            loader: Coroutine factory that fetches the value on a miss
+            ttl: Time to live in seconds, or a callable computing it from the
+                loaded value (return 0 to skip caching, e.g. for error payloads)
+
+        Returns:
+            The cached or freshly loaded value
+        """
+        while True:
+            value = self.get(key, _MISSING)
+            if value is not _MISSING:
+                return value
+
+            pending = self._inflight.get(key)
+            if pending is None:
+                break
+
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # The leading request was cancelled; retry unless we were too
+                task = asyncio.current_task()
+                if not pending.cancelled() or (task is not None and task.cancelling()):
+                    raise
+
+        return await self._load(key, loader, ttl)
+
+    async def refresh(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: Union[float, Callable[[Any], float]]
+    ) -> Any:
+        """
+        Load a value even if a live entry exists, replacing it.
+
+        Joins a load already in flight for the key instead of starting another.
+
+        Args:
+            key: Cache key
+            loader: Coroutine factory that fetches the value
+            ttl: Time to live, as for get_or_load()
+
+        Returns:
+            The freshly loaded value
+        """
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            return await asyncio.shield(pending)
+        return await self._load(key, loader, ttl)
+
+    async def _load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: Union[float, Callable[[Any], float]]
+    ) -> Any:
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await loader()
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                # Mark as retrieved so unawaited futures do not log warnings
+                future.exception()
+            raise
+        else:
+            self.set(key, value, ttl(value) if callable(ttl) else ttl)
+            future.set_result(value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> dict:
+        """Return size and hit/miss/eviction counters."""
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "coalesced": self.coalesced,
+            "stale_hits": self.stale_hits,
+            "in_flight": len(self._inflight),
+        }
+
+
+def search_cache_key(program_type: str, params: dict) -> tuple:
+    """
+    Build a canonical cache key for a search.
+
+    String values are Turkish-case/accent folded and keys are sorted, so
+    equivalent queries ("boğaziçi" vs "BOGAZICI") share an entry. The
+    ``length`` parameter is left out; the cache handles limits by slicing.
+
+    Args:
+        program_type: Type of program ('bachelor' or 'associate_degree')
+        params: Parameters from _build_search_params
+
+    Returns:
+        Hashable cache key
+    """
+    items = tuple(sorted(
+        (key, fold_turkish(value) if isinstance(value, str) else value)
+        for key, value in params.items()
+        if key != "length"
+    ))
+    return (program_type,) + items
+
+
+class SearchResultCache:
+    """
+    Cache of search result lists that serves smaller limits by slicing.
+
+    Each entry remembers the ``length`` it was fetched with. A request for
+    at most that many results is served from the entry; so is any request
+    when the upstream returned fewer rows than asked for, since that means
+    the entry already holds the complete result set.
+
+    Args:
+        max_entries: Maximum number of cached queries
+        ttl: Time to live in seconds for each entry
+        name: Name used in statistics output
+        stale_ttl: Seconds an expired entry remains available to lookup_stale()
+    """
+
+    def __init__(self, max_entries: int, ttl: float, name: str = "search_results", stale_ttl: float = 0):
+        self.ttl = ttl
+        self._cache = TTLCache(max_entries, name=name, stale_ttl=stale_ttl)
+        self.hits = 0
+        self.slice_hits = 0
+        self.misses = 0
+
+    def lookup(self, key: tuple, limit: int) -> Optional[list]:
+        """
+        Return up to limit cached results, or None if the cache cannot answer.
+
+        Args:
+            key: Key from search_cache_key
+            limit: Requested number of results
+
+        Returns:
+            List of results or None on a miss
+        """
+        entry = self._cache.get(key)
+        if entry is not None:
+            results, fetched_limit = entry
+            if limit <= fetched_limit or len(results) < fetched_limit:
+                self.hits += 1
+                if limit < len(results):
+                    self.slice_hits += 1
+                return results[:limit]
+        self.misses += 1
+        return None
+
+    def expires_in(self, key: tuple) -> Optional[float]:
+        """Seconds until a query's entry expires (negative once expired), or None if it is not cached."""
+        return self._cache.expires_in(key)
+
+    def fetched_limit(self, key: tuple) -> Optional[int]:
+        """The ``length`` a query's entry (live or stale) was fetched with, or None."""
+        entry = self._cache.peek(key, stale=True)
+        return entry[1] if entry is not None else None
+
+    def lookup_stale(self, key: tuple, limit: int) -> Optional[list]:
+        """Like lookup(), but also serves expired entries within the stale window."""
+        entry = self._cache.get_stale(key)
+        if entry is not None:
+            results, fetched_limit = entry
+            if limit <= fetched_limit or len(results) < fetched_limit:
+                return results[:limit]
+        return None
+
+    def store(self, key: tuple, limit: int, results: list) -> None:
+        """
+        Remember the results fetched for a query with the given limit.
+
+        An existing entry fetched with a larger limit is kept.
+
+        Args:
+            key: Key from search_cache_key
+            limit: The ``length`` the results were fetched with
+            results: Result list returned by the upstream
+        """
+        # peek(): a write must not count as a lookup in the hit/miss statistics
+        entry = self._cache.peek(key)
+        if entry is not None and entry[1] > limit:
+            return
+        self._cache.set(key, (results, limit), self.ttl)
+
+    def stats(self) -> dict:
+        """Return hit/miss counters, including hits served by slicing a larger entry."""
+        lookups = self.hits + self.misses
+        inner = self._cache.stats()
+        return {
+            "name": inner["name"],
+            "size": inner["size"],
+            "max_entries": inner["max_entries"],
+            "hits": self.hits,
+            "slice_hits": self.slice_hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": inner["evictions"],
+            "expirations": inner["expirations"],
+            "stale_hits": inner["stale_hits"],
+        }
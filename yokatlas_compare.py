@@ -0,0 +1,206 @@
+"""
+YOKATLAS MCP Server - Server-side program comparison
+
+Comparing a handful of programs means fetching each one's yearly statistics
+and then working out fill rates, score changes and relative ranks. Done in
+the agent's context that is slow and error-prone. compare_programs() lays the
+per-year metrics from yokatlas_trends.extract_year_metrics() out as
+(program x year) NumPy arrays and derives everything in one vectorized pass:
+
+- fill rate (doluluk oranı): placed / quota in the latest year with data,
+- year-over-year and first-to-last changes of base score and success rank,
+- success rank percentile within the same score type (puan türü) and year,
+  against the whole catalog when the offline index has that year's ranks,
+  else among the compared programs.
+"""
+
+from typing import Any, Optional, Sequence
+
+import numpy as np
+
+from yokatlas_trends import TREND_METRICS
+
+__all__ = ["compare_programs", "catalog_rank_pools", "rank_percentiles", "COMPARE_METRICS"]
+
+# Sortable columns of a comparison row
+COMPARE_METRICS = ("fill_rate", "base_score", "success_rank", "rank_percentile",
+                   "base_score_change", "success_rank_change", "quota", "placed")
+
+_INTEGER_METRICS = {"quota", "placed", "success_rank", "success_rank_change"}
+_DIGITS = {"fill_rate": 4, "base_score": 5, "base_score_change": 5, "rank_percentile": 1}
+
+
+def _value(value: float, metric: str) -> Any:
+    if np.isnan(value):
+        return None
+    if metric in _INTEGER_METRICS:
+        return int(value)
+    return round(float(value), _DIGITS.get(metric, 5))
+
+
+def _last_present(present: np.ndarray) -> np.ndarray:
+    """Per row, the column index of the last True value (0 for rows without one)."""
+    return present.shape[1] - 1 - np.argmax(present[:, ::-1], axis=1)
+
+
+def rank_percentiles(ranks: np.ndarray, pool: np.ndarray) -> np.ndarray:
+    """
+    Percentage of a reference population with a worse (higher) success rank; 100 is the best.
+
+    Args:
+        ranks: Success ranks to place (NaN if unknown)
+        pool: Success ranks of the reference population (same score type and year)
+
+    Returns:
+        Percentile per rank (NaN where it cannot be computed)
+    """
+    pool = np.sort(pool[~np.isnan(pool)])
+    if len(pool) < 2:
+        return np.full(len(ranks), np.nan)
+    # Ties count half, so equally ranked programs share a middle percentile
+    better = np.searchsorted(pool, ranks, side="left")
+    tied = np.searchsorted(pool, ranks, side="right") - better
+    worse = len(pool) - better - (tied + 1) / 2
+    # A program absent from the reference pool may outrank all of it
+    result = np.clip(100.0 * worse / (len(pool) - 1), 0.0, 100.0)
+    result[np.isnan(ranks)] = np.nan
+    return result
+
+
+def catalog_rank_pools(table, year: str) -> dict[str, np.ndarray]:
+    """
+    Success ranks of every indexed program for one year, grouped by score type.
+
+    Args:
+        table: ProgramTable over the offline index records
+        year: Data year as a string
+
+    Returns:
+        Score type (upper case) -> array of known success ranks; empty if the
+        index has no ranks for that year
+    """
+    ranks = table.column("success_rank", year)
+    score_types = np.array([(r.get("puan_turu") or "").upper() for r in table.records], dtype=object)
+    known = ~np.isnan(ranks)
+    return {
+        score_type: ranks[known & (score_types == score_type)]
+        for score_type in set(score_types[known]) - {""}
+    }
+
+
+def compare_programs(
+    programs: dict[str, dict],
+    years: Sequence[int],
+    sort_by: Sequence[str],
+    rank_pools: Optional[dict[int, dict[str, np.ndarray]]] = None
+) -> dict:
+    """
+    Derive comparison metrics for several programs and rank them.
+
+    Args:
+        programs: YÖP code -> {'points': {year: extract_year_metrics() result},
+            'university', 'program', 'score_type'}
+        years: Years of the comparison, ascending
+        sort_by: Keys from COMPARE_METRICS, '-' prefix for descending; missing values sort last
+        rank_pools: Year -> reference success ranks per score type (see
+            catalog_rank_pools). Each program is ranked in the latest year it has
+            data for; years and score types missing here are ranked among the
+            compared programs' ranks of that year instead.
+
+    Returns:
+        Dictionary with 'years', 'yoy_periods' (labels of the *_yoy entries),
+        'rank_percentile_scope' (score type -> 'catalog', 'compared' or 'mixed')
+        and 'programs' (rows in ranked order)
+    """
+    codes = list(programs)
+    matrices = {
+        metric: np.array(
+            [[np.nan if (v := programs[code]["points"].get(year, {}).get(metric)) is None else v for year in years]
+             for code in codes],
+            dtype=np.float64
+        ).reshape(len(codes), len(years))
+        for metric in TREND_METRICS
+    }
+    rows = np.arange(len(codes))
+
+    # Latest year with any data, so a row's latest metrics all come from the same year
+    any_data = np.zeros((len(codes), len(years)), dtype=bool)
+    for metric in TREND_METRICS:
+        any_data |= ~np.isnan(matrices[metric])
+    latest_column = _last_present(any_data)
+    has_data = any_data.any(axis=1)
+
+    columns: dict[str, np.ndarray] = {}
+    for metric in TREND_METRICS:
+        values = matrices[metric][rows, latest_column]
+        columns[metric] = np.where(has_data, values, np.nan)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        columns["fill_rate"] = np.where(columns["quota"] > 0, columns["placed"] / columns["quota"], np.nan)
+
+    yoy = {}
+    for metric in ("base_score", "success_rank"):
+        values = matrices[metric]
+        yoy[metric] = np.diff(values, axis=1)
+        present = ~np.isnan(values)
+        change = values[rows, _last_present(present)] - values[rows, np.argmax(present, axis=1)]
+        columns[f"{metric}_change"] = np.where(present.sum(axis=1) >= 2, change, np.nan)
+
+    score_types = np.array([programs[code].get("score_type") or "" for code in codes], dtype=object)
+    columns["rank_percentile"] = np.full(len(codes), np.nan)
+    scopes: list[Optional[str]] = [None] * len(codes)
+    for column in np.unique(latest_column[has_data]):
+        catalog = (rank_pools or {}).get(years[column]) or {}
+        in_year = has_data & (latest_column == column)
+        for score_type in set(score_types[in_year]) - {""}:
+            members = in_year & (score_types == score_type)
+            pool, scope = catalog.get(score_type), "catalog"
+            if pool is None:
+                pool, scope = matrices["success_rank"][score_types == score_type, column], "compared"
+            percentiles = rank_percentiles(columns["success_rank"][members], pool)
+            columns["rank_percentile"][members] = percentiles
+            for i, percentile in zip(np.flatnonzero(members), percentiles):
+                if not np.isnan(percentile):
+                    scopes[i] = scope
+
+    order = rows
+    if sort_by and len(codes):
+        keys = []
+        for key in sort_by:
+            descending = key.startswith("-")
+            values = columns[key.lstrip("-")]
+            values = -values if descending else values.copy()
+            values[np.isnan(values)] = np.inf
+            keys.append(values)
+        # np.lexsort treats the last key as the primary one
+        order = np.lexsort(keys[::-1])
+
+    result_rows = []
+    for position, i in enumerate(order, start=1):
+        code = codes[i]
+        info = programs[code]
+        row = {
+            "rank": position,
+            "yop_kodu": code,
+            "university": info.get("university"),
+            "program": info.get("program"),
+            "score_type": info.get("score_type"),
+            "year": years[latest_column[i]] if has_data[i] else None,
+        }
+        row.update({metric: _value(columns[metric][i], metric) for metric in COMPARE_METRICS})
+        row["rank_percentile_scope"] = scopes[i]
+        row["base_score_yoy"] = [_value(v, "base_score_change") for v in yoy["base_score"][i]]
+        row["success_rank_yoy"] = [_value(v, "success_rank_change") for v in yoy["success_rank"][i]]
+        result_rows.append(row)
+
+    scope_by_type: dict[str, str] = {}
+    for score_type, scope in zip(score_types, scopes):
+        if scope is not None:
+            scope_by_type[score_type] = scope if scope_by_type.get(score_type, scope) == scope else "mixed"
+
+    return {
+        "years": list(years),
+        "yoy_periods": [f"{a}-{b}" for a, b in zip(years, years[1:])],
+        "rank_percentile_scope": scope_by_type,
+        "programs": result_rows,
+    }
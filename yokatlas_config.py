@@ -0,0 +1,91 @@
+"""
+YOKATLAS MCP Server - Runtime configuration
+
+Small helpers for reading tuning knobs from environment variables.
+All server settings use the ``YOKATLAS_MCP_`` prefix so they do not collide
+with the ``YOKATLAS_`` settings read by yokatlas-py itself.
+"""
+
+import logging
+import os
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+ENV_PREFIX = "YOKATLAS_MCP_"
+
+
+def env_str(name: str, default: Optional[str] = None) -> Optional[str]:
+    """
+    Read a string setting.
+
+    Args:
+        name: Setting name without the prefix (e.g. 'SEARCH_WORKERS')
+        default: Value returned when the variable is unset or empty
+
+    Returns:
+        The configured value or the default
+    """
+    value = os.environ.get(ENV_PREFIX + name, "").strip()
+    return value if value else default
+
+
+def env_int(name: str, default: int, minimum: int = 0) -> int:
+    """
+    Read an integer setting, falling back to the default on invalid input.
+
+    Args:
+        name: Setting name without the prefix
+        default: Value used when the variable is unset or invalid
+        minimum: Lower bound applied to the parsed value
+
+    Returns:
+        The configured integer
+    """
+    raw = env_str(name)
+    if raw is None:
+        return default
+    try:
+        return max(minimum, int(raw))
+    except ValueError:
+        logger.warning(f"Ignoring invalid integer for {ENV_PREFIX}{name}: {raw!r}")
+        return default
+
+
+def env_float(name: str, default: float, minimum: float = 0.0) -> float:
+    """
+    Read a float setting, falling back to the default on invalid input.
+
+    Args:
+        name: Setting name without the prefix
+        default: Value used when the variable is unset or invalid
+        minimum: Lower bound applied to the parsed value
+
+    Returns:
+        The configured float
+    """
+    raw = env_str(name)
+    if raw is None:
+        return default
+    try:
+        return max(minimum, float(raw))
+    except ValueError:
+        logger.warning(f"Ignoring invalid number for {ENV_PREFIX}{name}: {raw!r}")
+        return default
+
+
+def env_bool(name: str, default: bool) -> bool:
+    """
+    Read a boolean setting ('1', 'true', 'yes', 'on' are true).
+
+    Args:
+        name: Setting name without the prefix
+        default: Value used when the variable is unset
+
+    Returns:
+        The configured boolean
+    """
+    raw = env_str(name)
+    if raw is None:
+        return default
+    return raw.lower() in ("1", "true", "yes", "on")
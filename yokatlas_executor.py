@@ -0,0 +1,153 @@
+"""
+YOKATLAS MCP Server - Upstream worker pool
+
+yokatlas-py's search functions are blocking (they use synchronous httpx
+calls), so running them directly inside an async tool would stall every
+other coroutine on the event loop. This module runs such calls on a bounded
+thread pool and limits how many calls may be in flight per upstream.
+"""
+
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+__all__ = ["UpstreamExecutor"]
+
+
+@dataclass
+class _UpstreamState:
+    """Concurrency limit and counters for a single upstream."""
+
+    limit: int
+    semaphore: asyncio.Semaphore = field(init=False)
+    in_flight: int = 0
+    queued: int = 0
+    max_queued: int = 0
+    completed: int = 0
+    failed: int = 0
+    busy_seconds: float = 0.0
+
+    def __post_init__(self) -> None:
+        self.semaphore = asyncio.Semaphore(self.limit)
+
+    def snapshot(self) -> dict:
+        finished = self.completed + self.failed
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "max_queued": self.max_queued,
+            "completed": self.completed,
+            "failed": self.failed,
+            "avg_latency_ms": round(1000 * self.busy_seconds / finished, 2) if finished else 0.0,
+        }
+
+
+class UpstreamExecutor:
+    """
+    Bounded thread pool for blocking upstream calls.
+
+    Each upstream (e.g. 'bachelor' or 'associate_degree' search) gets its own
+    semaphore, so a slow upstream can only occupy ``per_upstream_limit``
+    workers and callers waiting for a slot are counted as queued. A call
+    keeps its slot until its thread returns, even if the caller stopped
+    waiting for it (e.g. on a timeout), since the thread cannot be stopped.
+
+    Args:
+        max_workers: Size of the shared thread pool
+        per_upstream_limit: Maximum concurrent calls per upstream
+        thread_name_prefix: Prefix for worker thread names
+    """
+
+    def __init__(self, max_workers: int, per_upstream_limit: int, thread_name_prefix: str = "yokatlas-upstream"):
+        self.max_workers = max(1, max_workers)
+        self.per_upstream_limit = max(1, min(per_upstream_limit, self.max_workers))
+        self._thread_name_prefix = thread_name_prefix
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self._upstreams: dict[str, _UpstreamState] = {}
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        # Created lazily so importing the server does not spawn threads
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix=self._thread_name_prefix,
+                    )
+        return self._pool
+
+    def _get_state(self, upstream: str) -> _UpstreamState:
+        state = self._upstreams.get(upstream)
+        if state is None:
+            state = self._upstreams[upstream] = _UpstreamState(limit=self.per_upstream_limit)
+        return state
+
+    async def run(self, upstream: str, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Run a blocking callable on the worker pool.
+
+        Args:
+            upstream: Name of the upstream the call talks to
+            func: Blocking callable
+            *args: Positional arguments for func
+            **kwargs: Keyword arguments for func
+
+        Returns:
+            Whatever func returns; exceptions raised by func propagate
+        """
+        state = self._get_state(upstream)
+
+        waiting = state.semaphore.locked()
+        if waiting:
+            state.queued += 1
+            state.max_queued = max(state.max_queued, state.queued)
+        try:
+            await state.semaphore.acquire()
+        finally:
+            if waiting:
+                state.queued -= 1
+
+        state.in_flight += 1
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self._get_pool(), functools.partial(func, *args, **kwargs))
+        except BaseException:
+            self._finish(state, started, None)
+            raise
+        future.add_done_callback(functools.partial(self._finish, state, started))
+        # Cancelling the caller must not cancel the future: the slot is
+        # released by _finish once the worker thread is actually done
+        return await asyncio.shield(future)
+
+    @staticmethod
+    def _finish(state: _UpstreamState, started: float, future: Optional[asyncio.Future]) -> None:
+        """Release the upstream slot of a call whose worker thread finished."""
+        state.busy_seconds += time.perf_counter() - started
+        if future is not None and not future.cancelled() and future.exception() is None:
+            state.completed += 1
+        else:
+            state.failed += 1
+        state.in_flight -= 1
+        state.semaphore.release()
+
+    def stats(self) -> dict:
+        """Return pool size and per-upstream queue/in-flight counters."""
+        return {
+            "max_workers": self.max_workers,
+            "per_upstream_limit": self.per_upstream_limit,
+            "upstreams": {name: state.snapshot() for name, state in self._upstreams.items()},
+        }
+
+    def shutdown(self, wait: bool = False) -> None:
+        """Stop the worker pool; a new one is created on next use."""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=wait, cancel_futures=True)
+                self._pool = None
@@ -0,0 +1,209 @@
+"""
+YOKATLAS MCP Server - Shared upstream HTTP session
+
+yokatlas-py talks to yokatlas.yok.gov.tr in two ways: atlas fetchers use the
+class-level ``YOKATLASClient`` async client, and the search modules call the
+module-level ``httpx.post`` (a new connection, and TLS handshake, per
+search). This module owns one long-lived pooled async client and one pooled
+sync client (searches run in worker threads), injects them into yokatlas-py
+and closes them on shutdown.
+"""
+
+import asyncio
+import importlib
+import importlib.util
+import logging
+import threading
+from typing import Any, Callable, Optional
+
+import httpx
+
+from yokatlas_config import env_bool, env_float, env_int
+
+__all__ = ["UpstreamHttp"]
+
+logger = logging.getLogger(__name__)
+
+# yokatlas-py modules whose module-level httpx.post calls are routed through the pool
+_SEARCH_MODULES = ("yokatlas_py.lisanstercihsihirbazi", "yokatlas_py.onlisanstercihsihirbazi")
+
+
+class _PooledHttpx:
+    """
+    Stand-in for the ``httpx`` module inside yokatlas-py's search modules.
+
+    ``post`` goes through the pooled sync client; everything else (exception
+    classes etc.) is the real httpx module.
+    """
+
+    def __init__(self, http: "UpstreamHttp"):
+        self._http = http
+
+    def post(self, url: str, *, verify: Any = None, **kwargs) -> httpx.Response:
+        # verify is fixed on the pooled client (yokatlas-py always passes False)
+        try:
+            response = self._http.sync_client().post(url, **kwargs)
+        except httpx.RequestError:
+            self._http._record_failure()
+            raise
+        if response.status_code >= 500:
+            self._http._record_failure()
+        return response
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(httpx, name)
+
+
+class UpstreamHttp:
+    """
+    Pooled HTTP clients shared by all upstream calls.
+
+    All traffic goes to a single host, so the pool limits are effectively
+    per-host connection limits.
+
+    Args:
+        max_connections: Maximum open connections per client
+        max_keepalive: Maximum idle connections kept alive per client
+        keepalive_expiry: Seconds an idle connection is kept
+        timeout: Request timeout in seconds
+        http2: Negotiate HTTP/2 when the optional 'h2' package is installed
+    """
+
+    def __init__(
+        self,
+        max_connections: int,
+        max_keepalive: int,
+        keepalive_expiry: float,
+        timeout: float,
+        http2: bool = True
+    ):
+        self.max_connections = max(1, max_connections)
+        self.max_keepalive = max(0, min(max_keepalive, self.max_connections))
+        self.keepalive_expiry = keepalive_expiry
+        self.timeout = timeout
+        self.http2 = http2 and importlib.util.find_spec("h2") is not None
+        if http2 and not self.http2:
+            logger.info("HTTP/2 requested but the 'h2' package is not installed; using HTTP/1.1")
+
+        self._async: Optional[httpx.AsyncClient] = None
+        self._async_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._sync: Optional[httpx.Client] = None
+        self._sync_lock = threading.Lock()
+        self._installed = False
+        self._tracking = threading.local()
+
+    @classmethod
+    def from_env(cls) -> "UpstreamHttp":
+        """Create the session from YOKATLAS_MCP_HTTP_* environment variables."""
+        return cls(
+            max_connections=env_int("HTTP_MAX_CONNECTIONS", 20, minimum=1),
+            max_keepalive=env_int("HTTP_MAX_KEEPALIVE", 10),
+            keepalive_expiry=env_float("HTTP_KEEPALIVE_EXPIRY", 60.0),
+            timeout=env_float("HTTP_TIMEOUT", 30.0),
+            http2=env_bool("HTTP2", True)
+        )
+
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    def async_client(self) -> httpx.AsyncClient:
+        """
+        Return the pooled async client and make yokatlas-py's atlas fetchers use it.
+
+        Must be called from the event loop that will use the client; a client
+        created on another (finished) loop is replaced, since its connections
+        cannot be reused.
+        """
+        loop = asyncio.get_running_loop()
+        if self._async is None or self._async.is_closed or self._async_loop is not loop:
+            from yokatlas_py.http_client import YOKATLASClient
+
+            self._async = httpx.AsyncClient(
+                verify=YOKATLASClient.VERIFY_SSL,
+                timeout=httpx.Timeout(self.timeout),
+                headers=YOKATLASClient.DEFAULT_HEADERS,
+                follow_redirects=True,
+                limits=self._limits(),
+                http2=self.http2,
+            )
+            self._async_loop = loop
+            YOKATLASClient._client = self._async
+        return self._async
+
+    def sync_client(self) -> httpx.Client:
+        """Return the pooled sync client used for searches (thread-safe)."""
+        if self._sync is None:
+            with self._sync_lock:
+                if self._sync is None:
+                    self._sync = httpx.Client(
+                        verify=False,
+                        timeout=httpx.Timeout(self.timeout),
+                        limits=self._limits(),
+                        http2=self.http2,
+                    )
+        return self._sync
+
+    def _record_failure(self) -> None:
+        if getattr(self._tracking, "failures", None) is not None:
+            self._tracking.failures += 1
+
+    def call_tracked(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> tuple[Any, int]:
+        """
+        Run a blocking search call and count the upstream requests that failed during it.
+
+        yokatlas-py's search wrappers turn transport errors and 5xx responses
+        into empty results; the failure count tells those apart from genuinely
+        empty searches.
+
+        Returns:
+            Tuple of (func's result, number of failed requests)
+        """
+        self._tracking.failures = 0
+        try:
+            return func(*args, **kwargs), self._tracking.failures
+        finally:
+            self._tracking.failures = None
+
+    def install(self) -> None:
+        """Route yokatlas-py's search requests through the pooled sync client."""
+        if self._installed:
+            return
+        proxy = _PooledHttpx(self)
+        for name in _SEARCH_MODULES:
+            module = importlib.import_module(name)
+            module.httpx = proxy
+        self._installed = True
+
+    async def aclose(self) -> None:
+        """Close the async client; call from the loop it was created on."""
+        client, self._async = self._async, None
+        if client is None:
+            return
+        if not client.is_closed:
+            await client.aclose()
+        from yokatlas_py.http_client import YOKATLASClient
+        if YOKATLASClient._client is client:
+            YOKATLASClient._client = None
+
+    def close(self) -> None:
+        """Close the sync client."""
+        with self._sync_lock:
+            client, self._sync = self._sync, None
+        if client is not None:
+            client.close()
+
+    def stats(self) -> dict:
+        """Return the pool configuration and which clients are open."""
+        return {
+            "max_connections": self.max_connections,
+            "max_keepalive": self.max_keepalive,
+            "keepalive_expiry": self.keepalive_expiry,
+            "timeout": self.timeout,
+            "http2": self.http2,
+            "async_client_open": self._async is not None and not self._async.is_closed,
+            "sync_client_open": self._sync is not None,
+        }
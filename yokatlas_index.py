@@ -0,0 +1,430 @@
+"""
+YOKATLAS MCP Server - Local offline program index
+
+A build step harvests the complete bachelor / associate program lists from
+YOKATLAS into a compact gzip file. At runtime the file is loaded into an
+in-memory index with Turkish-folded trigram postings for university, program
+and city names and per-value postings for the enum filters, so searches can be
+answered without a network round-trip.
+
+Build an index with:
+
+    yokatlas-mcp-build-index --output ./index
+
+and point the server at it with YOKATLAS_MCP_INDEX_DIR=./index.
+
+YOKATLAS search only lists the current placement cycle (each record carries
+values for the last few years), so a harvest cannot target a past year; the
+index is named after the newest year found in the harvested records.
+"""
+
+import argparse
+import datetime
+import glob
+import gzip
+import json
+import logging
+import os
+import time
+from array import array
+from collections.abc import Mapping
+from typing import Any, Callable, Iterable, Optional
+
+from yokatlas_models import ProgramRecord, to_dicts, to_records
+from yokatlas_text import fold_turkish
+
+__all__ = ["ProgramIndex", "harvest_programs", "data_year", "build_index", "main"]
+
+logger = logging.getLogger(__name__)
+
+INDEX_FORMAT_VERSION = 1
+
+# Search record field holding each filterable value
+TEXT_FIELDS = {
+    "universite": "uni_adi",
+    "program": "program_adi",
+    "sehir": "sehir_adi",
+}
+ENUM_FIELDS = {
+    "universite_turu": "universite_turu",
+    "ucret": "ucret_burs",
+    "ogretim_turu": "ogretim_turu",
+    "doluluk": "doluluk",
+    "puan_turu": "puan_turu",
+}
+# Enum filters that must match exactly; the others match on a folded prefix
+# ('İkinci' matches 'İkinci Öğretim' but 'Ücretli' does not match 'İÖ-Ücretli')
+_EXACT_ENUMS = {"doluluk", "puan_turu"}
+
+BACHELOR_SCORE_TYPES = ("say", "ea", "soz", "dil")
+AVAILABILITY_VALUES = ("Doldu", "Doldu#", "Dolmadı", "Yeni")
+
+_HARVEST_PAGE_SIZE = 500
+
+# Per-year fields of a search record ({year: value})
+YEARLY_FIELDS = ("kontenjan", "yerlesen", "taban", "tbs")
+# Placeholders YOKATLAS shows for a year without data
+NO_DATA_VALUES = {"", "-", "--", "---"}
+
+
+def _trigrams(text: str) -> set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _latest_number(values: Any) -> float:
+    """Return the most recent numeric value from a {year: value} mapping (or -inf)."""
+    if isinstance(values, Mapping):
+        for year in sorted(values, reverse=True):
+            try:
+                return float(values[year])
+            except (TypeError, ValueError):
+                continue
+    return float("-inf")
+
+
+class ProgramIndex:
+    """
+    In-memory search index over harvested program records.
+
+    Args:
+        program_type: 'bachelor' or 'associate_degree'
+        year: Data year the records were harvested for
+        built_at: Unix timestamp of the harvest
+        records: Search result records, each tagged with 'puan_turu' and 'doluluk'
+            (held as compact ProgramRecords)
+    """
+
+    def __init__(self, program_type: str, year: int, built_at: float, records: list[dict]):
+        self.program_type = program_type
+        self.year = year
+        self.built_at = built_at
+        # Highest base score first, like the upstream default ordering
+        self.records: list[ProgramRecord] = sorted(
+            to_records(records), key=lambda r: _latest_number(r.get("taban")), reverse=True
+        )
+
+        self._folded: dict[str, list[str]] = {}
+        self._postings: dict[str, dict[str, array]] = {}
+        for param, field in TEXT_FIELDS.items():
+            folded = [fold_turkish(r.get(field) or "") for r in self.records]
+            self._folded[param] = folded
+            self._postings[param] = self._build_postings((i, _trigrams(text)) for i, text in enumerate(folded))
+
+        self._enums: dict[str, dict[str, array]] = {}
+        for param, field in ENUM_FIELDS.items():
+            self._enums[param] = self._build_postings(
+                (i, {fold_turkish(r[field])}) for i, r in enumerate(self.records) if r.get(field)
+            )
+
+        # Columnar view for range/sort queries and the YÖP code lookup, built on first use
+        self._table = None
+        self._by_code: Optional[dict[str, int]] = None
+
+    @staticmethod
+    def _build_postings(entries: Iterable[tuple[int, set[str]]]) -> dict[str, array]:
+        postings: dict[str, array] = {}
+        for record_id, tokens in entries:
+            for token in tokens:
+                ids = postings.get(token)
+                if ids is None:
+                    ids = postings[token] = array("I")
+                ids.append(record_id)
+        return postings
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def age_seconds(self) -> float:
+        """Seconds since the index was harvested."""
+        return time.time() - self.built_at
+
+    def _match_text(self, param: str, queries: list[str]) -> set[int]:
+        """Record ids whose folded field contains any of the folded queries."""
+        folded = self._folded[param]
+        matches: set[int] = set()
+        for query in queries:
+            query = fold_turkish(query)
+            grams = _trigrams(query)
+            if not grams:
+                # Too short for trigrams; fall back to a linear scan
+                matches.update(i for i, text in enumerate(folded) if query in text)
+                continue
+            postings = self._postings[param]
+            candidates: Optional[set[int]] = None
+            for gram in sorted(grams, key=lambda g: len(postings.get(g, ()))):
+                ids = postings.get(gram)
+                if ids is None:
+                    candidates = set()
+                    break
+                candidates = set(ids) if candidates is None else candidates.intersection(ids)
+                if not candidates:
+                    break
+            matches.update(i for i in candidates or () if query in folded[i])
+        return matches
+
+    def _match_enum(self, param: str, value: str) -> set[int]:
+        """Record ids whose enum field equals (or starts with) the folded value."""
+        value = fold_turkish(value)
+        exact = param in _EXACT_ENUMS
+        matches: set[int] = set()
+        for token, ids in self._enums[param].items():
+            if token == value or (not exact and token.startswith(value)):
+                matches.update(ids)
+        return matches
+
+    def match_ids(self, params: dict, expand: Optional[Callable[[str, str], list[str]]] = None) -> Optional[list[int]]:
+        """
+        Return the positions of records matching the filters in params.
+
+        Args:
+            params: Parameters from _build_search_params ('length' is ignored)
+            expand: Optional callable (param, value) -> list of query variations,
+                e.g. to apply yokatlas-py's university/program name normalization
+
+        Returns:
+            Sorted record positions (highest base score first), or None if no filter was given
+        """
+        selected: Optional[set[int]] = None
+        for param, value in params.items():
+            if not value or param == "length":
+                continue
+            if param in TEXT_FIELDS:
+                queries = expand(param, value) if expand else [value]
+                ids = self._match_text(param, queries or [value])
+            elif param in ENUM_FIELDS:
+                ids = self._match_enum(param, value)
+            else:
+                continue
+            selected = ids if selected is None else selected & ids
+            if not selected:
+                return []
+        return None if selected is None else sorted(selected)
+
+    def search(self, params: dict, expand: Optional[Callable[[str, str], list[str]]] = None) -> list[dict]:
+        """
+        Answer a search from the index.
+
+        Args:
+            params: Parameters from _build_search_params ('length' caps the result count)
+            expand: Optional query expansion, see match_ids()
+
+        Returns:
+            Matching records as dicts, highest base score first
+        """
+        limit = int(params.get("length") or 50)
+        ids = self.match_ids(params, expand)
+        if ids is None:
+            return to_dicts(self.records[:limit])
+        return to_dicts(self.records[i] for i in ids[:limit])
+
+    def find(self, yop_kodu: str) -> Optional[ProgramRecord]:
+        """Return the record for a YÖP code, or None if the index has no such program."""
+        if self._by_code is None:
+            self._by_code = {r.yop_kodu: i for i, r in enumerate(self.records) if r.yop_kodu}
+        position = self._by_code.get(yop_kodu)
+        return self.records[position] if position is not None else None
+
+    @property
+    def table(self):
+        """Columnar ProgramTable over all records, built on first access."""
+        if self._table is None:
+            from yokatlas_query import ProgramTable
+            self._table = ProgramTable(self.records)
+        return self._table
+
+    def stats(self) -> dict:
+        """Return size and freshness information."""
+        return {
+            "program_type": self.program_type,
+            "year": self.year,
+            "programs": len(self.records),
+            "built_at": datetime.datetime.fromtimestamp(self.built_at).isoformat(timespec="seconds"),
+            "age_hours": round(self.age_seconds() / 3600, 2),
+        }
+
+    def save(self, directory: str) -> str:
+        """
+        Write the index records to '<directory>/<program_type>_<year>.json.gz'.
+
+        Args:
+            directory: Output directory (created if missing)
+
+        Returns:
+            Path of the written file
+        """
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{self.program_type}_{self.year}.json.gz")
+        document = {
+            "version": INDEX_FORMAT_VERSION,
+            "program_type": self.program_type,
+            "year": self.year,
+            "built_at": self.built_at,
+            "records": to_dicts(self.records),
+        }
+        tmp_path = path + ".tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(document, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> "ProgramIndex":
+        """
+        Load an index file written by save().
+
+        Args:
+            path: Path of the .json.gz file
+
+        Returns:
+            The loaded index
+
+        Raises:
+            ValueError: If the file has an unsupported format version
+        """
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            document = json.load(f)
+        if document.get("version") != INDEX_FORMAT_VERSION:
+            raise ValueError(f"Unsupported index format version {document.get('version')} in {path}")
+        return cls(document["program_type"], document["year"], document["built_at"], document["records"])
+
+    @staticmethod
+    def latest_path(directory: str, program_type: str) -> Optional[str]:
+        """
+        Find the most recent year's index file for a program type.
+
+        Args:
+            directory: Index directory
+            program_type: 'bachelor' or 'associate_degree'
+
+        Returns:
+            Path of the index file or None
+        """
+        years = {}
+        for path in glob.glob(os.path.join(directory, f"{program_type}_*.json.gz")):
+            year = os.path.basename(path)[len(program_type) + 1:-len(".json.gz")]
+            if year.isdigit():
+                years[int(year)] = path
+        return years[max(years)] if years else None
+
+    @classmethod
+    def load_latest(cls, directory: str, program_type: str) -> Optional["ProgramIndex"]:
+        """
+        Load the most recent year's index for a program type, if one exists.
+
+        Args:
+            directory: Index directory
+            program_type: 'bachelor' or 'associate_degree'
+
+        Returns:
+            The loaded index or None
+        """
+        path = cls.latest_path(directory, program_type)
+        return cls.load(path) if path is not None else None
+
+
+def harvest_programs(search_func: Callable, program_type: str) -> list[dict]:
+    """
+    Page through every program in YOKATLAS for one program type.
+
+    Searches are run once per score type and availability value, so every
+    record can be tagged with 'puan_turu' and 'doluluk' (neither is part of
+    the upstream search record).
+
+    Args:
+        search_func: search_lisans_programs or search_onlisans_programs
+        program_type: 'bachelor' or 'associate_degree'
+
+    Returns:
+        List of tagged search records, one per YÖP code
+    """
+    score_types = BACHELOR_SCORE_TYPES if program_type == "bachelor" else ("tyt",)
+    records: dict[str, dict] = {}
+
+    # The unfiltered pass last picks up programs without an availability value
+    for score_type in score_types:
+        for availability in AVAILABILITY_VALUES + ("",):
+            start = 0
+            while True:
+                params = {"puan_turu": score_type, "length": _HARVEST_PAGE_SIZE, "start": start}
+                if availability:
+                    params["doluluk"] = availability
+                page = search_func(params, smart_search=False)
+                if not isinstance(page, list):
+                    raise ConnectionError(f"Harvest failed for {program_type} {score_type}/{availability}: {page}")
+
+                for record in page:
+                    code = record.get("yop_kodu")
+                    if code and code not in records:
+                        records[code] = dict(record, puan_turu=score_type, doluluk=availability or None)
+
+                logger.info(f"Harvested {len(page)} {program_type} programs ({score_type}/{availability or '-'}, start={start})")
+                if len(page) < _HARVEST_PAGE_SIZE:
+                    break
+                start += _HARVEST_PAGE_SIZE
+
+    return list(records.values())
+
+
+def data_year(records: Iterable[Mapping]) -> Optional[int]:
+    """
+    Return the newest year with data in harvested search records.
+
+    Args:
+        records: Search records with {year: value} fields
+
+    Returns:
+        The year, or None if no record has yearly values
+    """
+    years = set()
+    for record in records:
+        for field in YEARLY_FIELDS:
+            values = record.get(field)
+            if isinstance(values, Mapping):
+                years.update(year for year, value in values.items()
+                             if str(year).isdigit() and value is not None and str(value).strip() not in NO_DATA_VALUES)
+    return max((int(year) for year in years), default=None)
+
+
+def build_index(program_type: str, output_dir: str) -> str:
+    """
+    Harvest one program type and write its index file for the current cycle.
+
+    Args:
+        program_type: 'bachelor' or 'associate_degree'
+        output_dir: Directory for the index file
+
+    Returns:
+        Path of the written file
+    """
+    from yokatlas_py import search_lisans_programs, search_onlisans_programs
+
+    search_func = search_lisans_programs if program_type == "bachelor" else search_onlisans_programs
+    records = harvest_programs(search_func, program_type)
+    year = data_year(records)
+    if year is None:
+        raise ValueError(f"Harvested {program_type} records have no yearly data")
+    index = ProgramIndex(program_type, year, time.time(), records)
+    return index.save(output_dir)
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    """Command line entry point for building the offline index."""
+    parser = argparse.ArgumentParser(description="Build the local YOKATLAS program index.")
+    parser.add_argument("--output", required=True, help="Directory to write index files to")
+    parser.add_argument(
+        "--program-type",
+        choices=["bachelor", "associate_degree", "all"],
+        default="all",
+        help="Which program list to harvest"
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    program_types = ["bachelor", "associate_degree"] if args.program_type == "all" else [args.program_type]
+    for program_type in program_types:
+        path = build_index(program_type, args.output)
+        logger.info(f"Wrote {path}")
+
+
+if __name__ == "__main__":
+    main()
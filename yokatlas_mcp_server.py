@@ -5,22 +5,57 @@ This module provides an MCP server for accessing YOKATLAS data,
 including bachelor's and associate degree program information.
 """
 
+import asyncio
+import argparse
+import base64
+import binascii
+import contextlib
+import datetime
+import functools
+import importlib
+import json
 import logging
-from typing import Literal, Optional, List, Any
+import os
+import re
+import shutil
+import tempfile
+import time
+import uuid
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Annotated, Awaitable, Callable, Literal, Optional, List, Any, get_args
 
 from pydantic import Field
-from fastmcp import FastMCP
-
-# Import yokatlas-py v0.5.4+ API
-from yokatlas_py import (
-    search_lisans_programs,
-    search_onlisans_programs,
-    YOKATLASLisansAtlasi,
-    YOKATLASOnlisansAtlasi
+from fastmcp import Context, FastMCP
+from fastmcp.exceptions import ResourceError
+from starlette.requests import Request
+from starlette.responses import Response
+
+from yokatlas_cache import SearchResultCache, TTLCache, search_cache_key
+from yokatlas_config import env_bool, env_float, env_int, env_str
+from yokatlas_executor import UpstreamExecutor
+from yokatlas_http import UpstreamHttp
+from yokatlas_index import ProgramIndex
+from yokatlas_metrics import (
+    CONTENT_TYPE, Counter, Gauge, ServerMetrics, ToolMetricsMiddleware, serve_metrics, timed_serializer
+)
+from yokatlas_models import compact_payload, dumps, to_dicts, to_records
+from yokatlas_refresh import HotKeyRefresher
+from yokatlas_resilience import CircuitBreaker, TokenBucket, UpstreamGuard, UpstreamUnavailable
+from yokatlas_scheduler import (
+    PRIORITY_BULK, PRIORITY_INTERACTIVE, PRIORITY_NORMAL, SchedulerMiddleware, ToolScheduler, client_key
 )
+from yokatlas_trends import build_trend, extract_program_info, extract_year_metrics
+from yokatlas_store import store_from_env
 
 # Public API exports
-__all__ = ["app", "main"]
+__all__ = [
+    "app", "main",
+    # Delta sync interface (yokatlas_sync)
+    "has_shared_store", "search_function", "load_atlas_for_sync", "store_atlas_payload",
+    "touch_atlas_payload", "atlas_payload_complete", "close_upstream",
+]
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -28,7 +63,203 @@ logger = logging.getLogger(__name__)
 # Create a FastMCP server instance
 app = FastMCP(
     name="YOKATLAS API Server",
-    instructions="MCP server for Turkish Higher Education Atlas (YOKATLAS). Provides access to university program data including bachelor's and associate degree programs with search and detailed statistics."
+    instructions="MCP server for Turkish Higher Education Atlas (YOKATLAS). Provides access to university program data including bachelor's and associate degree programs with search and detailed statistics.",
+    # orjson when installed (see yokatlas_models); timed as the serialize phase
+    # of the tool metrics
+    tool_serializer=timed_serializer(dumps)
+)
+
+# Prometheus metrics for every tool call and upstream call, served at /metrics
+# on the HTTP transports and, if YOKATLAS_MCP_METRICS_PORT is set, on a
+# separate port (for stdio). OpenTelemetry spans are added when
+# opentelemetry-api is installed.
+_metrics = ServerMetrics()
+app.add_middleware(ToolMetricsMiddleware(_metrics))
+_METRICS_HOST = env_str("METRICS_HOST", "127.0.0.1")
+_METRICS_PORT = env_int("METRICS_PORT", 0)
+
+# Blocking yokatlas-py searches run here instead of on the event loop.
+# YOKATLAS_MCP_SEARCH_WORKERS sizes the pool, YOKATLAS_MCP_SEARCH_CONCURRENCY
+# caps concurrent calls per upstream (bachelor / associate_degree).
+_search_executor = UpstreamExecutor(
+    max_workers=env_int("SEARCH_WORKERS", 8, minimum=1),
+    per_upstream_limit=env_int("SEARCH_CONCURRENCY", 4, minimum=1),
+    thread_name_prefix="yokatlas-search"
+)
+
+# One pooled HTTP session (keep-alive, optional HTTP/2) shared by all
+# yokatlas-py requests, sized by YOKATLAS_MCP_HTTP_* and closed by main().
+_upstream_http = UpstreamHttp.from_env()
+
+# =============================================================================
+# Lazy Upstream Imports
+# =============================================================================
+
+# yokatlas-py (v0.5.4+) takes longer to import than the rest of the server,
+# and stdio clients start a fresh server process per session, so its entry
+# points are imported on first use. They are also module attributes, which
+# benchmarks/fake_yokatlas.py replaces.
+_YOKATLAS_PY_NAMES = {
+    "search_lisans_programs": "yokatlas_py",
+    "search_onlisans_programs": "yokatlas_py",
+    "YOKATLASLisansAtlasi": "yokatlas_py",
+    "YOKATLASOnlisansAtlasi": "yokatlas_py",
+    "expand_program_name": "yokatlas_py.search_utils",
+    "normalize_university_name": "yokatlas_py.search_utils",
+}
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _YOKATLAS_PY_NAMES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    # Route yokatlas-py's search requests through the pooled session before first use
+    _upstream_http.install()
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value
+    return value
+
+
+def _upstream(name: str) -> Any:
+    """Return a yokatlas-py entry point, importing yokatlas-py on first use."""
+    value = globals().get(name)
+    return value if value is not None else __getattr__(name)
+
+
+# Upstream calls share one adaptive token bucket (YOKATLAS_MCP_RATE_LIMIT
+# requests/s to yokatlas.yok.gov.tr) and get a timeout, jittered retries and
+# a circuit breaker per upstream kind. When a call cannot be made, expired
+# cache entries up to YOKATLAS_MCP_STALE_TTL seconds old are served instead.
+_upstream_bucket = TokenBucket(rate=env_float("RATE_LIMIT", 20.0), burst=env_float("RATE_BURST", 60.0, minimum=1.0))
+_STALE_TTL = env_int("STALE_TTL", 24 * 3600)
+
+
+def _make_guard(name: str, timeout: float) -> UpstreamGuard:
+    return UpstreamGuard(
+        name,
+        _upstream_bucket,
+        CircuitBreaker(env_int("BREAKER_FAILURES", 5, minimum=1), env_float("BREAKER_RESET_SECONDS", 30.0)),
+        timeout=timeout,
+        retries=env_int("RETRIES", 2),
+        base_delay=env_float("RETRY_BASE_DELAY", 0.5),
+        max_delay=env_float("RETRY_MAX_DELAY", 8.0)
+    )
+
+
+_search_guard = _make_guard("search", env_float("SEARCH_TIMEOUT", 45.0, minimum=1.0))
+_atlas_guard = _make_guard("atlas", env_float("ATLAS_TIMEOUT", 60.0, minimum=1.0))
+
+# Atlas detail responses keyed by (program_type, yop_kodu, year). Past years
+# rarely change, so they are kept much longer than the current year.
+_atlas_cache = TTLCache(
+    max_entries=env_int("ATLAS_CACHE_SIZE", 512, minimum=1),
+    name="atlas_details",
+    stale_ttl=_STALE_TTL
+)
+_ATLAS_TTL_PAST_YEAR = env_int("ATLAS_TTL_PAST_YEAR", 7 * 24 * 3600)
+_ATLAS_TTL_CURRENT_YEAR = env_int("ATLAS_TTL_CURRENT_YEAR", 3600)
+
+# Search results keyed on the Turkish-folded query; smaller results_limit
+# requests are answered by slicing a cached larger result.
+_search_cache = SearchResultCache(
+    max_entries=env_int("SEARCH_CACHE_SIZE", 256, minimum=1),
+    ttl=env_int("SEARCH_CACHE_TTL", 3600),
+    stale_ttl=_STALE_TTL
+)
+
+# Optional snapshot store shared by all server workers (YOKATLAS_MCP_CACHE_BACKEND:
+# memory, sqlite or redis); the caches above read through it. On a store miss
+# one worker takes a lease on the key and fetches it while the others wait up
+# to YOKATLAS_MCP_LEASE_SECONDS for its result.
+_store = store_from_env(stale_ttl=_STALE_TTL)
+_LEASE_SECONDS = env_float("LEASE_SECONDS", 60.0, minimum=1.0)
+
+# Optional offline program index built by yokatlas-mcp-build-index. Searches
+# are answered from it while it is younger than YOKATLAS_MCP_INDEX_MAX_AGE_HOURS.
+# The directory is re-checked every YOKATLAS_MCP_INDEX_CHECK_SECONDS, so an
+# index rebuilt by the sync or a cron job is picked up without a restart.
+_INDEX_DIR = env_str("INDEX_DIR")
+_INDEX_MAX_AGE = env_int("INDEX_MAX_AGE_HOURS", 7 * 24) * 3600
+_INDEX_CHECK_INTERVAL = env_float("INDEX_CHECK_SECONDS", 60.0, minimum=1.0)
+_program_indexes: dict[str, Optional[ProgramIndex]] = {}
+_index_sources: dict[str, Optional[tuple[str, float]]] = {}
+_index_checked: dict[str, float] = {}
+_index_load_lock = asyncio.Lock()
+
+# Batch tools fan out through _fetch_atlas_details with at most this many
+# concurrent fetches and this many (program, year) pairs per call.
+_BATCH_CONCURRENCY = env_int("BATCH_CONCURRENCY", 8, minimum=1)
+_BATCH_MAX_ITEMS = env_int("BATCH_MAX_ITEMS", 200, minimum=1)
+
+# PDF reports are rendered by ReportLab in worker processes and written to
+# YOKATLAS_MCP_REPORT_DIR. At most REPORT_WORKERS render at once and at most
+# REPORT_MAX_PENDING may be waiting or rendering; files older than
+# REPORT_RETENTION_HOURS are removed when new reports are written.
+_REPORT_DIR = env_str("REPORT_DIR") or os.path.join(tempfile.gettempdir(), "yokatlas-reports")
+_REPORT_WORKERS = env_int("REPORT_WORKERS", 2, minimum=1)
+_REPORT_MAX_PENDING = env_int("REPORT_MAX_PENDING", 8, minimum=1)
+_REPORT_RETENTION = env_int("REPORT_RETENTION_HOURS", 24) * 3600
+_report_pool: Optional[ProcessPoolExecutor] = None
+_report_slots = asyncio.Semaphore(_REPORT_WORKERS)
+_report_pending = 0
+# Details reports only render the genel_bilgiler tables
+_REPORT_SECTIONS = ("genel_bilgiler",)
+
+# Atlas sections (yokatlas-py fetcher keys) that can be requested individually.
+# Associate degree atlases have no yerlesen_puan_bilgileri / yerlesen_basari_siralari.
+AtlasSection = Literal[
+    'genel_bilgiler', 'kontenjan_yerlesme', 'taban_puan_ve_basari_sirasi_istatistikleri',
+    'cinsiyet_dagilimi', 'sehir_ve_cografi_bolge_dagilimi', 'yerlesen_il_dagilimi',
+    'ogrenim_durumu', 'mezuniyet_yili_dagilimi', 'lise_alani_dagilimi',
+    'lise_grubu_ve_tipi_dagilimi', 'lise_bazinda_yerlesen_dagilimi', 'okul_birincisi_yerlesen',
+    'yerlesen_son_kisi_bilgileri', 'yerlesen_ortalama_netler', 'yerlesen_puan_bilgileri',
+    'yerlesen_basari_siralari', 'tercih_istatistikleri', 'yerlesen_tercih_istatistikleri',
+    'tercih_kullanma_oranlari', 'tercih_edilen_universite_turleri', 'tercih_edilen_universiteler',
+    'tercih_edilen_iller', 'tercih_edilen_program_turleri', 'tercih_edilen_programlar',
+    'akademisyen_sayilari', 'kayitli_ogrenci_cinsiyet_dagilimi', 'mezuniyet_yili_cinsiyet_dagilimi',
+    'degisim_programi_bilgileri', 'yatay_gecis_bilgileri'
+]
+
+# Payload keys that fetch_all_details() derives from a differently named section
+_ATLAS_DERIVED_KEYS = {
+    "sehir_dagilimi": "sehir_ve_cografi_bolge_dagilimi",
+    "cografi_bolge_dagilimi": "sehir_ve_cografi_bolge_dagilimi",
+    "yerlesen_il_toplam": "yerlesen_il_dagilimi",
+    "ogrenim_durumu_toplam": "ogrenim_durumu",
+    "mezuniyet_yili_toplam": "mezuniyet_yili_dagilimi",
+    "lise_alani_toplam": "lise_alani_dagilimi"
+}
+
+_ATLAS_SECTION_KEYS = get_args(AtlasSection)
+
+_ATLAS_CLASS_NAMES = {
+    "bachelor": "YOKATLASLisansAtlasi",
+    "associate_degree": "YOKATLASOnlisansAtlasi"
+}
+_ATLAS_CLASSES: dict[str, Any] = {}
+
+
+def _atlas_class(program_type: str) -> Any:
+    """Return the yokatlas-py atlas class for a program type."""
+    atlas_class = _ATLAS_CLASSES.get(program_type)
+    if atlas_class is None:
+        atlas_class = _ATLAS_CLASSES[program_type] = _upstream(_ATLAS_CLASS_NAMES[program_type])
+    return atlas_class
+
+
+# Frequently requested atlas entries and searches are re-fetched in the
+# background shortly before they expire (YOKATLAS_MCP_REFRESH_AHEAD seconds),
+# using at most YOKATLAS_MCP_REFRESH_BUDGET of the upstream rate limit.
+# Requests that find only an expired entry get it immediately while it is
+# revalidated in the background.
+_refresher = HotKeyRefresher(
+    interval=env_float("REFRESH_INTERVAL", 30.0, minimum=1.0),
+    refresh_ahead=env_float("REFRESH_AHEAD", 300.0),
+    hot_keys=env_int("REFRESH_HOT_KEYS", 50, minimum=1),
+    upstream_rate=_upstream_bucket.max_rate,
+    budget_share=min(env_float("REFRESH_BUDGET", 0.2), 1.0),
+    max_cost=len(_ATLAS_SECTION_KEYS),
+    healthy=lambda: _search_guard.breaker.state == CircuitBreaker.CLOSED and _atlas_guard.breaker.state == CircuitBreaker.CLOSED
 )
 
 
@@ -88,14 +319,240 @@ def _build_search_params(
     return params
 
 
-def _execute_search(
+def _store_key(cache_key: tuple) -> str:
+    """Serialize an in-memory cache key for the snapshot store."""
+    return json.dumps(cache_key, ensure_ascii=False, separators=(",", ":"))
+
+
+async def _load_stored_search(cache_key: tuple, limit: int) -> Optional[list]:
+    """
+    Look up a search in the snapshot store and warm the in-memory cache from it.
+
+    Args:
+        cache_key: Key from search_cache_key
+        limit: Requested number of results
+
+    Returns:
+        Up to limit results, or None if the store cannot answer
+    """
+    stored = await _store.aget("search", _store_key(cache_key))
+    if not stored:
+        return None
+
+    _search_cache.store(cache_key, stored["limit"], to_records(stored["results"]))
+    return _search_cache.lookup(cache_key, limit)
+
+
+async def _load_stale_search(cache_key: tuple, limit: int) -> Optional[list]:
+    """
+    Find expired (but not yet evicted) search results to serve while YOKATLAS is unavailable.
+
+    Args:
+        cache_key: Key from search_cache_key
+        limit: Requested number of results
+
+    Returns:
+        Up to limit results, or None if nothing usable is cached
+    """
+    results = _search_cache.lookup_stale(cache_key, limit)
+    if results is None and _store is not None:
+        stored = await _store.aget("search", _store_key(cache_key), allow_stale=True)
+        if stored and (limit <= stored["limit"] or len(stored["results"]) < stored["limit"]):
+            results = stored["results"][:limit]
+    return results
+
+
+@contextlib.asynccontextmanager
+async def _worker_lease(namespace: str, key: str):
+    """
+    Hold the shared store's lease on a key for the duration of the block.
+
+    Yields True if this worker holds the lease (always, without a shared
+    store) and False if another worker holds it.
+    """
+    if _store is None:
+        yield True
+        return
+    token = await _store.alease(namespace, key, _LEASE_SECONDS)
+    try:
+        yield token is not None
+    finally:
+        if token:
+            await _store.arelease(namespace, key, token)
+
+
+async def _fetch_once_across_workers(
+    namespace: str,
+    key: str,
+    fetch: Callable[[], Awaitable[Any]],
+    lookup: Callable[[], Awaitable[Any]]
+) -> Any:
+    """
+    Fetch a key missing from the shared store, letting only one worker fetch it.
+
+    The worker holding the key's lease fetches (fetch() must write the result
+    to the store); the others poll the store with lookup() until the result
+    appears, the lease is freed, or LEASE_SECONDS pass, after which they
+    fetch themselves.
+
+    Args:
+        namespace: Store namespace ('atlas' or 'search')
+        key: Store key
+        fetch: Coroutine factory fetching upstream and writing the store
+        lookup: Coroutine factory reading the store (None on a miss)
+
+    Returns:
+        The fetched or shared result
+    """
+    deadline = time.monotonic() + _LEASE_SECONDS
+    delay = 0.05
+    while True:
+        async with _worker_lease(namespace, key) as leader:
+            if leader:
+                # Another worker may have stored it since our last read
+                result = await lookup()
+                return result if result is not None else await fetch()
+
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 1.0)
+        result = await lookup()
+        if result is not None:
+            return result
+        if time.monotonic() >= deadline:
+            return await fetch()
+
+
+async def _get_program_index(program_type: str) -> Optional[ProgramIndex]:
+    """
+    Return the offline index for a program type if one is configured and fresh.
+
+    At most every _INDEX_CHECK_INTERVAL seconds the newest index file is
+    looked up again and reloaded if it is new or changed, or if no index is
+    loaded yet. A missing, unreadable or stale index returns None so the caller
+    falls back to the upstream search.
+
+    Args:
+        program_type: Type of program ('bachelor' or 'associate_degree')
+
+    Returns:
+        The loaded ProgramIndex or None
+    """
+    if not _INDEX_DIR:
+        return None
+
+    if time.monotonic() - _index_checked.get(program_type, -_INDEX_CHECK_INTERVAL) >= _INDEX_CHECK_INTERVAL:
+        async with _index_load_lock:
+            if time.monotonic() - _index_checked.get(program_type, -_INDEX_CHECK_INTERVAL) >= _INDEX_CHECK_INTERVAL:
+                await _reload_program_index(program_type)
+                _index_checked[program_type] = time.monotonic()
+
+    index = _program_indexes.get(program_type)
+    if index is None or index.age_seconds() > _INDEX_MAX_AGE:
+        return None
+    return index
+
+
+def _index_source(program_type: str) -> Optional[tuple[str, float]]:
+    """Path and mtime of the newest index file for a program type, or None."""
+    path = ProgramIndex.latest_path(_INDEX_DIR, program_type)
+    return (path, os.path.getmtime(path)) if path is not None else None
+
+
+async def _reload_program_index(program_type: str) -> None:
+    """
+    Load the newest index file for a program type if it differs from the loaded one.
+
+    A file that cannot be read keeps the previously loaded index in place.
+
+    Args:
+        program_type: Type of program ('bachelor' or 'associate_degree')
+    """
+    try:
+        source = await asyncio.to_thread(_index_source, program_type)
+        if source is None:
+            _program_indexes[program_type] = None
+        elif source != _index_sources.get(program_type) or _program_indexes.get(program_type) is None:
+            _program_indexes[program_type] = await asyncio.to_thread(ProgramIndex.load, source[0])
+            logger.info(f"Loaded {program_type} index {source[0]}")
+        _index_sources[program_type] = source
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not load {program_type} index from {_INDEX_DIR}: {e}")
+        _program_indexes.setdefault(program_type, None)
+
+
+def _expand_index_query(program_type: str):
+    """
+    Build the query expansion used for index searches.
+
+    Applies the same university-name normalization and program-name expansion
+    that yokatlas-py's smart search uses upstream.
+    """
+    kind = "lisans" if program_type == "bachelor" else "onlisans"
+
+    def expand(param: str, value: str) -> list[str]:
+        if param == "universite":
+            return [_upstream("normalize_university_name")(value, kind) or value]
+        if param == "program":
+            return [value] + _upstream("expand_program_name")(value, kind)
+        return [value]
+
+    return expand
+
+
+async def _fetch_search(
+    search_func: callable,
+    params: dict,
+    program_type: str,
+    cache_key: tuple,
+    limit: int
+) -> Any:
+    """
+    Run a search upstream under the search guard and cache non-empty results.
+
+    Args:
+        search_func: The search function to call (search_lisans_programs or search_onlisans_programs)
+        params: Search parameters dictionary
+        program_type: Type of program ('bachelor' or 'associate_degree')
+        cache_key: Key from search_cache_key
+        limit: Number of results to fetch
+
+    Returns:
+        The search function's result (a list, or an error dictionary)
+
+    Raises:
+        UpstreamUnavailable: The search could not be made
+    """
+    params = dict(params, length=limit)
+    async with _metrics.track_upstream("search"):
+        results, _ = await _search_guard.call(
+            lambda: _search_executor.run(
+                program_type, _upstream_http.call_tracked, search_func, params, smart_search=True
+            ),
+            # Upstream failures surface as empty results; count them only if requests failed
+            is_failure=lambda outcome: outcome[1] > 0 and not outcome[0]
+        )
+
+    # yokatlas-py returns [] for upstream failures too, so empty lists are not cached
+    if isinstance(results, list) and results:
+        _search_cache.store(cache_key, limit, to_records(results))
+        if _store is not None:
+            await _store.aput("search", _store_key(cache_key), {"results": results, "limit": limit}, _search_cache.ttl)
+    return results
+
+
+async def _execute_search(
     search_func: callable,
     params: dict,
     program_type: str,
     search_context: dict
 ) -> dict:
     """
-    Execute a search and format the results.
+    Execute a search on the worker pool and format the results.
+
+    Searches are answered from the offline index when a fresh one is loaded,
+    otherwise from the search cache when an equivalent query with at least the
+    same limit was answered recently. An expired cache entry is returned as is
+    while it is re-fetched in the background.
 
     Args:
         search_func: The search function to call (search_lisans_programs or search_onlisans_programs)
@@ -107,16 +564,73 @@ def _execute_search(
         Formatted search results dictionary
     """
     try:
-        results = search_func(params, smart_search=True)
+        index = await _get_program_index(program_type)
+        if index is not None:
+            results = index.search(params, expand=_expand_index_query(program_type))
+            response = {
+                "programs": results,
+                "total_found": len(results),
+                "search_method": "local_index",
+                "fuzzy_matching": True,
+                "index": index.stats()
+            }
+            if program_type == "associate_degree":
+                response["program_type"] = "associate_degree"
+            return response
+
+        limit = params.get('length', 50)
+        cache_key = search_cache_key(program_type, params)
+
+        store_key = _store_key(cache_key)
+
+        async def refresh() -> None:
+            # Only one worker refreshes a query; the others pick it up from the store
+            async with _worker_lease("search", store_key) as leader:
+                if leader:
+                    # Re-fetch with the largest limit cached for this query so no entry shrinks
+                    fetch_limit = max(limit, _search_cache.fetched_limit(cache_key) or 0)
+                    await _fetch_search(search_func, params, program_type, cache_key, fetch_limit)
+
+        async def revalidate() -> None:
+            if _store is None or await _load_stored_search(cache_key, limit) is None:
+                await refresh()
+
+        _refresher.record(cache_key, refresh, lambda: _search_cache.expires_in(cache_key))
+        results = _search_cache.lookup(cache_key, limit)
+
+        if results is None and (_search_cache.expires_in(cache_key) or 0) < 0:
+            # Answer with the expired entry now and re-fetch it in the background
+            results = _search_cache.lookup_stale(cache_key, limit)
+            if results is not None:
+                _refresher.revalidate(cache_key, revalidate)
+
+        if results is None and _store is not None:
+            results = await _load_stored_search(cache_key, limit)
+
+        stale = False
+        if results is None:
+            try:
+                fetch = lambda: _fetch_search(search_func, params, program_type, cache_key, limit)
+                if _store is None:
+                    results = await fetch()
+                else:
+                    results = await _fetch_once_across_workers(
+                        "search", store_key, fetch, lambda: _load_stored_search(cache_key, limit)
+                    )
+            except UpstreamUnavailable:
+                results = await _load_stale_search(cache_key, limit)
+                if results is None:
+                    raise
+                stale = True
 
-        # Handle error response from API
-        if isinstance(results, dict) and 'error' in results:
-            logger.warning(f"API returned error for {program_type} search: {results.get('error')}")
-            return results
+            # Handle error response from API
+            if isinstance(results, dict) and 'error' in results:
+                logger.warning(f"API returned error for {program_type} search: {results.get('error')}")
+                return results
 
-        # Format successful results
+        # Format successful results (cached results are compact ProgramRecords)
         response = {
-            "programs": results if isinstance(results, list) else [],
+            "programs": to_dicts(results) if isinstance(results, list) else [],
             "total_found": len(results) if isinstance(results, list) else 0,
             "search_method": "smart_search_v0.5.4",
             "fuzzy_matching": True
@@ -124,6 +638,8 @@ def _execute_search(
 
         if program_type == "associate_degree":
             response["program_type"] = "associate_degree"
+        if stale:
+            response["stale"] = True
 
         return response
 
@@ -153,28 +669,241 @@ def _execute_search(
         }
 
 
-async def _fetch_atlas_details(
+def _encode_cursor(program_type: str, params: dict, offset: int, page_size: int) -> str:
+    """Encode an opaque pagination cursor that carries the whole query (no server-side state)."""
+    payload = {"v": 1, "t": program_type, "p": params, "o": offset, "s": page_size}
+    raw = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str, program_type: str) -> dict:
+    """
+    Decode a cursor produced by _encode_cursor.
+
+    Args:
+        cursor: Opaque cursor string
+        program_type: Program type of the tool receiving the cursor
+
+    Returns:
+        Dictionary with params, offset and page_size, or an error dictionary
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        if payload.get("v") != 1 or payload.get("t") != program_type:
+            raise ValueError("cursor belongs to another query type")
+        return {"params": dict(payload["p"]), "offset": int(payload["o"]), "page_size": int(payload["s"])}
+    except (binascii.Error, ValueError, KeyError, TypeError, AttributeError) as e:
+        return {"error": "Invalid cursor", "details": str(e)}
+
+
+def _progress_token_present(ctx: Optional[Context]) -> bool:
+    """Whether the client asked for progress notifications on this request."""
+    if ctx is None:
+        return False
+    try:
+        meta = ctx.request_context.meta
+    except (ValueError, LookupError):
+        return False
+    return meta is not None and meta.progressToken is not None
+
+
+async def _run_search_tool(
+    search_func: callable,
+    program_type: str,
+    params: dict,
+    search_context: dict,
+    page_size: Optional[int],
+    cursor: Optional[str],
+    stream_pages: bool,
+    ctx: Optional[Context]
+) -> dict:
+    """
+    Run a search for a search tool, optionally returning it page by page.
+
+    Without page_size or cursor the full response from _execute_search is
+    returned. Otherwise the result set (cached by _execute_search) is cut
+    into pages: either one page plus a next_cursor, or, with stream_pages,
+    every page sent as a progress notification whose message is the page
+    as JSON.
+
+    Args:
+        search_func: The search function to call
+        program_type: Type of program ('bachelor' or 'associate_degree')
+        params: Parameters from _build_search_params (ignored when a cursor is given)
+        search_context: Context info for error reporting
+        page_size: Page size, or None for a single response
+        cursor: Cursor from a previous page
+        stream_pages: Stream pages through progress notifications
+        ctx: MCP context of the tool call
+
+    Returns:
+        Search response, a single page, or a streaming summary
+    """
+    offset = 0
+    if cursor:
+        decoded = _decode_cursor(cursor, program_type)
+        if "error" in decoded:
+            return decoded
+        params, offset, page_size = decoded["params"], decoded["offset"], decoded["page_size"]
+
+    response = await _execute_search(search_func, params, program_type, search_context)
+    if not page_size or "error" in response:
+        return response
+
+    programs = response.pop("programs")
+    total = len(programs)
+
+    if stream_pages and _progress_token_present(ctx):
+        pages = 0
+        for start in range(offset, total, page_size):
+            page = programs[start:start + page_size]
+            message = json.dumps({"offset": start, "programs": page}, ensure_ascii=False, separators=(",", ":"))
+            await ctx.report_progress(start + len(page), total, message=message)
+            pages += 1
+        response.update({"programs": [], "streamed": True, "pages": pages, "offset": offset, "page_size": page_size})
+        return response
+
+    end = offset + page_size
+    response.update({
+        "programs": programs[offset:end],
+        "offset": offset,
+        "page_size": page_size,
+        "next_cursor": _encode_cursor(program_type, params, end, page_size) if end < total else None
+    })
+    return response
+
+
+def _count_atlas_section_errors(result: dict) -> tuple[int, int]:
+    """
+    Count atlas sections that came back as error dictionaries.
+
+    yokatlas-py reports per-section failures inline (e.g. {"error": "Failed to fetch ..."})
+    instead of raising, so the payload has to be inspected.
+
+    Args:
+        result: Payload returned by fetch_all_details()
+
+    Returns:
+        Tuple of (failed sections, sections with data)
+    """
+    failed = 0
+    present = 0
+    for group in ("girdi_gostergeleri", "surec_ve_cikti_gostergeleri"):
+        sections = result.get(group)
+        if not isinstance(sections, dict):
+            continue
+        for value in sections.values():
+            if isinstance(value, dict) and "error" in value:
+                failed += 1
+            elif value:
+                present += 1
+    return failed, present
+
+
+def _atlas_fetch_failed(result: Any) -> bool:
+    """Whether an atlas payload failed as a whole (every fetched section is an error)."""
+    if not isinstance(result, dict):
+        return True
+    failed, present = _count_atlas_section_errors(result)
+    return failed > 0 and present == 0
+
+
+def _atlas_store_key(program_type: str, yop_kodu: str, year: int, sections: Optional[tuple[str, ...]] = None) -> str:
+    """Key of an atlas payload in the shared store (sections: projection, None for the full payload)."""
+    return ":".join([program_type, yop_kodu, str(year)] + list(sections or ()))
+
+
+def _atlas_cache_ttl(year: int, result: dict) -> float:
+    """
+    Decide how long an atlas payload may be cached.
+
+    Past years are effectively immutable and get a long TTL; the current year
+    (and payloads with partially failed sections) get a short one. Error
+    payloads are not cached at all.
+
+    Args:
+        year: Data year of the payload
+        result: Payload returned by _load_atlas_details
+
+    Returns:
+        TTL in seconds (0 means do not cache)
+    """
+    if not isinstance(result, dict) or "error" in result:
+        return 0
+
+    failed, present = _count_atlas_section_errors(result)
+    if failed and not present:
+        return 0
+    if failed or year >= datetime.date.today().year:
+        return _ATLAS_TTL_CURRENT_YEAR
+    return _ATLAS_TTL_PAST_YEAR
+
+
+def _project_atlas_sections(result: dict, sections: tuple[str, ...]) -> dict:
+    """
+    Reduce an atlas payload to the requested sections.
+
+    Args:
+        result: Payload returned by fetch_all_details() (full or partial)
+        sections: Section (fetcher) keys to keep
+
+    Returns:
+        Payload with only the requested sections, or the input unchanged if it is an error
+    """
+    if not isinstance(result, dict) or "error" in result:
+        return result
+
+    wanted = set(sections)
+    projected: dict[str, Any] = {}
+    for group in ("girdi_gostergeleri", "surec_ve_cikti_gostergeleri"):
+        values = result.get(group)
+        if isinstance(values, dict):
+            projected[group] = {
+                key: value for key, value in values.items()
+                if _ATLAS_DERIVED_KEYS.get(key, key) in wanted
+            }
+
+    fetch_errors = {key: value for key, value in (result.get("fetch_errors") or {}).items() if key in wanted}
+    if fetch_errors:
+        projected["fetch_errors"] = fetch_errors
+    projected["sections"] = list(sections)
+    return projected
+
+
+async def _load_atlas_details(
     atlas_class: type,
     yop_kodu: str,
     year: int,
-    program_type: str
+    program_type: str,
+    sections: Optional[tuple[str, ...]] = None
 ) -> dict:
     """
-    Fetch detailed atlas information for a program.
+    Fetch detailed atlas information for a program from YOKATLAS (uncached).
 
     Args:
         atlas_class: Atlas class to use (YOKATLASLisansAtlasi or YOKATLASOnlisansAtlasi)
         yop_kodu: Program YOP code
         year: Data year
         program_type: Type of program for logging
+        sections: Only fetch these sections (None fetches all)
 
     Returns:
         Atlas details dictionary or error dictionary
     """
+    _upstream_http.async_client()
+    keys = list(sections) if sections else "all"
     try:
-        atlas = atlas_class({'program_id': yop_kodu, 'year': year})
-        result = await atlas.fetch_all_details()
-        return result
+        # Each fetched section is one upstream request
+        async with _metrics.track_upstream("atlas"):
+            return await _atlas_guard.call(
+                lambda: atlas_class({'program_id': yop_kodu, 'year': year}, keys=keys).fetch_all_details(),
+                is_failure=_atlas_fetch_failed,
+                cost=len(sections) if sections else len(_ATLAS_SECTION_KEYS)
+            )
+    except UpstreamUnavailable:
+        # Handled by _fetch_atlas_details, which may serve a stale copy
+        raise
     except ValueError as e:
         logger.error(f"Invalid parameter for {program_type} atlas: {e}")
         return {"error": "Invalid parameter", "details": str(e), "program_id": yop_kodu, "year": year}
@@ -186,6 +915,439 @@ async def _fetch_atlas_details(
         return {"error": "Internal error", "details": str(e), "program_id": yop_kodu, "year": year}
 
 
+async def _fetch_atlas_details(
+    atlas_class: type,
+    yop_kodu: str,
+    year: int,
+    program_type: str,
+    sections: Optional[tuple[str, ...]] = None
+) -> dict:
+    """
+    Fetch detailed atlas information for a program, served from the response cache when possible.
+
+    Concurrent calls for the same (program_type, yop_kodu, year) share one upstream fetch.
+    When the snapshot store is enabled, memory misses are read through it. An
+    expired entry is returned as is while it is re-fetched in the background.
+
+    With `sections`, a cached full payload is projected down to those sections;
+    otherwise only the requested sections are fetched upstream and cached
+    under their own key.
+
+    Args:
+        atlas_class: Atlas class to use (YOKATLASLisansAtlasi or YOKATLASOnlisansAtlasi)
+        yop_kodu: Program YOP code
+        year: Data year
+        program_type: Type of program for logging
+        sections: Section keys to return (None returns the full payload)
+
+    Returns:
+        Atlas details dictionary or error dictionary
+    """
+    cache_key = (program_type, yop_kodu, year)
+    if sections:
+        sections = tuple(sorted(set(sections)))
+        full = _atlas_cache.peek(cache_key)
+        if full is not None:
+            return _project_atlas_sections(full, sections)
+        cache_key += (sections,)
+
+    store_key = _atlas_store_key(program_type, yop_kodu, year, sections)
+
+    def ttl(result: dict) -> float:
+        return _atlas_cache_ttl(year, result)
+
+    # Cached payloads share their repeated labels and values via compact_payload()
+    async def fetch() -> dict:
+        result = await _load_atlas_details(atlas_class, yop_kodu, year, program_type, sections)
+        if _store is not None:
+            await _store.aput("atlas", store_key, result, ttl(result))
+        return compact_payload(result)
+
+    async def stored() -> Optional[dict]:
+        result = await _store.aget("atlas", store_key)
+        return compact_payload(result) if result is not None else None
+
+    async def load() -> dict:
+        if _store is None:
+            return await fetch()
+        result = await stored()
+        if result is None:
+            result = await _fetch_once_across_workers("atlas", store_key, fetch, stored)
+        return result
+
+    async def refresh() -> None:
+        # Only one worker refreshes a program; the others pick it up from the store
+        async with _worker_lease("atlas", store_key) as leader:
+            if leader:
+                await _atlas_cache.refresh(cache_key, fetch, ttl)
+
+    _refresher.record(
+        cache_key, refresh, lambda: _atlas_cache.expires_in(cache_key),
+        cost=len(sections) if sections else len(_ATLAS_SECTION_KEYS)
+    )
+
+    stale = False
+    result = None
+    if (_atlas_cache.expires_in(cache_key) or 0) < 0:
+        # Answer with the expired entry now and re-fetch it in the background
+        result = _atlas_cache.get_stale(cache_key)
+        if result is not None:
+            _refresher.revalidate(cache_key, lambda: _atlas_cache.refresh(cache_key, load, ttl))
+
+    try:
+        if result is None:
+            result = await _atlas_cache.get_or_load(cache_key, load, ttl=ttl)
+    except UpstreamUnavailable as e:
+        logger.error(f"YOKATLAS unavailable for {program_type} atlas {yop_kodu}/{year}: {e}")
+        # Serve the last good copy: this key, the full payload, or the on-disk snapshot
+        result = _atlas_cache.get_stale(cache_key)
+        if result is None and sections:
+            full = _atlas_cache.get_stale((program_type, yop_kodu, year))
+            result = _project_atlas_sections(full, sections) if full is not None else None
+        if result is None and _store is not None:
+            result = await _store.aget("atlas", store_key, allow_stale=True)
+        if result is None:
+            error = {"error": "YOKATLAS unavailable", "details": str(e), "program_id": yop_kodu, "year": year}
+            if getattr(e, "retry_after", None) is not None:
+                error["retry_after"] = round(e.retry_after, 1)
+            return error
+        stale = True
+
+    if sections:
+        result = _project_atlas_sections(result, sections)
+    return dict(result, stale=True) if stale else result
+
+
+async def _fetch_atlas_batch(
+    items: List[tuple[str, str, int]],
+    concurrency: int,
+    ctx: Optional[Context] = None,
+    sections: Optional[tuple[str, ...]] = None
+) -> dict:
+    """
+    Fetch atlas details for many (program_type, yop_kodu, year) items concurrently.
+
+    Each item goes through _fetch_atlas_details (and therefore the caches), with at
+    most `concurrency` fetches in flight. A failure in one item never affects the others.
+
+    Args:
+        items: List of (program_type, yop_kodu, year) tuples
+        concurrency: Maximum number of concurrent fetches
+        ctx: MCP context used to report progress as items complete (optional)
+        sections: Section keys to fetch for every item (None fetches all)
+
+    Returns:
+        Dictionary mapping each item tuple to its atlas details or error dictionary
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch_one(item: tuple[str, str, int]) -> tuple[tuple[str, str, int], dict]:
+        program_type, yop_kodu, year = item
+        async with semaphore:
+            try:
+                result = await _fetch_atlas_details(_atlas_class(program_type), yop_kodu, year, program_type, sections)
+            except Exception as e:
+                logger.exception(f"Unexpected error in batch fetch for {program_type} {yop_kodu}/{year}")
+                result = {"error": "Internal error", "details": str(e), "program_id": yop_kodu, "year": year}
+        return item, result
+
+    results = {}
+    total = len(items)
+    for done, next_result in enumerate(asyncio.as_completed([fetch_one(item) for item in items]), start=1):
+        item, result = await next_result
+        results[item] = result
+        if ctx is not None:
+            status = "error" if "error" in result else "ok"
+            await ctx.report_progress(done, total, message=f"{item[1]}/{item[2]}: {status}")
+    return results
+
+
+def _get_report_pool() -> ProcessPoolExecutor:
+    """Return the PDF worker pool, creating it on first use."""
+    global _report_pool
+    if _report_pool is None:
+        # Spawned (not forked) workers, since the server process runs threads
+        import multiprocessing
+        _report_pool = ProcessPoolExecutor(
+            max_workers=_REPORT_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _report_pool
+
+
+def _prune_reports() -> None:
+    """Delete report files older than the retention period."""
+    if _REPORT_RETENTION <= 0:
+        return
+    cutoff = time.time() - _REPORT_RETENTION
+    try:
+        entries = list(os.scandir(_REPORT_DIR))
+    except OSError:
+        return
+    for entry in entries:
+        try:
+            if entry.name.endswith((".pdf", ".zip")) and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+        except OSError:
+            continue
+
+
+def _report_filename(report_type: str, extension: str) -> str:
+    """Unique file name for a report written to the report directory."""
+    timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
+    return f"YOKATLAS_{report_type}_{timestamp}_{uuid.uuid4().hex[:8]}.{extension}"
+
+
+def _report_busy_error() -> Optional[dict]:
+    """Error dictionary when the report queue is full, otherwise None."""
+    if _report_pending >= _REPORT_MAX_PENDING:
+        return {
+            "error": "Too many reports in progress",
+            "details": f"At most {_REPORT_MAX_PENDING} reports can be queued; retry shortly"
+        }
+    return None
+
+
+async def _run_in_report_pool(func: callable, *args) -> Any:
+    """
+    Run a render function in the PDF worker pool, waiting for a free render slot.
+
+    A crashed worker breaks the whole pool; it is dropped so the next call
+    starts a fresh one, and BrokenProcessPool is re-raised.
+    """
+    global _report_pool
+    async with _report_slots:
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(_get_report_pool(), func, *args)
+        except BrokenProcessPool:
+            _report_pool = None
+            raise
+
+
+async def _render_report(data: dict, report_type: str, title: str, high_volume: Optional[bool] = None) -> dict:
+    """
+    Render a PDF report in the worker pool and write it to the report directory.
+
+    Args:
+        data: Search response or atlas details payload
+        report_type: Report type understood by yokatlas_pdf_generator
+        title: Report title
+        high_volume: Plain-row rendering for search tables (None decides by row count)
+
+    Returns:
+        Dictionary with the report file name, path, size and resource URI, or an error dictionary
+    """
+    global _report_pending
+    busy = _report_busy_error()
+    if busy:
+        return busy
+
+    from yokatlas_pdf_generator import render_pdf
+
+    filename = _report_filename(report_type, "pdf")
+    path = os.path.join(_REPORT_DIR, filename)
+
+    programs = data.get("programs") if isinstance(data, dict) else None
+    if isinstance(programs, list):
+        # Interned record strings are pickled once per report, not once per row
+        data = dict(data, programs=to_records(programs))
+
+    _report_pending += 1
+    try:
+        result = await _run_in_report_pool(render_pdf, data, report_type, path, title, high_volume)
+    except BrokenProcessPool as e:
+        logger.error(f"PDF worker pool broke while rendering {report_type}: {e}")
+        return {"error": "PDF rendering failed", "details": "Report worker crashed; retry the request"}
+    except Exception as e:
+        logger.exception(f"Error rendering {report_type} report")
+        return {"error": "PDF rendering failed", "details": str(e)}
+    finally:
+        _report_pending -= 1
+
+    await asyncio.to_thread(_prune_reports)
+    return {
+        "filename": filename,
+        "path": result["path"],
+        "size_bytes": result["size_bytes"],
+        "resource_uri": f"yokatlas://reports/{filename}"
+    }
+
+
+def _zip_reports(parts: List[tuple[str, str]], zip_path: str) -> int:
+    """
+    Write PDF files into a zip archive one at a time and return its size.
+
+    PDFs are already compressed, so members are stored rather than deflated.
+
+    Args:
+        parts: List of (archive member name, file path) pairs
+        zip_path: Destination archive path
+    """
+    tmp_path = zip_path + ".tmp"
+    try:
+        with zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_STORED) as archive:
+            for name, path in parts:
+                archive.write(path, arcname=name)
+        os.replace(tmp_path, zip_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return os.path.getsize(zip_path)
+
+
+async def _render_report_batch(
+    items: List[tuple[str, dict]],
+    report_type: str,
+    title: str,
+    output_format: str,
+    ctx: Optional[Context] = None
+) -> dict:
+    """
+    Render many programs' details as one PDF with a table of contents, or as a zip of PDFs.
+
+    The combined PDF is laid out by a single worker (the table of contents
+    needs the whole document); zip members are rendered in parallel across
+    the worker pool. A batch counts as one pending report.
+
+    Args:
+        items: List of (heading, atlas details payload) pairs
+        report_type: 'bachelor_details' or 'associate_details'
+        title: Report title
+        output_format: 'pdf' or 'zip'
+        ctx: MCP context used to report progress as zip members complete (optional)
+
+    Returns:
+        Dictionary with the output file name, path, size and resource URI, or an error dictionary
+    """
+    global _report_pending
+    busy = _report_busy_error()
+    if busy:
+        return busy
+
+    from yokatlas_pdf_generator import render_pdf, render_pdf_batch
+
+    filename = _report_filename(f"{report_type}_batch", output_format)
+    path = os.path.join(_REPORT_DIR, filename)
+
+    _report_pending += 1
+    try:
+        if output_format == "pdf":
+            result = await _run_in_report_pool(render_pdf_batch, items, report_type, path, title)
+            size = result["size_bytes"]
+        else:
+            os.makedirs(_REPORT_DIR, exist_ok=True)
+            parts_dir = tempfile.mkdtemp(prefix=".batch-", dir=_REPORT_DIR)
+            try:
+                parts = []
+                jobs = []
+                for position, (heading, data) in enumerate(items, start=1):
+                    name = f"{position:03d}_{re.sub(r'[^0-9A-Za-z_-]+', '_', heading).strip('_')}.pdf"
+                    part_path = os.path.join(parts_dir, name)
+                    parts.append((name, part_path))
+                    jobs.append(_run_in_report_pool(render_pdf, data, report_type, part_path, heading))
+
+                for done, job in enumerate(asyncio.as_completed(jobs), start=1):
+                    await job
+                    if ctx is not None:
+                        await ctx.report_progress(done, len(jobs), message=f"rendered {done}/{len(jobs)}")
+
+                size = await asyncio.to_thread(_zip_reports, parts, path)
+            finally:
+                await asyncio.to_thread(shutil.rmtree, parts_dir, True)
+    except BrokenProcessPool as e:
+        logger.error(f"PDF worker pool broke while rendering {report_type} batch: {e}")
+        return {"error": "PDF rendering failed", "details": "Report worker crashed; retry the request"}
+    except Exception as e:
+        logger.exception(f"Error rendering {report_type} batch report")
+        return {"error": "PDF rendering failed", "details": str(e)}
+    finally:
+        _report_pending -= 1
+
+    await asyncio.to_thread(_prune_reports)
+    scheme = "reports" if output_format == "pdf" else "archives"
+    return {
+        "filename": filename,
+        "path": path,
+        "size_bytes": size,
+        "programs": len(items),
+        "resource_uri": f"yokatlas://{scheme}/{filename}"
+    }
+
+
+# =============================================================================
+# Tool Scheduling
+# =============================================================================
+
+# Tool calls are admitted by a priority scheduler (YOKATLAS_MCP_TOOL_*) with
+# per-client concurrency and rate quotas (YOKATLAS_MCP_CLIENT_*), so one busy
+# client cannot starve the others. Clients are keyed on their address, or on
+# the X-Client-Id header set by a trusted reverse proxy
+# (YOKATLAS_MCP_TRUSTED_PROXY). Calls that cannot be queued are answered
+# with a "Server busy" / "Rate limit exceeded" error and a retry_after hint.
+_scheduler = ToolScheduler(
+    max_concurrency=env_int("TOOL_CONCURRENCY", 32, minimum=1),
+    max_queue=env_int("TOOL_QUEUE", 128),
+    client_concurrency=env_int("CLIENT_CONCURRENCY", 8, minimum=1),
+    client_queue=env_int("CLIENT_QUEUE", 32),
+    client_rate=env_float("CLIENT_RATE_LIMIT", 10.0, minimum=0.01),
+    client_burst=env_float("CLIENT_RATE_BURST", 30.0, minimum=1.0),
+    max_wait=env_float("TOOL_QUEUE_TIMEOUT", 30.0, minimum=0.1)
+)
+
+_REPORT_TOOLS = {"generate_pdf_report", "generate_batch_pdf_report"}
+_SEARCH_TOOLS = {"search_bachelor_degree_programs", "search_associate_degree_programs", "query_programs"}
+_ATLAS_TOOLS = {
+    "get_bachelor_degree_atlas_details": "bachelor",
+    "get_associate_degree_atlas_details": "associate_degree"
+}
+# Multi-program calls fetching more program/years than this are scheduled as bulk work
+_BULK_ITEMS = 20
+
+
+def _call_priority(tool: str, arguments: dict) -> int:
+    """
+    Estimate how expensive a tool call is from its arguments, for the scheduler.
+
+    Calls that will be answered from memory (cached atlas payloads, the offline
+    index, later pages of a search) are interactive; PDF renders and large
+    multi-program or large-limit calls are bulk; everything else is normal.
+    """
+    if tool in _REPORT_TOOLS:
+        return PRIORITY_BULK
+
+    if tool in _ATLAS_TOOLS:
+        key = (_ATLAS_TOOLS[tool], arguments.get("yop_kodu"), arguments.get("year"))
+        return PRIORITY_INTERACTIVE if _atlas_cache.peek(key) is not None else PRIORITY_NORMAL
+
+    if tool in _SEARCH_TOOLS:
+        program_type = arguments.get("program_type") or (
+            "associate_degree" if tool == "search_associate_degree_programs" else "bachelor"
+        )
+        if arguments.get("cursor") or _program_indexes.get(program_type) is not None:
+            return PRIORITY_INTERACTIVE
+        limit = arguments.get("results_limit") or arguments.get("limit") or 50
+        return PRIORITY_BULK if limit > 100 else PRIORITY_NORMAL
+
+    if tool == "get_atlas_details_batch":
+        codes = len(arguments.get("bachelor_codes") or []) + len(arguments.get("associate_codes") or [])
+        items = codes * len(arguments.get("years") or [1])
+    elif tool == "compare_programs":
+        years = (arguments.get("end_year") or 2025) - (arguments.get("start_year") or 2023) + 1
+        items = len(arguments.get("yop_kodlari") or []) * max(years, 1)
+    elif tool == "get_program_trend":
+        items = (arguments.get("end_year") or 2025) - (arguments.get("start_year") or 2022) + 1
+    else:
+        return PRIORITY_NORMAL
+    return PRIORITY_BULK if items > _BULK_ITEMS else PRIORITY_NORMAL
+
+
+app.add_middleware(SchedulerMiddleware(
+    _scheduler, _call_priority,
+    identify=functools.partial(client_key, trust_client_id=env_bool("TRUSTED_PROXY", False))
+))
+
+
 # =============================================================================
 # MCP Tools
 # =============================================================================
@@ -193,7 +1355,8 @@ async def _fetch_atlas_details(
 @app.tool()
 async def get_associate_degree_atlas_details(
     yop_kodu: str = Field(description="Program YÖP code (e.g., '120910060') - unique identifier for the associate degree program"),
-    year: int = Field(description="Data year for statistics (e.g., 2025, 2024, 2023)", ge=2020, le=2030)
+    year: int = Field(description="Data year for statistics (e.g., 2025, 2024, 2023)", ge=2020, le=2030),
+    sections: List[AtlasSection] = Field(default=[], description="Only return these sections (e.g., ['genel_bilgiler', 'taban_puan_ve_basari_sirasi_istatistikleri']); empty returns everything. Unrequested sections are not fetched.")
 ) -> dict:
     """
     Get comprehensive details for a specific associate degree program from YOKATLAS Atlas.
@@ -201,6 +1364,8 @@ async def get_associate_degree_atlas_details(
     Parameters:
     - yop_kodu (str): Program YÖP code (e.g., '120910060')
     - year (int): Data year (e.g., 2025, 2024, 2023)
+    - sections (list[str]): Optional subset of sections to fetch and return; use it
+      when only e.g. general info or base scores are needed (much smaller response)
 
     Returns detailed information including:
     - General program information and statistics
@@ -209,13 +1374,14 @@ async def get_associate_degree_atlas_details(
     - Academic staff and facility information
     - Historical placement trends
     """
-    return await _fetch_atlas_details(YOKATLASOnlisansAtlasi, yop_kodu, year, "associate_degree")
+    return await _fetch_atlas_details(_atlas_class("associate_degree"), yop_kodu, year, "associate_degree", tuple(sections) or None)
 
 
 @app.tool()
 async def get_bachelor_degree_atlas_details(
     yop_kodu: str = Field(description="Program YÖP code (e.g., '102210277') - unique identifier for the bachelor's degree program"),
-    year: int = Field(description="Data year for statistics (e.g., 2025, 2024, 2023)", ge=2020, le=2030)
+    year: int = Field(description="Data year for statistics (e.g., 2025, 2024, 2023)", ge=2020, le=2030),
+    sections: List[AtlasSection] = Field(default=[], description="Only return these sections (e.g., ['genel_bilgiler', 'taban_puan_ve_basari_sirasi_istatistikleri']); empty returns everything. Unrequested sections are not fetched.")
 ) -> dict:
     """
     Get comprehensive details for a specific bachelor's degree program from YOKATLAS Atlas.
@@ -223,6 +1389,8 @@ async def get_bachelor_degree_atlas_details(
     Parameters:
     - yop_kodu (str): Program YÖP code (e.g., '102210277')
     - year (int): Data year (e.g., 2025, 2024, 2023)
+    - sections (list[str]): Optional subset of sections to fetch and return; use it
+      when only e.g. general info or base scores are needed (much smaller response)
 
     Returns detailed information including:
     - General program information and statistics
@@ -231,11 +1399,222 @@ async def get_bachelor_degree_atlas_details(
     - Academic staff and facility information
     - Historical placement trends
     """
-    return await _fetch_atlas_details(YOKATLASLisansAtlasi, yop_kodu, year, "bachelor")
+    return await _fetch_atlas_details(_atlas_class("bachelor"), yop_kodu, year, "bachelor", tuple(sections) or None)
 
 
 @app.tool()
-def search_bachelor_degree_programs(
+async def get_atlas_details_batch(
+    bachelor_codes: List[str] = Field(default=[], description="Bachelor's degree program YÖP codes (e.g., ['102210277', '102210356'])"),
+    associate_codes: List[str] = Field(default=[], description="Associate degree program YÖP codes (e.g., ['120910060'])"),
+    years: List[Annotated[int, Field(ge=2020, le=2030)]] = Field(default=[2025], min_length=1, max_length=11, description="Data years to fetch for every program (e.g., [2025, 2024])"),
+    sections: List[AtlasSection] = Field(default=[], description="Only return these sections for every program; empty returns everything"),
+    ctx: Optional[Context] = None
+) -> dict:
+    """
+    Get atlas details for many bachelor's and associate degree programs in one call.
+
+    Programs are fetched concurrently; use this instead of repeated
+    get_*_atlas_details calls when comparing several programs.
+
+    Parameters:
+    - bachelor_codes (list[str]): Bachelor's program YÖP codes
+    - associate_codes (list[str]): Associate degree program YÖP codes
+    - years (list[int]): Data years fetched for every program (e.g., [2025, 2024])
+    - sections (list[str]): Optional subset of sections to fetch and return
+
+    Returns:
+    - results: Atlas details keyed by YÖP code, then by year
+    - errors: Per-program, per-year error details (other items are unaffected)
+    - Progress notifications are sent as each program/year completes
+    """
+    items = []
+    seen = set()
+    for program_type, codes in (("bachelor", bachelor_codes), ("associate_degree", associate_codes)):
+        for yop_kodu in codes:
+            for year in years:
+                item = (program_type, str(yop_kodu).strip(), year)
+                if item[1] and item not in seen:
+                    seen.add(item)
+                    items.append(item)
+
+    if not items:
+        return {"error": "No programs requested", "details": "Provide at least one code in bachelor_codes or associate_codes"}
+    if len(items) > _BATCH_MAX_ITEMS:
+        return {
+            "error": "Too many items",
+            "details": f"{len(items)} program/year pairs requested, the limit is {_BATCH_MAX_ITEMS}"
+        }
+
+    fetched = await _fetch_atlas_batch(items, _BATCH_CONCURRENCY, ctx, tuple(sections) or None)
+
+    results: dict[str, dict] = {}
+    errors: dict[str, dict] = {}
+    for (program_type, yop_kodu, year), result in fetched.items():
+        if "error" in result:
+            errors.setdefault(yop_kodu, {})[str(year)] = result
+        else:
+            entry = results.setdefault(yop_kodu, {"program_type": program_type, "years": {}})
+            entry["years"][str(year)] = result
+
+    return {
+        "results": results,
+        "errors": errors,
+        "total_requested": len(items),
+        "succeeded": len(items) - sum(len(e) for e in errors.values()),
+        "failed": sum(len(e) for e in errors.values())
+    }
+
+
+@app.tool()
+async def get_program_trend(
+    yop_kodu: str = Field(description="Program YÖP code (e.g., '102210277')"),
+    program_type: Literal['bachelor', 'associate_degree'] = Field(default='bachelor', description="Program type: bachelor (lisans) or associate_degree (önlisans)"),
+    start_year: int = Field(default=2022, ge=2020, le=2030, description="First year of the series"),
+    end_year: int = Field(default=2025, ge=2020, le=2030, description="Last year of the series")
+) -> dict:
+    """
+    Get a multi-year trend of quota, placements, base score and success rank for one program.
+
+    All years are fetched concurrently. Past years are served from the cache
+    once fetched; only the current year is periodically re-fetched.
+
+    Parameters:
+    - yop_kodu (str): Program YÖP code
+    - program_type (str): 'bachelor' or 'associate_degree'
+    - start_year (int): First year (e.g., 2022)
+    - end_year (int): Last year (e.g., 2025)
+
+    Returns a compact time series:
+    - years: List of years
+    - quota, placed, base_score, success_rank: Values per year (same order, null if unavailable)
+    - base_score_change, success_rank_change: Difference between first and last available year
+    - errors: Years that could not be fetched
+    """
+    if start_year > end_year:
+        return {"error": "Invalid year range", "details": f"start_year ({start_year}) is after end_year ({end_year})"}
+
+    yop_kodu = yop_kodu.strip()
+    items = [(program_type, yop_kodu, year) for year in range(start_year, end_year + 1)]
+    fetched = await _fetch_atlas_batch(items, _BATCH_CONCURRENCY, sections=("taban_puan_ve_basari_sirasi_istatistikleri",))
+
+    points = {}
+    errors = {}
+    for (_, _, year), details in fetched.items():
+        if "error" in details:
+            errors[str(year)] = details.get("details") or details["error"]
+        else:
+            points[year] = extract_year_metrics(details)
+
+    trend = build_trend(points)
+    trend.update({"yop_kodu": yop_kodu, "program_type": program_type, "errors": errors})
+    return trend
+
+
+@app.tool()
+async def compare_programs(
+    yop_kodlari: List[str] = Field(min_length=1, max_length=50, description="Program YÖP codes to compare (e.g., ['102210277', '102210356'])"),
+    program_type: Literal['bachelor', 'associate_degree'] = Field(default='bachelor', description="Program type: bachelor (lisans) or associate_degree (önlisans)"),
+    start_year: int = Field(default=2023, ge=2020, le=2030, description="First year of the comparison"),
+    end_year: int = Field(default=2025, ge=2020, le=2030, description="Last year of the comparison"),
+    sort_by: List[Literal[
+        'fill_rate', '-fill_rate', 'base_score', '-base_score', 'success_rank', '-success_rank',
+        'rank_percentile', '-rank_percentile', 'base_score_change', '-base_score_change',
+        'success_rank_change', '-success_rank_change', 'quota', '-quota', 'placed', '-placed'
+    ]] = Field(default=['success_rank'], max_length=3, description="Sort keys in priority order; '-' prefix sorts descending"),
+    ctx: Optional[Context] = None
+) -> dict:
+    """
+    Compare several programs on fill rate, score trend and rank in one call.
+
+    Every program/year is fetched concurrently (from the caches where possible)
+    and the derived metrics are computed server-side, so there is no need to
+    fetch each program's atlas details and do the arithmetic yourself.
+
+    Parameters:
+    - yop_kodlari (list[str]): Program YÖP codes (up to 50)
+    - program_type (str): 'bachelor' or 'associate_degree'
+    - start_year (int): First year (e.g., 2023)
+    - end_year (int): Last year (e.g., 2025)
+    - sort_by (list[str]): Sort keys (fill_rate, base_score, success_rank, rank_percentile,
+      base_score_change, success_rank_change, quota, placed), '-' for descending
+
+    Returns a ranked table:
+    - programs: One row per program with university, program, score_type, the latest
+      year with data and its quota, placed, fill_rate (doluluk oranı = placed / quota),
+      base_score and success_rank; rank_percentile (share of programs of the same
+      score type with a worse success rank in that year, 100 = best) and its
+      rank_percentile_scope ('catalog' or 'compared'); base_score_change and
+      success_rank_change (first to last available year); base_score_yoy and
+      success_rank_yoy (year-over-year changes, aligned with yoy_periods)
+    - rank_percentile_scope: Per score type, 'catalog' (all indexed programs),
+      'compared' (these programs only) or 'mixed' (rows of both)
+    - errors: Program/years that could not be fetched
+    """
+    if start_year > end_year:
+        return {"error": "Invalid year range", "details": f"start_year ({start_year}) is after end_year ({end_year})"}
+
+    codes = list(dict.fromkeys(code.strip() for code in yop_kodlari if code.strip()))
+    years = list(range(start_year, end_year + 1))
+    items = [(program_type, code, year) for code in codes for year in years]
+    if not items:
+        return {"error": "No programs requested", "details": "Provide at least one YÖP code in yop_kodlari"}
+    if len(items) > _BATCH_MAX_ITEMS:
+        return {
+            "error": "Too many items",
+            "details": f"{len(items)} program/year pairs requested, the limit is {_BATCH_MAX_ITEMS}"
+        }
+
+    # Names and score types come from the offline index when it has the program,
+    # otherwise from the latest year's general information section
+    index = await _get_program_index(program_type)
+    programs: dict[str, dict] = {}
+    info_items = []
+    for code in codes:
+        record = index.find(code) if index is not None else None
+        if record is not None:
+            programs[code] = {
+                "university": record.uni_adi,
+                "program": record.program_adi,
+                "score_type": (record.puan_turu or "").upper() or None,
+            }
+        else:
+            info_items.append((program_type, code, end_year))
+
+    fetched, info = await asyncio.gather(
+        _fetch_atlas_batch(items, _BATCH_CONCURRENCY, ctx, sections=("taban_puan_ve_basari_sirasi_istatistikleri",)),
+        _fetch_atlas_batch(info_items, _BATCH_CONCURRENCY, sections=("genel_bilgiler",))
+    )
+
+    errors: dict[str, dict] = {}
+    for code in codes:
+        programs.setdefault(code, {"university": None, "program": None, "score_type": None})["points"] = {}
+    for (_, code, year), details in fetched.items():
+        if "error" in details:
+            errors.setdefault(code, {})[str(year)] = details.get("details") or details["error"]
+        else:
+            programs[code]["points"][year] = extract_year_metrics(details)
+    for (_, code, _), details in info.items():
+        if "error" not in details:
+            programs[code].update(extract_program_info(details))
+
+    rank_pools = None
+    if index is not None:
+        from yokatlas_compare import catalog_rank_pools
+
+        # Every program is ranked against the catalog of its own latest year with data
+        rank_pools = await asyncio.to_thread(
+            lambda: {year: pools for year in years if (pools := catalog_rank_pools(index.table, str(year)))}
+        )
+
+    from yokatlas_compare import compare_programs as compare
+
+    result = await asyncio.to_thread(compare, programs, years, sort_by, rank_pools)
+    result.update({"program_type": program_type, "sort_by": sort_by, "errors": errors})
+    return result
+
+
+@app.tool()
+async def search_bachelor_degree_programs(
     university: Optional[str] = Field(default='', description="University name with fuzzy matching support (e.g., 'boğaziçi' → 'BOĞAZİÇİ ÜNİVERSİTESİ')"),
     program: Optional[str] = Field(default='', description="Program/department name with partial matching (e.g., 'bilgisayar' finds all computer programs)"),
     city: Optional[str] = Field(default='', description="City name where the university is located"),
@@ -244,7 +1623,11 @@ def search_bachelor_degree_programs(
     fee_type: Literal['', 'Ücretsiz', 'Ücretli', 'İÖ-Ücretli', 'Burslu', '%50 İndirimli', '%25 İndirimli', 'AÖ-Ücretli', 'UÖ-Ücretli'] = Field(default='', description="Fee status: Ücretsiz (Free), Ücretli (Paid), İÖ-Ücretli (Evening-Paid), Burslu (Scholarship), İndirimli (Discounted), AÖ-Ücretli (Open Education-Paid), UÖ-Ücretli (Distance Learning-Paid)"),
     education_type: Literal['', 'Örgün', 'İkinci', 'Açıköğretim', 'Uzaktan'] = Field(default='', description="Education type: Örgün (Regular), İkinci (Evening), Açıköğretim (Open Education), Uzaktan (Distance Learning)"),
     availability: Literal['', 'Doldu', 'Doldu#', 'Dolmadı', 'Yeni'] = Field(default='', description="Program availability: Doldu (Filled), Doldu# (Filled with conditions), Dolmadı (Not filled), Yeni (New program)"),
-    results_limit: int = Field(default=50, ge=1, le=500, description="Maximum number of results to return")
+    results_limit: int = Field(default=50, ge=1, le=500, description="Maximum number of results to return"),
+    page_size: Optional[int] = Field(default=None, ge=1, le=100, description="Return results in pages of this size with a next_cursor (default: all results in one response)"),
+    cursor: Optional[str] = Field(default=None, description="next_cursor from a previous paginated response; all other filters are taken from the cursor"),
+    stream_pages: bool = Field(default=False, description="With page_size, send every page as a progress notification instead of paging with cursors"),
+    ctx: Optional[Context] = None
 ) -> dict:
     """
     Search for bachelor's degree programs with smart fuzzy matching and user-friendly parameters.
@@ -264,6 +1647,9 @@ def search_bachelor_degree_programs(
     - fee_type: Fee/scholarship information
     - education_type: Type of education (Örgün, İkinci, etc.)
     - results_limit: Maximum number of results to return
+    - page_size: Page size for cursor-based pagination (optional)
+    - cursor: Cursor from a previous page's next_cursor (optional)
+    - stream_pages: Stream pages as progress notifications (optional, requires page_size)
     """
     params = _build_search_params(
         university=university,
@@ -278,11 +1664,13 @@ def search_bachelor_degree_programs(
     )
 
     search_context = {"university": university, "program": program, "city": city}
-    return _execute_search(search_lisans_programs, params, "bachelor", search_context)
+    return await _run_search_tool(
+        _upstream("search_lisans_programs"), "bachelor", params, search_context, page_size, cursor, stream_pages, ctx
+    )
 
 
 @app.tool()
-def search_associate_degree_programs(
+async def search_associate_degree_programs(
     university: Optional[str] = Field(default='', description="University name with fuzzy matching support (e.g., 'anadolu' → 'ANADOLU ÜNİVERSİTESİ')"),
     program: Optional[str] = Field(default='', description="Program name with partial matching (e.g., 'turizm' finds all tourism programs)"),
     city: Optional[str] = Field(default='', description="City name where the university is located"),
@@ -290,7 +1678,11 @@ def search_associate_degree_programs(
     fee_type: Literal['', 'Ücretsiz', 'Ücretli', 'İÖ-Ücretli', 'Burslu', '%50 İndirimli', '%25 İndirimli', 'AÖ-Ücretli', 'UÖ-Ücretli'] = Field(default='', description="Fee status: Ücretsiz (Free), Ücretli (Paid), İÖ-Ücretli (Evening-Paid), Burslu (Scholarship), İndirimli (Discounted), AÖ-Ücretli (Open Education-Paid), UÖ-Ücretli (Distance Learning-Paid)"),
     education_type: Literal['', 'Örgün', 'İkinci', 'Açıköğretim', 'Uzaktan'] = Field(default='', description="Education type: Örgün (Regular), İkinci (Evening), Açıköğretim (Open Education), Uzaktan (Distance Learning)"),
     availability: Literal['', 'Doldu', 'Doldu#', 'Dolmadı', 'Yeni'] = Field(default='', description="Program availability: Doldu (Filled), Doldu# (Filled with conditions), Dolmadı (Not filled), Yeni (New program)"),
-    results_limit: int = Field(default=50, ge=1, le=500, description="Maximum number of results to return")
+    results_limit: int = Field(default=50, ge=1, le=500, description="Maximum number of results to return"),
+    page_size: Optional[int] = Field(default=None, ge=1, le=100, description="Return results in pages of this size with a next_cursor (default: all results in one response)"),
+    cursor: Optional[str] = Field(default=None, description="next_cursor from a previous paginated response; all other filters are taken from the cursor"),
+    stream_pages: bool = Field(default=False, description="With page_size, send every page as a progress notification instead of paging with cursors"),
+    ctx: Optional[Context] = None
 ) -> dict:
     """
     Search for associate degree (önlisans) programs with smart fuzzy matching and user-friendly parameters.
@@ -309,6 +1701,9 @@ def search_associate_degree_programs(
     - fee_type: Fee/scholarship information
     - education_type: Type of education (Örgün, İkinci, etc.)
     - results_limit: Maximum number of results to return
+    - page_size: Page size for cursor-based pagination (optional)
+    - cursor: Cursor from a previous page's next_cursor (optional)
+    - stream_pages: Stream pages as progress notifications (optional, requires page_size)
 
     Note: Associate degree programs use TYT scores, not SAY/EA/SOZ/DIL like bachelor programs.
     """
@@ -324,12 +1719,460 @@ def search_associate_degree_programs(
     )
 
     search_context = {"university": university, "program": program, "city": city}
-    return _execute_search(search_onlisans_programs, params, "associate_degree", search_context)
+    return await _run_search_tool(
+        _upstream("search_onlisans_programs"), "associate_degree", params, search_context, page_size, cursor, stream_pages, ctx
+    )
+
+
+@app.tool()
+async def query_programs(
+    program_type: Literal['bachelor', 'associate_degree'] = Field(default='bachelor', description="Program type: bachelor (lisans) or associate_degree (önlisans)"),
+    university: Optional[str] = Field(default='', description="University name with fuzzy matching support"),
+    program: Optional[str] = Field(default='', description="Program/department name with partial matching"),
+    city: Optional[str] = Field(default='', description="City name where the university is located"),
+    score_type: Literal['', 'SAY', 'EA', 'SOZ', 'DIL'] = Field(default='', description="Score type for bachelor programs: SAY, EA, SOZ, DIL (empty = all)"),
+    university_type: Literal['', 'Devlet', 'Vakıf', 'KKTC', 'Yurt Dışı'] = Field(default='', description="University type: Devlet (State), Vakıf (Foundation), KKTC (TRNC), Yurt Dışı (International)"),
+    fee_type: Literal['', 'Ücretsiz', 'Ücretli', 'İÖ-Ücretli', 'Burslu', '%50 İndirimli', '%25 İndirimli', 'AÖ-Ücretli', 'UÖ-Ücretli'] = Field(default='', description="Fee status"),
+    education_type: Literal['', 'Örgün', 'İkinci', 'Açıköğretim', 'Uzaktan'] = Field(default='', description="Education type"),
+    availability: Literal['', 'Doldu', 'Doldu#', 'Dolmadı', 'Yeni'] = Field(default='', description="Program availability"),
+    year: Optional[int] = Field(default=None, ge=2020, le=2030, description="Year whose scores/ranks/quotas are filtered and sorted (default: latest available)"),
+    min_base_score: Optional[float] = Field(default=None, description="Minimum base score (taban puanı)"),
+    max_base_score: Optional[float] = Field(default=None, description="Maximum base score (taban puanı)"),
+    min_success_rank: Optional[int] = Field(default=None, ge=1, description="Minimum success rank (başarı sırası, smaller is better)"),
+    max_success_rank: Optional[int] = Field(default=None, ge=1, description="Maximum success rank (başarı sırası)"),
+    min_quota: Optional[int] = Field(default=None, ge=0, description="Minimum quota (kontenjan)"),
+    max_quota: Optional[int] = Field(default=None, ge=0, description="Maximum quota (kontenjan)"),
+    sort_by: List[Literal['base_score', '-base_score', 'success_rank', '-success_rank', 'quota', '-quota', 'placed', '-placed']] = Field(default=['-base_score'], max_length=4, description="Sort keys in priority order; '-' prefix sorts descending"),
+    limit: int = Field(default=50, ge=1, le=500, description="Maximum number of rows to return")
+) -> dict:
+    """
+    Filter programs by score, success rank and quota ranges and sort them server-side.
+
+    Use this instead of pulling hundreds of search results when the question is
+    e.g. "SAY programs in İstanbul with a success rank between 20000 and 40000,
+    sorted by base score".
+
+    Parameters:
+    - program_type, university, program, city, score_type, university_type,
+      fee_type, education_type, availability: Same filters as the search tools
+    - year: Year whose metrics are used (default: latest available)
+    - min_/max_base_score, min_/max_success_rank, min_/max_quota: Inclusive ranges
+    - sort_by: Sort keys (base_score, success_rank, quota, placed), '-' for descending
+    - limit: Maximum number of rows to return
+
+    Returns compact rows with base_score, success_rank, quota and placed for the
+    selected year, plus the total number of matching programs.
+    """
+    params = _build_search_params(
+        university=university,
+        program=program,
+        city=city,
+        university_type=university_type,
+        fee_type=fee_type,
+        education_type=education_type,
+        availability=availability,
+        results_limit=500,
+        score_type=score_type if program_type == 'bachelor' else None
+    )
+
+    index = await _get_program_index(program_type)
+    if index is not None:
+        table = index.table
+        rows = index.match_ids(params, expand=_expand_index_query(program_type))
+        source = "local_index"
+        truncated = False
+    else:
+        search_func = _upstream("search_lisans_programs" if program_type == 'bachelor' else "search_onlisans_programs")
+        search_context = {"university": university, "program": program, "city": city}
+        response = await _execute_search(search_func, params, program_type, search_context)
+        if "error" in response:
+            return response
+        from yokatlas_query import ProgramTable
+
+        table = ProgramTable(response["programs"])
+        rows = None
+        source = "upstream_search"
+        # The upstream returns at most 500 rows, so filters may not have seen every program
+        truncated = len(response["programs"]) >= params['length']
+
+    year_key = str(year) if year else (table.years[0] if table.years else None)
+    ranges = {
+        metric: bounds for metric, bounds in (
+            ("base_score", (min_base_score, max_base_score)),
+            ("success_rank", (min_success_rank, max_success_rank)),
+            ("quota", (min_quota, max_quota))
+        )
+        if bounds != (None, None)
+    }
+
+    if year_key is None:
+        programs, total = [], 0
+    else:
+        programs, total = await asyncio.to_thread(table.query, year_key, ranges, sort_by, limit, rows)
+
+    return {
+        "programs": programs,
+        "total_matched": total,
+        "returned": len(programs),
+        "year": year_key,
+        "sort_by": sort_by,
+        "source": source,
+        "candidates_truncated": truncated
+    }
+
+
+@app.tool()
+async def generate_pdf_report(
+    report_type: Literal['bachelor_search', 'associate_search', 'bachelor_details', 'associate_details'] = Field(description="Kind of report to render"),
+    data: Optional[dict] = Field(default=None, description="Response of a search tool (for *_search) or of an atlas details tool (for *_details)"),
+    yop_kodu: Optional[str] = Field(default=None, description="For *_details reports: program YÖP code to fetch instead of passing data"),
+    year: int = Field(default=2025, ge=2020, le=2030, description="Data year used together with yop_kodu"),
+    title: Optional[str] = Field(default=None, description="Report title (default: 'YOKATLAS Raporu')"),
+    high_volume: Optional[bool] = Field(default=None, description="Fast plain-row layout for large search tables (default: automatic above 250 rows)")
+) -> dict:
+    """
+    Render a PDF report of search results or program atlas details.
+
+    The PDF is rendered in a background worker process and written to the
+    server's report directory; the response carries its path and a
+    yokatlas://reports/... resource URI instead of the file contents.
+
+    Parameters:
+    - report_type (str): 'bachelor_search', 'associate_search', 'bachelor_details' or 'associate_details'
+    - data (dict): Output of search_*_programs or get_*_atlas_details
+    - yop_kodu (str): For details reports, fetch this program instead of passing data
+    - year (int): Data year for yop_kodu
+    - title (str): Report title
+    - high_volume (bool): Fast plain-row table layout for large search results
+
+    Returns:
+    - filename, path, size_bytes: The written PDF file
+    - resource_uri: Resource URI to read the PDF through MCP
+    """
+    if data is None:
+        if not yop_kodu or not report_type.endswith("_details"):
+            return {"error": "Missing data", "details": "Pass data, or yop_kodu for a details report"}
+        program_type = "bachelor" if report_type == "bachelor_details" else "associate_degree"
+        yop_kodu = yop_kodu.strip()
+        data = await _fetch_atlas_details(_atlas_class(program_type), yop_kodu, year, program_type, _REPORT_SECTIONS)
+        if "error" in data:
+            return data
+        title = title or f"YOKATLAS Raporu - {yop_kodu} ({year})"
+    elif "error" in data:
+        return {"error": "Invalid data", "details": "data is an error response"}
+
+    return await _render_report(data, report_type, title or "YOKATLAS Raporu", high_volume)
+
+
+@app.tool()
+async def generate_batch_pdf_report(
+    program_type: Literal['bachelor', 'associate_degree'] = Field(default='bachelor', description="Program type: bachelor (lisans) or associate_degree (önlisans)"),
+    yop_codes: Optional[List[str]] = Field(default=None, description="Program YÖP codes to fetch and include"),
+    year: int = Field(default=2025, ge=2020, le=2030, description="Data year for yop_codes"),
+    details: Optional[List[dict]] = Field(default=None, description="Already fetched atlas details payloads (outputs of get_*_atlas_details) to include"),
+    output_format: Literal['pdf', 'zip'] = Field(default='pdf', description="pdf: one combined PDF with a table of contents; zip: one PDF per program in a zip archive"),
+    title: Optional[str] = Field(default=None, description="Report title (default: 'YOKATLAS Raporu')"),
+    ctx: Optional[Context] = None
+) -> dict:
+    """
+    Render a report for many programs at once.
+
+    Programs given by YÖP code are fetched concurrently (through the cache).
+    The output is either one PDF with a table of contents and a bookmarked
+    section per program, or a zip archive with one PDF per program rendered
+    in parallel.
+
+    Parameters:
+    - program_type (str): 'bachelor' or 'associate_degree'
+    - yop_codes (List[str]): Program YÖP codes
+    - year (int): Data year for yop_codes
+    - details (List[dict]): Atlas details payloads that were already fetched
+    - output_format (str): 'pdf' or 'zip'
+    - title (str): Report title
+
+    Returns:
+    - filename, path, size_bytes: The written file
+    - programs: Number of programs in the report
+    - resource_uri: Resource URI to read the file through MCP
+    - errors: YÖP codes that could not be fetched, with the reason
+    """
+    codes = list(dict.fromkeys(code.strip() for code in yop_codes or [] if code.strip()))
+    details = details or []
+    if not codes and not details:
+        return {"error": "No programs given", "details": "Provide yop_codes and/or details"}
+    if len(codes) + len(details) > _BATCH_MAX_ITEMS:
+        return {
+            "error": "Too many programs",
+            "details": f"{len(codes) + len(details)} programs requested; the limit is {_BATCH_MAX_ITEMS}"
+        }
+
+    items = [(f"Program {position}", data) for position, data in enumerate(details, start=1) if "error" not in data]
+    errors = {}
+    if codes:
+        # The details report only shows genel_bilgiler, so only that section is fetched
+        fetched = await _fetch_atlas_batch(
+            [(program_type, code, year) for code in codes], _BATCH_CONCURRENCY, sections=_REPORT_SECTIONS
+        )
+        for code in codes:
+            data = fetched[(program_type, code, year)]
+            if "error" in data:
+                errors[code] = data.get("details") or data["error"]
+            else:
+                items.append((f"{code} ({year})", data))
+
+    if not items:
+        return {"error": "No programs could be fetched", "errors": errors}
+
+    report_type = "bachelor_details" if program_type == "bachelor" else "associate_details"
+    result = await _render_report_batch(items, report_type, title or "YOKATLAS Raporu", output_format, ctx)
+    result["errors"] = errors
+    return result
+
+
+# =============================================================================
+# MCP Resources
+# =============================================================================
+
+@app.resource("yokatlas://stats", mime_type="application/json")
+def get_server_stats() -> dict:
+    """Runtime statistics: search worker pool queue depth and cache hit/eviction counters."""
+    return {
+        "search_pool": _search_executor.stats(),
+        "http_pool": _upstream_http.stats(),
+        "resilience": {"search": _search_guard.stats(), "atlas": _atlas_guard.stats()},
+        "atlas_cache": _atlas_cache.stats(),
+        "search_cache": _search_cache.stats(),
+        "background_refresh": _refresher.stats(),
+        "scheduler": _scheduler.stats(),
+        "snapshot_store": _store.stats() if _store is not None else None,
+        "reports": {"directory": _REPORT_DIR, "workers": _REPORT_WORKERS, "pending": _report_pending},
+        "program_index": {
+            program_type: index.stats() if index is not None else None
+            for program_type, index in _program_indexes.items()
+        }
+    }
+
+
+async def _read_report_file(filename: str, extension: str) -> bytes:
+    """Read a file from the report directory, rejecting names outside it."""
+    if os.path.basename(filename) != filename or not filename.endswith(extension):
+        raise ResourceError(f"Invalid report name: {filename}")
+    path = os.path.join(_REPORT_DIR, filename)
+
+    def read() -> bytes:
+        with open(path, "rb") as f:
+            return f.read()
+
+    try:
+        return await asyncio.to_thread(read)
+    except FileNotFoundError:
+        raise ResourceError(f"Report not found: {filename}")
+
+
+@app.resource("yokatlas://reports/{filename}", mime_type="application/pdf")
+async def get_report(filename: str) -> bytes:
+    """PDF report written by generate_pdf_report or generate_batch_pdf_report."""
+    return await _read_report_file(filename, ".pdf")
+
+
+@app.resource("yokatlas://archives/{filename}", mime_type="application/zip")
+async def get_report_archive(filename: str) -> bytes:
+    """Zip archive of PDF reports written by generate_batch_pdf_report."""
+    return await _read_report_file(filename, ".zip")
+
+
+# =============================================================================
+# Metrics
+# =============================================================================
+
+def _collect_runtime_metrics() -> list:
+    """Metrics read from cache, guard, worker pool and refresher statistics at scrape time."""
+    hits = Counter("yokatlas_cache_hits_total", "Cache lookups answered", ("cache",))
+    misses = Counter("yokatlas_cache_misses_total", "Cache lookups not answered", ("cache",))
+    ratio = Gauge("yokatlas_cache_hit_ratio", "Cache hits / lookups since start", ("cache",))
+    entries = Gauge("yokatlas_cache_entries", "Entries held in memory", ("cache",))
+    for name, stats in (("atlas_details", _atlas_cache.stats()), ("search_results", _search_cache.stats())):
+        hits.inc(stats["hits"], cache=name)
+        misses.inc(stats["misses"], cache=name)
+        ratio.set(stats["hit_ratio"], cache=name)
+        entries.set(stats["size"], cache=name)
+    if _store is not None:
+        hits.inc(_store.hits, cache="snapshot_store")
+        misses.inc(_store.misses, cache="snapshot_store")
+        lookups = _store.hits + _store.misses
+        ratio.set(_store.hits / lookups if lookups else 0.0, cache="snapshot_store")
+
+    circuit_open = Gauge("yokatlas_upstream_circuit_open", "1 while the upstream circuit breaker is not closed", ("upstream",))
+    for guard in (_search_guard, _atlas_guard):
+        circuit_open.set(0 if guard.breaker.state == CircuitBreaker.CLOSED else 1, upstream=guard.name)
+    rate = Gauge("yokatlas_upstream_rate_limit", "Current adaptive upstream request rate (requests/s)")
+    rate.set(_upstream_bucket.rate)
+
+    pool_in_flight = Gauge("yokatlas_search_pool_in_flight", "Searches running on the worker pool", ("upstream",))
+    pool_queued = Gauge("yokatlas_search_pool_queued", "Searches waiting for a worker pool slot", ("upstream",))
+    for name, state in _search_executor.stats()["upstreams"].items():
+        pool_in_flight.set(state["in_flight"], upstream=name)
+        pool_queued.set(state["queued"], upstream=name)
+
+    refresh_stats = _refresher.stats()
+    refreshes = Counter("yokatlas_background_refreshes_total", "Background cache refreshes by kind", ("kind",))
+    for kind in ("refreshed", "revalidated", "failed", "skipped_budget"):
+        refreshes.inc(refresh_stats[kind], kind=kind)
+
+    scheduler_stats = _scheduler.stats()
+    tools_running = Gauge("yokatlas_tool_calls_running", "Tool calls admitted by the scheduler and running")
+    tools_running.set(scheduler_stats["running"])
+    tools_queued = Gauge("yokatlas_tool_calls_queued", "Tool calls waiting for a scheduler slot", ("priority",))
+    for priority, queued in scheduler_stats["queued_by_priority"].items():
+        tools_queued.set(queued, priority=priority)
+    shed = Counter("yokatlas_tool_calls_shed_total", "Tool calls rejected by the scheduler", ("reason",))
+    for reason, count in scheduler_stats["shed"].items():
+        shed.inc(count, reason=reason)
+
+    return [hits, misses, ratio, entries, circuit_open, rate, pool_in_flight, pool_queued, refreshes,
+            tools_running, tools_queued, shed]
+
+
+_metrics.registry.add_collector(_collect_runtime_metrics)
+
+
+@app.custom_route("/metrics", methods=["GET"])
+async def metrics_endpoint(request: Request) -> Response:
+    """Prometheus scrape endpoint (HTTP transports)."""
+    return Response(_metrics.render(), media_type=CONTENT_TYPE)
+
+
+# =============================================================================
+# Delta Sync Interface
+# =============================================================================
+
+# Used by yokatlas-mcp-sync, which fetches atlas details through the same
+# guarded upstream access as the tools and stores them under the keys they read.
+
+
+def has_shared_store() -> bool:
+    """Whether a shared snapshot store is configured."""
+    return _store is not None
+
+
+def search_function(program_type: str) -> Callable[..., Any]:
+    """Return the blocking yokatlas-py search function of a program type ('bachelor' or 'associate_degree')."""
+    return _upstream("search_lisans_programs" if program_type == "bachelor" else "search_onlisans_programs")
+
+
+async def load_atlas_for_sync(program_type: str, yop_kodu: str, year: int) -> dict:
+    """
+    Fetch a program's full atlas details from YOKATLAS, bypassing the caches.
+
+    Args:
+        program_type: Type of program ('bachelor' or 'associate_degree')
+        yop_kodu: Program YOP code
+        year: Data year
+
+    Returns:
+        Atlas details dictionary or error dictionary
+    """
+    try:
+        return await _load_atlas_details(_atlas_class(program_type), yop_kodu, year, program_type)
+    except UpstreamUnavailable as e:
+        return {"error": "YOKATLAS unavailable", "details": str(e), "program_id": yop_kodu, "year": year}
+
+
+async def store_atlas_payload(program_type: str, yop_kodu: str, year: int, result: dict, min_ttl: float) -> bool:
+    """
+    Write a full atlas payload to the shared store under the key the tools read.
+
+    Args:
+        program_type: Type of program ('bachelor' or 'associate_degree')
+        yop_kodu: Program YOP code
+        year: Data year
+        result: Payload returned by load_atlas_for_sync
+        min_ttl: Keep the payload fresh at least this many seconds
+
+    Returns:
+        True if stored; False for error payloads or without a shared store
+    """
+    ttl = _atlas_cache_ttl(year, result)
+    if _store is None or not ttl:
+        return False
+    await _store.aput("atlas", _atlas_store_key(program_type, yop_kodu, year), result, max(ttl, min_ttl))
+    return True
+
+
+async def touch_atlas_payload(program_type: str, yop_kodu: str, year: int, ttl: float) -> bool:
+    """
+    Extend the expiry of a stored full atlas payload without re-fetching it.
+
+    Args:
+        program_type: Type of program ('bachelor' or 'associate_degree')
+        yop_kodu: Program YOP code
+        year: Data year
+        ttl: New time to live in seconds
+
+    Returns:
+        True if the payload was in the store
+    """
+    if _store is None:
+        return False
+    return await _store.atouch("atlas", _atlas_store_key(program_type, yop_kodu, year), ttl)
+
+
+def atlas_payload_complete(result: dict) -> bool:
+    """Whether an atlas payload has no failed sections."""
+    return isinstance(result, dict) and "error" not in result and not _count_atlas_section_errors(result)[0]
+
+
+async def close_upstream() -> None:
+    """Close the pooled upstream HTTP session on the running loop."""
+    await _upstream_http.aclose()
+
+
+async def _serve(transport: str, **transport_kwargs: Any) -> None:
+    """Run the server, stopping background refreshes and closing the pooled HTTP session on the loop that used them."""
+    metrics_server = None
+    if _METRICS_PORT:
+        metrics_server = await serve_metrics(_metrics.render, _METRICS_HOST, _METRICS_PORT)
+    try:
+        await app.run_async(transport, **transport_kwargs)
+    finally:
+        if metrics_server is not None:
+            metrics_server.close()
+        await _refresher.stop()
+        await _upstream_http.aclose()
 
 
 def main():
     """Main entry point for the YOKATLAS MCP server."""
-    app.run()
+    parser = argparse.ArgumentParser(description="YOKATLAS MCP server")
+    parser.add_argument("--transport", choices=["stdio", "http", "sse"], default=env_str("TRANSPORT", "stdio"),
+                        help="MCP transport (default: stdio)")
+    parser.add_argument("--host", default=env_str("HOST", "127.0.0.1"), help="Bind address for HTTP transports")
+    parser.add_argument("--port", type=int, default=env_int("PORT", 8000, minimum=1), help="Port for HTTP transports")
+    parser.add_argument("--path", default=env_str("HTTP_PATH"), help="Endpoint path for HTTP transports")
+    parser.add_argument("--stateless", action="store_true", default=env_bool("STATELESS_HTTP", False),
+                        help="Keep no MCP session state in the worker, so any worker behind a load balancer can "
+                             "serve any request (http transport)")
+    args = parser.parse_args()
+
+    transport_kwargs: dict[str, Any] = {}
+    if args.transport != "stdio":
+        transport_kwargs = {"host": args.host, "port": args.port}
+        if args.path:
+            transport_kwargs["path"] = args.path
+        if args.transport == "http":
+            transport_kwargs["stateless_http"] = args.stateless
+        if _store is None:
+            logger.warning("No shared cache backend configured; each HTTP worker keeps its own cache")
+
+    try:
+        asyncio.run(_serve(args.transport, **transport_kwargs))
+    finally:
+        _upstream_http.close()
+        _search_executor.shutdown()
+        if _report_pool is not None:
+            _report_pool.shutdown(wait=False, cancel_futures=True)
+        if _store is not None:
+            _store.close()
 
 
 if __name__ == "__main__":
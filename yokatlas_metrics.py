@@ -0,0 +1,397 @@
+"""
+YOKATLAS MCP Server - Metrics and tracing
+
+A small in-process metrics registry rendered in the Prometheus text format
+(no client library needed), plus FastMCP middleware that records per-tool
+latency split into time spent waiting on YOKATLAS, result serialization
+(through timed_serializer) and everything else (cache lookups, processing),
+response sizes, in-flight calls and outcomes. Error outcomes use the categories of the tools' ValueError /
+ConnectionError / Exception branches.
+
+When the optional ``opentelemetry-api`` package is installed, tool and
+upstream calls are also wrapped in OpenTelemetry spans; they are exported by
+whatever SDK/exporter the process configures (e.g. opentelemetry-instrument
+with OTLP).
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import functools
+import importlib.util
+import logging
+import math
+import time
+from typing import Callable, Iterable, Iterator, Optional, Sequence
+
+from fastmcp.server.middleware import CallNext, Middleware, MiddlewareContext
+
+from yokatlas_resilience import CircuitOpenError, UpstreamUnavailable
+
+__all__ = ["Counter", "Gauge", "Histogram", "MetricsRegistry", "ServerMetrics", "ToolMetricsMiddleware", "serve_metrics", "timed_serializer", "CONTENT_TYPE"]
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; covers cache hits (sub-millisecond) up to slow batch reports
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# Error messages returned by the tools, grouped like their except branches
+_ERROR_CLASSES = {
+    "Invalid search parameter": "value_error",
+    "Invalid parameter": "value_error",
+    "Connection error to YOKATLAS": "connection_error",
+    "YOKATLAS unavailable": "connection_error",
+    "Internal error": "internal_error",
+    "PDF rendering failed": "internal_error",
+    "Server busy": "overloaded",
+    "Rate limit exceeded": "rate_limited",
+}
+
+# Upstream seconds accumulated by the tool call running in this context
+_upstream_seconds: contextvars.ContextVar[Optional[list]] = contextvars.ContextVar("yokatlas_upstream_seconds", default=None)
+# Result serialization seconds of the tool call running in this context
+_serialize_seconds: contextvars.ContextVar[Optional[list]] = contextvars.ContextVar("yokatlas_serialize_seconds", default=None)
+
+if importlib.util.find_spec("opentelemetry") is not None:
+    from opentelemetry import trace as _otel_trace
+    _tracer = _otel_trace.get_tracer("yokatlas_mcp")
+else:
+    _tracer = None
+
+
+@contextlib.contextmanager
+def _span(name: str, **attributes) -> Iterator[Optional[object]]:
+    if _tracer is None:
+        yield None
+        return
+    with _tracer.start_as_current_span(name, attributes=attributes) as span:
+        yield span
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple, object] = {}
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.kind}"
+        yield from self._samples()
+
+    def _samples(self) -> Iterator[str]:
+        for key, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Counter(_Metric):
+    """Monotonically increasing value per label set."""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    """Value per label set that can go up and down."""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """Cumulative bucket counts, sum and count per label set."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        state = self._values.get(key)
+        if state is None:
+            state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+        counts = state[0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+        state[1] += value
+        state[2] += 1
+
+    def _samples(self) -> Iterator[str]:
+        names = self.labelnames + ("le",)
+        for key, (counts, total, count) in self._values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket{_format_labels(names, key + (_format_value(bound),))} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {count}"
+
+
+class MetricsRegistry:
+    """
+    Holds metrics and renders them in the Prometheus text exposition format.
+
+    Metrics are updated from the event loop only, so no locking is done.
+    Collectors are callables run at render time that return ad-hoc metrics
+    (e.g. gauges read from cache statistics).
+    """
+
+    def __init__(self):
+        self._metrics: list[_Metric] = []
+        self._collectors: list[Callable[[], Iterable[_Metric]]] = []
+
+    def _register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], Iterable[_Metric]]) -> None:
+        """Register a callable returning metrics to include in every render()."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Return all metrics in the Prometheus text format."""
+        lines: list[str] = []
+        metrics = list(self._metrics)
+        for collector in self._collectors:
+            try:
+                metrics.extend(collector())
+            except Exception:
+                logger.exception("Metrics collector failed")
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class ServerMetrics:
+    """
+    Tool and upstream metrics of the MCP server.
+
+    Args:
+        registry: Registry the metrics are created in (a new one by default)
+    """
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None):
+        self.registry = registry or MetricsRegistry()
+        r = self.registry
+        self.tool_calls = r.counter("yokatlas_tool_calls_total", "Tool calls by outcome (ok or error class)", ("tool", "outcome"))
+        self.tool_duration = r.histogram("yokatlas_tool_duration_seconds", "Tool call wall time", ("tool",))
+        self.tool_upstream = r.histogram("yokatlas_tool_upstream_seconds", "Time a tool call spent in YOKATLAS calls (summed over concurrent calls)", ("tool",))
+        self.tool_serialize = r.histogram("yokatlas_tool_serialize_seconds", "Time a tool call spent serializing its result", ("tool",))
+        self.tool_local = r.histogram("yokatlas_tool_local_seconds", "Tool call time outside YOKATLAS calls and serialization (caches, processing)", ("tool",))
+        self.tool_response_bytes = r.histogram("yokatlas_tool_response_bytes", "Serialized tool result size", ("tool",), buckets=SIZE_BUCKETS)
+        self.tool_in_flight = r.gauge("yokatlas_tool_in_flight", "Tool calls currently running", ("tool",))
+        self.upstream_calls = r.counter("yokatlas_upstream_calls_total", "Guarded YOKATLAS calls by outcome", ("upstream", "outcome"))
+        self.upstream_duration = r.histogram("yokatlas_upstream_duration_seconds", "Guarded YOKATLAS call time, including retries", ("upstream",))
+
+    @contextlib.asynccontextmanager
+    async def track_upstream(self, upstream: str):
+        """
+        Time one guarded upstream call and add it to the current tool call's upstream time.
+
+        Args:
+            upstream: Upstream name ('search' or 'atlas')
+        """
+        outcome = "ok"
+        start = time.perf_counter()
+        with _span(f"yokatlas.upstream.{upstream}", upstream=upstream) as span:
+            try:
+                yield
+            except CircuitOpenError:
+                outcome = "circuit_open"
+                raise
+            except UpstreamUnavailable:
+                outcome = "unavailable"
+                raise
+            except asyncio.CancelledError:
+                outcome = "cancelled"
+                raise
+            except Exception as e:
+                outcome = "value_error" if isinstance(e, ValueError) else "error"
+                raise
+            finally:
+                elapsed = time.perf_counter() - start
+                self.upstream_calls.inc(upstream=upstream, outcome=outcome)
+                self.upstream_duration.observe(elapsed, upstream=upstream)
+                accumulated = _upstream_seconds.get()
+                if accumulated is not None:
+                    accumulated[0] += elapsed
+                if span is not None:
+                    span.set_attribute("yokatlas.outcome", outcome)
+
+    def render(self) -> str:
+        return self.registry.render()
+
+
+def timed_serializer(serializer: Callable[[object], str]) -> Callable[[object], str]:
+    """
+    Wrap a FastMCP tool_serializer so its time is recorded as the serialize phase.
+
+    Args:
+        serializer: Tool result serializer (e.g. yokatlas_models.dumps)
+
+    Returns:
+        Serializer adding its run time to the current tool call's metrics
+    """
+    @functools.wraps(serializer)
+    def serialize(data: object) -> str:
+        start = time.perf_counter()
+        try:
+            return serializer(data)
+        finally:
+            accumulated = _serialize_seconds.get()
+            if accumulated is not None:
+                accumulated[0] += time.perf_counter() - start
+
+    return serialize
+
+
+def _classify_result(result) -> str:
+    """Return 'ok' or the error class of a tool result carrying an error payload."""
+    structured = getattr(result, "structured_content", None)
+    if isinstance(structured, dict) and "result" in structured and len(structured) == 1:
+        structured = structured["result"]
+    if isinstance(structured, dict) and "error" in structured:
+        return _ERROR_CLASSES.get(structured["error"], "invalid_request")
+    return "ok"
+
+
+def _result_size(result) -> int:
+    size = 0
+    for block in getattr(result, "content", None) or ():
+        text = getattr(block, "text", None)
+        if text is not None:
+            size += len(text.encode("utf-8"))
+        else:
+            data = getattr(block, "data", None)
+            size += len(data) if isinstance(data, (str, bytes)) else 0
+    return size
+
+
+class ToolMetricsMiddleware(Middleware):
+    """
+    FastMCP middleware recording ServerMetrics for every tool call.
+
+    Args:
+        metrics: ServerMetrics to record into
+    """
+
+    def __init__(self, metrics: ServerMetrics):
+        self.metrics = metrics
+
+    async def on_call_tool(self, context: MiddlewareContext, call_next: CallNext):
+        tool = context.message.name
+        m = self.metrics
+        accumulated = [0.0]
+        serialized = [0.0]
+        token = _upstream_seconds.set(accumulated)
+        serialize_token = _serialize_seconds.set(serialized)
+        m.tool_in_flight.inc(tool=tool)
+        start = time.perf_counter()
+        outcome = "exception"
+        try:
+            with _span(f"yokatlas.tool.{tool}", tool=tool) as span:
+                result = await call_next(context)
+                outcome = _classify_result(result)
+                if span is not None:
+                    span.set_attribute("yokatlas.outcome", outcome)
+            m.tool_response_bytes.observe(_result_size(result), tool=tool)
+            return result
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            _upstream_seconds.reset(token)
+            _serialize_seconds.reset(serialize_token)
+            m.tool_in_flight.dec(tool=tool)
+            m.tool_calls.inc(tool=tool, outcome=outcome)
+            m.tool_duration.observe(elapsed, tool=tool)
+            m.tool_upstream.observe(accumulated[0], tool=tool)
+            m.tool_serialize.observe(serialized[0], tool=tool)
+            m.tool_local.observe(max(0.0, elapsed - accumulated[0] - serialized[0]), tool=tool)
+
+
+async def serve_metrics(render: Callable[[], str], host: str, port: int) -> asyncio.AbstractServer:
+    """
+    Serve GET /metrics on a separate port (for the stdio transport, which has no HTTP server).
+
+    Args:
+        render: Returns the metrics text
+        host: Interface to bind
+        port: Port to bind
+
+    Returns:
+        The started asyncio server (close it on shutdown)
+    """
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 10)
+            method, path = request.split(b" ", 2)[:2]
+            if method == b"GET" and path.split(b"?")[0] == b"/metrics":
+                status, body, content_type = "200 OK", render().encode("utf-8"), CONTENT_TYPE
+            else:
+                status, body, content_type = "404 Not Found", b"Not Found\n", "text/plain"
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("ascii") + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+    return server
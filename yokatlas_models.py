@@ -0,0 +1,223 @@
+"""
+YOKATLAS MCP Server - Compact in-memory program records
+
+Search records arrive from yokatlas-py as dicts with a dozen string keys and
+four {year: value} dicts each, and every record repeats the same university,
+faculty, city and enum strings. Held by the thousand in the offline index and
+the search cache, that layout dominates a worker's memory.
+
+ProgramRecord stores a record in a slotted dataclass with interned strings;
+its per-year values live in YearlyValues (a read-only mapping over a shared
+year tuple and a value tuple). Records are converted back to plain dicts with
+to_dict() only when a response is built. Atlas payloads are too irregular for
+a fixed layout, so compact_payload() interns their keys and short strings
+instead.
+
+dumps() is the JSON serializer used for tool results: orjson when it is
+installed, otherwise pydantic-core (FastMCP's default).
+"""
+
+import importlib.util
+import logging
+import sys
+from collections.abc import Mapping
+from dataclasses import dataclass
+from typing import Any, Iterable, Iterator, Optional
+
+__all__ = ["YearlyValues", "ProgramRecord", "to_records", "to_dicts", "compact_payload", "dumps", "JSON_BACKEND"]
+
+logger = logging.getLogger(__name__)
+
+# Strings longer than this are rarely repeated (e.g. base scores); interning them only costs time
+_INTERN_MAX_LENGTH = 64
+
+# Year key tuples shared by every YearlyValues with the same years
+_YEAR_KEYS: dict[tuple, tuple] = {}
+
+
+def _intern(value: Any) -> Any:
+    if type(value) is str and len(value) <= _INTERN_MAX_LENGTH:
+        return sys.intern(value)
+    return value
+
+
+class YearlyValues(Mapping):
+    """
+    Read-only {year: value} mapping stored as two tuples.
+
+    Args:
+        values: Mapping of year to value (e.g. a record's 'taban' dict)
+    """
+
+    __slots__ = ("_years", "_values")
+
+    def __init__(self, values: Mapping):
+        years = tuple(_intern(year) for year in values)
+        self._years = _YEAR_KEYS.setdefault(years, years)
+        self._values = tuple(_intern(value) for value in values.values())
+
+    def __getitem__(self, year: str) -> Any:
+        try:
+            return self._values[self._years.index(year)]
+        except ValueError:
+            raise KeyError(year) from None
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._years)
+
+    def __len__(self) -> int:
+        return len(self._years)
+
+    def __repr__(self) -> str:
+        return f"YearlyValues({self.to_dict()!r})"
+
+    def to_dict(self) -> dict:
+        return dict(zip(self._years, self._values))
+
+
+# Record fields in yokatlas-py's order; to_dict() emits them in this order
+_TEXT_FIELDS = ("yop_kodu", "uni_adi", "fakulte", "program_adi", "program_detay", "sehir_adi",
+                "universite_turu", "ucret_burs", "ogretim_turu")
+_YEARLY_FIELDS = ("kontenjan", "yerlesen", "tbs", "taban")
+# Tags added by the offline index harvest
+_TAG_FIELDS = ("puan_turu", "doluluk")
+_FIELDS = _TEXT_FIELDS + _YEARLY_FIELDS + _TAG_FIELDS
+_FIELD_BITS = {field: 1 << i for i, field in enumerate(_FIELDS)}
+
+
+@dataclass(slots=True, eq=False)
+class ProgramRecord:
+    """
+    One search record in compact form.
+
+    ``present`` is a bit set of the fields the source dict had, so to_dict()
+    reproduces it exactly (a missing key stays missing, an explicit None stays
+    None). Keys yokatlas-py may add later are kept in ``extra``.
+
+    Records also answer get() and [] like the dict they came from, so code
+    reading search records works with either form.
+    """
+
+    yop_kodu: Optional[str] = None
+    uni_adi: Optional[str] = None
+    fakulte: Optional[str] = None
+    program_adi: Optional[str] = None
+    program_detay: Optional[str] = None
+    sehir_adi: Optional[str] = None
+    universite_turu: Optional[str] = None
+    ucret_burs: Optional[str] = None
+    ogretim_turu: Optional[str] = None
+    kontenjan: Optional[YearlyValues] = None
+    yerlesen: Optional[YearlyValues] = None
+    tbs: Optional[YearlyValues] = None
+    taban: Optional[YearlyValues] = None
+    puan_turu: Optional[str] = None
+    doluluk: Optional[str] = None
+    present: int = 0
+    extra: Optional[dict] = None
+
+    @classmethod
+    def from_dict(cls, record: Mapping) -> "ProgramRecord":
+        """
+        Build a compact record from a search result dict.
+
+        Args:
+            record: Search record as returned by yokatlas-py (or to_dict())
+
+        Returns:
+            The compact record
+        """
+        compact = cls()
+        present = 0
+        extra = None
+        for key, value in record.items():
+            bit = _FIELD_BITS.get(key)
+            if bit is None:
+                if extra is None:
+                    extra = {}
+                extra[_intern(key)] = compact_payload(value)
+                continue
+            present |= bit
+            if key in _YEARLY_FIELDS and isinstance(value, Mapping):
+                value = YearlyValues(value)
+            else:
+                value = _intern(value)
+            setattr(compact, key, value)
+        compact.present = present
+        compact.extra = extra
+        return compact
+
+    def to_dict(self) -> dict:
+        """Return the record as the plain dict it was built from."""
+        result = {}
+        for field in _FIELDS:
+            if self.present & _FIELD_BITS[field]:
+                value = getattr(self, field)
+                result[field] = value.to_dict() if isinstance(value, YearlyValues) else value
+        if self.extra:
+            result.update(self.extra)
+        return result
+
+    def get(self, key: str, default: Any = None) -> Any:
+        bit = _FIELD_BITS.get(key)
+        if bit is None:
+            return self.extra.get(key, default) if self.extra else default
+        return getattr(self, key) if self.present & bit else default
+
+    def __getitem__(self, key: str) -> Any:
+        bit = _FIELD_BITS.get(key)
+        if bit is not None and self.present & bit:
+            return getattr(self, key)
+        if bit is None and self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+
+def to_records(records: Iterable[Any]) -> list:
+    """Convert search result dicts to ProgramRecords (records already compact, or not dicts, are kept)."""
+    return [ProgramRecord.from_dict(r) if isinstance(r, dict) else r for r in records]
+
+
+def to_dicts(records: Iterable[Any]) -> list:
+    """Convert ProgramRecords back to plain dicts for a response (dicts are passed through)."""
+    return [r.to_dict() if isinstance(r, ProgramRecord) else r for r in records]
+
+
+def compact_payload(value: Any) -> Any:
+    """
+    Return a copy of a JSON-like payload with dict keys and short strings interned.
+
+    Args:
+        value: Atlas details payload (or any nested dict/list structure)
+
+    Returns:
+        Equal payload sharing its repeated strings with every other compacted payload
+    """
+    if isinstance(value, dict):
+        return {_intern(key): compact_payload(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [compact_payload(item) for item in value]
+    return _intern(value)
+
+
+# ============================================================================
+# JSON SERIALIZATION
+# ============================================================================
+
+if importlib.util.find_spec("orjson") is not None:
+    import orjson
+
+    JSON_BACKEND = "orjson"
+
+    def dumps(data: Any) -> str:
+        """Serialize a tool result to JSON (orjson)."""
+        return orjson.dumps(data, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+else:
+    import pydantic_core
+
+    JSON_BACKEND = "pydantic_core"
+    logger.info("orjson not installed; serializing tool results with pydantic-core")
+
+    def dumps(data: Any) -> str:
+        """Serialize a tool result to JSON (pydantic-core)."""
+        return pydantic_core.to_json(data, fallback=str).decode()
@@ -4,11 +4,451 @@ import tempfile
 from io import BytesIO
 import base64
 
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+from functools import lru_cache
+from collections.abc import Mapping
+
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Flowable, PageBreak
+from reportlab.platypus.tableofcontents import TableOfContents
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
 from reportlab.lib.units import cm
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+
+# Search tables are laid out in chunks of this many rows. ReportLab sizes and
+# splits a Table as a whole, so one 500-row table is re-measured on every page
+# break; page-sized chunks keep layout work proportional to the row count.
+TABLE_CHUNK_ROWS = 40
+# Above this many rows, search reports switch to the plain-row flowable
+HIGH_VOLUME_ROWS = 250
+
+_MARGIN = 2 * cm
+# SimpleDocTemplate frames keep 6pt padding on each side
+_FRAME_WIDTH = A4[0] - 2 * _MARGIN - 12
+
+_BODY_FONT = "Helvetica"
+_HEADER_FONT = "Helvetica-Bold"
+_CELL_FONT_SIZE = 7
+_CELL_PADDING = 3
+
+# (header, share of the frame width) per search report column
+_SEARCH_COLUMNS = {
+    "bachelor_search": [
+        ("Program Kodu", 0.12),
+        ("Üniversite", 0.25),
+        ("Program", 0.25),
+        ("Şehir", 0.11),
+        ("Puan Türü", 0.08),
+        ("Taban Puanı", 0.095),
+        ("Başarı Sırası", 0.095),
+    ],
+    "associate_search": [
+        ("Program Kodu", 0.13),
+        ("Üniversite", 0.31),
+        ("Program", 0.31),
+        ("Şehir", 0.13),
+        ("Taban Puanı", 0.12),
+    ],
+}
+
+_SEARCH_TABLE_STYLE = TableStyle(
+    [
+        ("BACKGROUND", (0, 0), (-1, 0), colors.lightblue),
+        ("TEXTCOLOR", (0, 0), (-1, 0), colors.black),
+        ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+        ("FONTNAME", (0, 0), (-1, 0), _HEADER_FONT),
+        ("FONTNAME", (0, 1), (-1, -1), _BODY_FONT),
+        ("FONTSIZE", (0, 0), (-1, -1), _CELL_FONT_SIZE),
+        ("LEFTPADDING", (0, 0), (-1, -1), _CELL_PADDING),
+        ("RIGHTPADDING", (0, 0), (-1, -1), _CELL_PADDING),
+        ("BOTTOMPADDING", (0, 0), (-1, 0), 6),
+        ("GRID", (0, 0), (-1, -1), 1, colors.black),
+        (
+            "ROWBACKGROUNDS",
+            (0, 1),
+            (-1, -1),
+            [colors.white, colors.lightgrey],
+        ),
+    ]
+)
+
+_KEY_VALUE_STYLE = TableStyle(
+    [
+        ("BACKGROUND", (0, 0), (0, -1), colors.lightblue),
+        ("TEXTCOLOR", (0, 0), (0, -1), colors.black),
+        ("ALIGN", (0, 0), (-1, -1), "LEFT"),
+        ("FONTNAME", (0, 0), (0, -1), _HEADER_FONT),
+        ("GRID", (0, 0), (-1, -1), 1, colors.black),
+    ]
+)
+
+
+@lru_cache(maxsize=1)
+def _styles() -> dict:
+    """Paragraph styles shared by all reports (built once per process)."""
+    styles = getSampleStyleSheet()
+    return {
+        "title": styles["Title"],
+        "heading": styles["Heading2"],
+        "subheading": styles["Heading3"],
+        "body": ParagraphStyle(
+            "TurkishStyle",
+            parent=styles["Normal"],
+            fontName=_BODY_FONT,
+            fontSize=10,
+            leading=12,
+        ),
+    }
+
+
+def _latest(values) -> str:
+    """Return the most recent year's value from a {year: value} mapping."""
+    if isinstance(values, Mapping):
+        for year in sorted(values, reverse=True):
+            if values[year] not in (None, ""):
+                return str(values[year])
+        return ""
+    return "" if values is None else str(values)
+
+
+@lru_cache(maxsize=8192)
+def _text_width(text: str, font: str = _BODY_FONT, size: float = _CELL_FONT_SIZE) -> float:
+    """Memoized stringWidth; university and program names repeat across rows."""
+    return stringWidth(text, font, size)
+
+
+@lru_cache(maxsize=8192)
+def _fit(text: str, width: float, font: str = _BODY_FONT, size: float = _CELL_FONT_SIZE) -> str:
+    """Truncate text with an ellipsis so it fits in width points."""
+    if _text_width(text, font, size) <= width:
+        return text
+    while text and stringWidth(text + "…", font, size) > width:
+        text = text[:-1]
+    return text + "…"
+
+
+class PlainRowsTable(Flowable):
+    """
+    Lightweight grid of single-line text cells for very large result tables.
+
+    Rows are drawn directly on the canvas with a fixed row height, so wrap()
+    and split() are O(1) arithmetic instead of Table's per-cell measurement.
+    Cell text must already fit its column (see _fit()); the header row is
+    repeated on every page.
+
+    Args:
+        header: Header cell texts
+        rows: Body rows of cell texts
+        col_widths: Column widths in points
+    """
+
+    ROW_HEIGHT = _CELL_FONT_SIZE + 2 * _CELL_PADDING
+
+    def __init__(self, header: list, rows: list, col_widths: list):
+        super().__init__()
+        self.header = header
+        self.rows = rows
+        self.col_widths = col_widths
+        self.width = sum(col_widths)
+
+    def wrap(self, availWidth, availHeight):
+        self.height = (len(self.rows) + 1) * self.ROW_HEIGHT
+        return self.width, self.height
+
+    def split(self, availWidth, availHeight):
+        fits = int(availHeight // self.ROW_HEIGHT) - 1
+        if fits >= len(self.rows):
+            return [self]
+        if fits < 1:
+            return []
+        return [
+            PlainRowsTable(self.header, self.rows[:fits], self.col_widths),
+            PlainRowsTable(self.header, self.rows[fits:], self.col_widths),
+        ]
+
+    def draw(self):
+        canvas = self.canv
+        row_height = self.ROW_HEIGHT
+        height = (len(self.rows) + 1) * row_height
+        baseline = _CELL_PADDING + 1
+
+        canvas.setFillColor(colors.lightblue)
+        canvas.rect(0, height - row_height, self.width, row_height, stroke=0, fill=1)
+        canvas.setFillColor(colors.lightgrey)
+        for i in range(1, len(self.rows), 2):
+            canvas.rect(0, height - (i + 2) * row_height, self.width, row_height, stroke=0, fill=1)
+
+        canvas.setFillColor(colors.black)
+        for row_index, cells in enumerate([self.header] + self.rows):
+            font = _HEADER_FONT if row_index == 0 else _BODY_FONT
+            canvas.setFont(font, _CELL_FONT_SIZE)
+            y = height - (row_index + 1) * row_height + baseline
+            x = 0
+            for text, col_width in zip(cells, self.col_widths):
+                # Centre with the memoized width instead of drawCentredString
+                canvas.drawString(x + (col_width - _text_width(text, font)) / 2, y, text)
+                x += col_width
+
+        canvas.setStrokeColor(colors.black)
+        canvas.setLineWidth(0.5)
+        for i in range(len(self.rows) + 2):
+            canvas.line(0, i * row_height, self.width, i * row_height)
+        x = 0
+        for col_width in [0] + self.col_widths:
+            x += col_width
+            canvas.line(x, 0, x, height)
+
+
+def _search_rows(programs: list, report_type: str) -> list:
+    """Turn search records (dicts or ProgramRecords) into cell texts for a search report."""
+    rows = []
+    if report_type == "bachelor_search":
+        for program in programs:
+            rows.append([
+                str(program.get("yop_kodu") or ""),
+                program.get("uni_adi") or "",
+                program.get("program_adi") or "",
+                program.get("sehir_adi") or "",
+                (program.get("puan_turu") or "").upper(),
+                _latest(program.get("taban")),
+                _latest(program.get("tbs")),
+            ])
+    else:  # associate_search
+        for program in programs:
+            rows.append([
+                str(program.get("yop_kodu") or ""),
+                program.get("uni_adi") or "",
+                program.get("program_adi") or "",
+                program.get("sehir_adi") or "",
+                _latest(program.get("taban")),
+            ])
+    return rows
+
+
+def _search_table(programs: list, report_type: str, high_volume: bool) -> list:
+    """
+    Build the flowables for a search result table.
+
+    Args:
+        programs: Search records
+        report_type: 'bachelor_search' or 'associate_search'
+        high_volume: Draw rows with PlainRowsTable instead of Table chunks
+
+    Returns:
+        List of flowables
+    """
+    columns = _SEARCH_COLUMNS[report_type]
+    headers = [header for header, _ in columns]
+    col_widths = [share * _FRAME_WIDTH for _, share in columns]
+
+    rows = _search_rows(programs, report_type)
+    # Fixed column widths: chunks line up with each other and Table skips auto-sizing
+    for row in rows:
+        for i, text in enumerate(row):
+            row[i] = _fit(text, col_widths[i] - 2 * _CELL_PADDING)
+
+    if high_volume:
+        return [PlainRowsTable(headers, rows, col_widths)]
+
+    tables = []
+    for start in range(0, max(len(rows), 1), TABLE_CHUNK_ROWS):
+        table = Table([headers] + rows[start:start + TABLE_CHUNK_ROWS], colWidths=col_widths, repeatRows=1)
+        table.setStyle(_SEARCH_TABLE_STYLE)
+        tables.append(table)
+    return tables
+
+
+def _key_value_table(rows: list) -> Table:
+    table = Table(rows)
+    table.setStyle(_KEY_VALUE_STYLE)
+    return table
+
+
+def _build_elements(data: dict, report_type: str, title: str, high_volume: bool = None) -> list:
+    """
+    Build the flowables for a report.
+
+    Args:
+        data: Search response ('programs' list) or atlas details payload
+        report_type: 'bachelor_search', 'associate_search', 'bachelor_details' or 'associate_details'
+        title: Report title
+        high_volume: Use the plain-row table for search results; None decides
+            by row count (HIGH_VOLUME_ROWS)
+
+    Returns:
+        List of ReportLab flowables
+    """
+    styles = _styles()
+    heading_style = styles["heading"]
+
+    elements = []
+
+    elements.append(Paragraph(title, styles["title"]))
+    current_date = datetime.datetime.now().strftime("%d.%m.%Y %H:%M")
+    elements.append(Paragraph(f"Oluşturulma Tarihi: {current_date}", styles["body"]))
+    elements.append(Spacer(1, 0.5 * cm))
+
+    # Process data based on report type
+    if report_type == "bachelor_search" or report_type == "associate_search":
+        # Search tools return 'programs'; 'results' is accepted for older callers
+        programs = data.get("programs", data.get("results"))
+        if isinstance(programs, list):
+            total_programs = data.get("total_found", len(programs))
+            elements.append(
+                Paragraph(f"Toplam Program Sayısı: {total_programs}", heading_style)
+            )
+            elements.append(Spacer(1, 0.3 * cm))
+
+            if high_volume is None:
+                high_volume = len(programs) > HIGH_VOLUME_ROWS
+            elements.extend(_search_table(programs, report_type, high_volume))
+
+    elif report_type == "bachelor_details" or report_type == "associate_details":
+        elements.extend(_details_elements(data))
+
+    return elements
+
+
+def _details_elements(data: dict) -> list:
+    """Build the flowables for one program's atlas details."""
+    styles = _styles()
+    elements = []
+    sections = data.get("girdi_gostergeleri")
+    genel = sections.get("genel_bilgiler") if isinstance(sections, dict) else None
+    if isinstance(genel, dict) and "error" not in genel:
+        # genel_bilgiler holds three label -> value tables scraped from YOKATLAS
+        for key, label in (
+            ("program_info", "Genel Bilgiler"),
+            ("kontenjan_info", "Kontenjan ve Yerleşme Bilgileri"),
+            ("puan_info", "Taban Puan ve Başarı Sırası"),
+        ):
+            info = genel.get(key)
+            if isinstance(info, dict) and info:
+                elements.append(Paragraph(label, styles["subheading"]))
+                elements.append(_key_value_table([[k, v] for k, v in info.items()]))
+                elements.append(Spacer(1, 0.5 * cm))
+    return elements
+
+
+class _TocDocTemplate(SimpleDocTemplate):
+    """Document template that records program headings for the table of contents."""
+
+    def afterFlowable(self, flowable):
+        label = getattr(flowable, "toc_label", None)
+        if label is None:
+            return
+        key = f"program-{self.seq.nextf('program')}"
+        self.canv.bookmarkPage(key)
+        self.canv.addOutlineEntry(label, key, level=0)
+        self.notify("TOCEntry", (0, label, self.page, key))
+
+
+def render_pdf(
+    data: dict,
+    report_type: str,
+    output_path: str,
+    title: str = "YOKATLAS Raporu",
+    high_volume: bool = None,
+) -> dict:
+    """
+    Render a report straight to a file.
+
+    The document is written to a temporary file next to output_path and
+    renamed into place, so readers never see a partial PDF. This function
+    is module-level and takes only picklable arguments so it can run in a
+    process pool.
+
+    Args:
+        data: Search response or atlas details payload
+        report_type: 'bachelor_search', 'associate_search', 'bachelor_details' or 'associate_details'
+        output_path: Destination file path
+        title: Report title
+        high_volume: Plain-row rendering for search tables (None: by row count)
+
+    Returns:
+        Dictionary with the output path and file size in bytes
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    tmp_path = output_path + ".tmp"
+    doc = SimpleDocTemplate(
+        tmp_path,
+        pagesize=A4,
+        rightMargin=_MARGIN,
+        leftMargin=_MARGIN,
+        topMargin=_MARGIN,
+        bottomMargin=_MARGIN,
+        title=title,
+    )
+    try:
+        doc.build(_build_elements(data, report_type, title, high_volume))
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return {"path": output_path, "size_bytes": os.path.getsize(output_path)}
+
+
+def render_pdf_batch(
+    items: list,
+    report_type: str,
+    output_path: str,
+    title: str = "YOKATLAS Raporu",
+) -> dict:
+    """
+    Render several programs' details into one PDF with a table of contents.
+
+    Each program starts on a new page with a bookmarked heading. The table
+    of contents needs page numbers, so the document is laid out twice
+    (ReportLab multiBuild). Like render_pdf(), this runs in a process pool.
+
+    Args:
+        items: List of (heading, atlas details payload) pairs
+        report_type: 'bachelor_details' or 'associate_details'
+        output_path: Destination file path
+        title: Report title
+
+    Returns:
+        Dictionary with the output path, file size in bytes and program count
+    """
+    styles = _styles()
+    toc = TableOfContents()
+    toc.levelStyles = [ParagraphStyle("TOCLevel0", parent=styles["body"], leftIndent=0.5 * cm)]
+
+    elements = [Paragraph(title, styles["title"])]
+    current_date = datetime.datetime.now().strftime("%d.%m.%Y %H:%M")
+    elements.append(Paragraph(f"Oluşturulma Tarihi: {current_date}", styles["body"]))
+    elements.append(Paragraph(f"Program Sayısı: {len(items)}", styles["body"]))
+    elements.append(Spacer(1, 0.5 * cm))
+    elements.append(Paragraph("İçindekiler", styles["heading"]))
+    elements.append(toc)
+
+    for heading, data in items:
+        elements.append(PageBreak())
+        paragraph = Paragraph(heading, styles["heading"])
+        paragraph.toc_label = heading
+        elements.append(paragraph)
+        elements.append(Spacer(1, 0.3 * cm))
+        elements.extend(_details_elements(data))
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    tmp_path = output_path + ".tmp"
+    doc = _TocDocTemplate(
+        tmp_path,
+        pagesize=A4,
+        rightMargin=_MARGIN,
+        leftMargin=_MARGIN,
+        topMargin=_MARGIN,
+        bottomMargin=_MARGIN,
+        title=title,
+    )
+    try:
+        doc.multiBuild(elements)
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return {"path": output_path, "size_bytes": os.path.getsize(output_path), "programs": len(items)}
 
 
 def generate_pdf(
@@ -39,203 +479,12 @@ def generate_pdf(
         doc = SimpleDocTemplate(
             buffer,
             pagesize=A4,
-            rightMargin=2 * cm,
-            leftMargin=2 * cm,
-            topMargin=2 * cm,
-            bottomMargin=2 * cm,
+            rightMargin=_MARGIN,
+            leftMargin=_MARGIN,
+            topMargin=_MARGIN,
+            bottomMargin=_MARGIN,
         )
-
-        styles = getSampleStyleSheet()
-        title_style = styles["Title"]
-        heading_style = styles["Heading2"]
-        normal_style = styles["Normal"]
-
-        turkish_style = ParagraphStyle(
-            "TurkishStyle",
-            parent=normal_style,
-            fontName="Helvetica",
-            fontSize=10,
-            leading=12,
-        )
-
-        elements = []
-
-        elements.append(Paragraph(title, title_style))
-        current_date = datetime.datetime.now().strftime("%d.%m.%Y %H:%M")
-        elements.append(Paragraph(f"Oluşturulma Tarihi: {current_date}", turkish_style))
-        elements.append(Spacer(1, 0.5 * cm))
-
-        # Process data based on report type
-        if report_type == "bachelor_search" or report_type == "associate_search":
-            if "results" in data and isinstance(data["results"], list):
-                total_programs = len(data["results"])
-                elements.append(
-                    Paragraph(f"Toplam Program Sayısı: {total_programs}", heading_style)
-                )
-                elements.append(Spacer(1, 0.3 * cm))
-
-                table_data = []
-
-                if report_type == "bachelor_search":
-                    headers = [
-                        "Program Kodu",
-                        "Üniversite",
-                        "Program",
-                        "Şehir",
-                        "Puan Türü",
-                        "Taban Puanı",
-                        "Başarı Sırası",
-                    ]
-                    table_data.append(headers)
-
-                    for program in data["results"]:
-                        row = [
-                            program.get("program_kodu", ""),
-                            program.get("universite", ""),
-                            program.get("program_adi", ""),
-                            program.get("sehir", ""),
-                            program.get("puan_turu", "").upper(),
-                            program.get("taban_puani", ""),
-                            program.get("basari_sirasi", ""),
-                        ]
-                        table_data.append(row)
-                else:  # associate_search
-                    headers = [
-                        "Program Kodu",
-                        "Üniversite",
-                        "Program",
-                        "Şehir",
-                        "Taban Puanı",
-                    ]
-                    table_data.append(headers)
-
-                    for program in data["results"]:
-                        row = [
-                            program.get("program_kodu", ""),
-                            program.get("universite", ""),
-                            program.get("program_adi", ""),
-                            program.get("sehir", ""),
-                            program.get("taban_puani", ""),
-                        ]
-                        table_data.append(row)
-
-                table = Table(table_data, repeatRows=1)
-                table.setStyle(
-                    TableStyle(
-                        [
-                            ("BACKGROUND", (0, 0), (-1, 0), colors.lightblue),
-                            ("TEXTCOLOR", (0, 0), (-1, 0), colors.black),
-                            ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-                            ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-                            ("BOTTOMPADDING", (0, 0), (-1, 0), 12),
-                            ("GRID", (0, 0), (-1, -1), 1, colors.black),
-                            (
-                                "ROWBACKGROUNDS",
-                                (0, 1),
-                                (-1, -1),
-                                [colors.white, colors.lightgrey],
-                            ),
-                        ]
-                    )
-                )
-
-                elements.append(table)
-
-        elif report_type == "bachelor_details" or report_type == "associate_details":
-            if "genel" in data and isinstance(data["genel"], dict):
-                genel = data["genel"]
-                program_name = genel.get("program_adi", "Program Bilgisi")
-                university = genel.get("universite_adi", "")
-
-                elements.append(
-                    Paragraph(f"{university} - {program_name}", heading_style)
-                )
-                elements.append(Spacer(1, 0.3 * cm))
-
-                elements.append(Paragraph("Genel Bilgiler", styles["Heading3"]))
-
-                general_info = [
-                    ["Üniversite", university],
-                    ["Program", genel.get("program_adi", "")],
-                    ["Fakülte", genel.get("fakulte", "")],
-                    ["Şehir", genel.get("sehir", "")],
-                    ["Program Türü", genel.get("program_turu", "")],
-                    ["Öğretim Türü", genel.get("ogretim_turu", "")],
-                    ["Burs/Ücret", genel.get("ucret_burs", "")],
-                ]
-
-                gen_table = Table(general_info)
-                gen_table.setStyle(
-                    TableStyle(
-                        [
-                            ("BACKGROUND", (0, 0), (0, -1), colors.lightblue),
-                            ("TEXTCOLOR", (0, 0), (0, -1), colors.black),
-                            ("ALIGN", (0, 0), (-1, -1), "LEFT"),
-                            ("FONTNAME", (0, 0), (0, -1), "Helvetica-Bold"),
-                            ("GRID", (0, 0), (-1, -1), 1, colors.black),
-                        ]
-                    )
-                )
-                elements.append(gen_table)
-                elements.append(Spacer(1, 0.5 * cm))
-
-                if "kontenjan_yerlesen" in data:
-                    elements.append(
-                        Paragraph("Kontenjan ve Yerleşme Bilgileri", styles["Heading3"])
-                    )
-                    kontenjan = data["kontenjan_yerlesen"]
-
-                    if isinstance(kontenjan, dict):
-                        kontenjan_info = [
-                            ["Kontenjan", kontenjan.get("kontenjan", "")],
-                            ["Yerleşen", kontenjan.get("yerlesen", "")],
-                            ["Doluluk Oranı", f"{kontenjan.get('doluluk_orani', '')}%"],
-                        ]
-
-                        kon_table = Table(kontenjan_info)
-                        kon_table.setStyle(
-                            TableStyle(
-                                [
-                                    ("BACKGROUND", (0, 0), (0, -1), colors.lightblue),
-                                    ("TEXTCOLOR", (0, 0), (0, -1), colors.black),
-                                    ("ALIGN", (0, 0), (-1, -1), "LEFT"),
-                                    ("FONTNAME", (0, 0), (0, -1), "Helvetica-Bold"),
-                                    ("GRID", (0, 0), (-1, -1), 1, colors.black),
-                                ]
-                            )
-                        )
-                        elements.append(kon_table)
-                        elements.append(Spacer(1, 0.5 * cm))
-
-                if "taban_puan_bilgileri" in data:
-                    elements.append(
-                        Paragraph("Taban Puan ve Başarı Sırası", styles["Heading3"])
-                    )
-                    taban = data["taban_puan_bilgileri"]
-
-                    if isinstance(taban, dict):
-                        puan_info = [
-                            ["Puan Türü", taban.get("puan_turu", "").upper()],
-                            ["Taban Puanı", taban.get("taban_puani", "")],
-                            ["Tavan Puanı", taban.get("tavan_puani", "")],
-                            ["Başarı Sırası", taban.get("basari_sirasi", "")],
-                        ]
-
-                        puan_table = Table(puan_info)
-                        puan_table.setStyle(
-                            TableStyle(
-                                [
-                                    ("BACKGROUND", (0, 0), (0, -1), colors.lightblue),
-                                    ("TEXTCOLOR", (0, 0), (0, -1), colors.black),
-                                    ("ALIGN", (0, 0), (-1, -1), "LEFT"),
-                                    ("FONTNAME", (0, 0), (0, -1), "Helvetica-Bold"),
-                                    ("GRID", (0, 0), (-1, -1), 1, colors.black),
-                                ]
-                            )
-                        )
-                        elements.append(puan_table)
-
-        doc.build(elements)
+        doc.build(_build_elements(data, report_type, title))
 
         pdf_data = buffer.getvalue()
 
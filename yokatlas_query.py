@@ -0,0 +1,143 @@
+"""
+YOKATLAS MCP Server - Columnar range/sort queries
+
+Search records carry per-year base scores, success ranks, quotas and placed
+student counts as strings. ProgramTable parses them once into NumPy columns,
+so range filters, multi-key sorting and top-k selection run as vectorized
+operations instead of in the agent's context.
+"""
+
+import re
+from collections.abc import Mapping
+from typing import Any, Optional, Sequence
+
+import numpy as np
+
+__all__ = ["ProgramTable", "METRICS"]
+
+# Metric name -> search record field holding its {year: value} mapping
+METRICS = {
+    "base_score": "taban",
+    "success_rank": "tbs",
+    "quota": "kontenjan",
+    "placed": "yerlesen",
+}
+
+# Record fields copied into every result row
+_ROW_FIELDS = ("yop_kodu", "uni_adi", "fakulte", "program_adi", "sehir_adi",
+               "universite_turu", "ucret_burs", "ogretim_turu", "puan_turu", "doluluk")
+
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+
+
+def _parse_number(value: Any) -> float:
+    """Parse the leading number of a record value (e.g. '85+3' -> 85.0); NaN if absent."""
+    if value is None:
+        return np.nan
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _NUMBER.search(str(value))
+    return float(match.group()) if match else np.nan
+
+
+class ProgramTable:
+    """
+    Struct-of-arrays view over search records for vectorized filtering and sorting.
+
+    Args:
+        records: Search result records (dicts or ProgramRecords)
+    """
+
+    def __init__(self, records: Sequence[dict]):
+        self.records = records
+        years = set()
+        for record in records:
+            for field in METRICS.values():
+                mapping = record.get(field)
+                if isinstance(mapping, Mapping):
+                    years.update(mapping)
+        self.years = sorted(years, reverse=True)
+        self._columns: dict[tuple[str, str], np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def column(self, metric: str, year: str) -> np.ndarray:
+        """
+        Return (and memoize) the float column for a metric and year; missing values are NaN.
+
+        Args:
+            metric: One of METRICS
+            year: Data year as a string (e.g. '2025')
+
+        Returns:
+            Array with one value per record
+        """
+        key = (metric, year)
+        column = self._columns.get(key)
+        if column is None:
+            field = METRICS[metric]
+            column = np.fromiter(
+                (_parse_number((r.get(field) or {}).get(year)) for r in self.records),
+                dtype=np.float64,
+                count=len(self.records)
+            )
+            self._columns[key] = column
+        return column
+
+    def query(
+        self,
+        year: str,
+        ranges: dict[str, tuple[Optional[float], Optional[float]]],
+        sort_by: Sequence[str],
+        limit: int,
+        rows: Optional[Sequence[int]] = None
+    ) -> tuple[list[dict], int]:
+        """
+        Filter by metric ranges, sort by several keys and return the top rows.
+
+        Args:
+            year: Data year the metrics are read from
+            ranges: Metric -> (min, max) bounds; None leaves a side open.
+                Records without a value for a bounded metric are excluded.
+            sort_by: Metric names, '-' prefix for descending (e.g. ['-base_score', 'success_rank']).
+                Missing values sort last.
+            limit: Maximum number of rows to return
+            rows: Optional subset of record positions to consider
+
+        Returns:
+            Tuple of (result rows, number of records matching the filters)
+        """
+        candidates = np.arange(len(self.records)) if rows is None else np.asarray(rows, dtype=np.int64)
+
+        mask = np.ones(len(candidates), dtype=bool)
+        for metric, (low, high) in ranges.items():
+            values = self.column(metric, year)[candidates]
+            mask &= ~np.isnan(values)
+            if low is not None:
+                mask &= values >= low
+            if high is not None:
+                mask &= values <= high
+        candidates = candidates[mask]
+
+        if sort_by and len(candidates):
+            keys = []
+            for key in sort_by:
+                descending = key.startswith("-")
+                values = self.column(key.lstrip("-"), year)[candidates]
+                values = -values if descending else values.copy()
+                values[np.isnan(values)] = np.inf
+                keys.append(values)
+            # np.lexsort treats the last key as the primary one
+            candidates = candidates[np.lexsort(keys[::-1])]
+
+        selected = candidates[:limit]
+        return [self._row(int(i), year) for i in selected], int(len(candidates))
+
+    def _row(self, position: int, year: str) -> dict:
+        record = self.records[position]
+        row = {field: record.get(field) for field in _ROW_FIELDS if record.get(field) is not None}
+        for metric in METRICS:
+            value = self.column(metric, year)[position]
+            row[metric] = None if np.isnan(value) else (int(value) if metric != "base_score" else float(value))
+        return row
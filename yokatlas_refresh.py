@@ -0,0 +1,205 @@
+"""
+YOKATLAS MCP Server - Background refresh of hot cache entries
+
+Popular programs and searches are requested far more often than their cache
+entries expire, so re-fetching them inline puts a latency spike on whichever
+request happens to arrive after expiry. HotKeyRefresher counts requests per
+cache key and, from a background task, re-fetches the most requested entries
+shortly before they expire. Its upstream usage is capped by its own token
+bucket, sized as a fixed share of the upstream rate limit.
+
+Requests that find only an expired entry are answered with it right away and
+hand the re-fetch to revalidate(), which runs it in the background.
+"""
+
+import asyncio
+import heapq
+import logging
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Hashable, Optional
+
+from yokatlas_resilience import TokenBucket
+
+__all__ = ["HotKeyRefresher"]
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _HotKey:
+    """Request count and refresh hooks for one cache key."""
+
+    refresh: Callable[[], Awaitable[object]]
+    expires_in: Callable[[], Optional[float]]
+    cost: float
+    hits: float = 0.0
+
+
+class HotKeyRefresher:
+    """
+    Tracks request frequency per cache key and refreshes hot keys before they expire.
+
+    Counts are halved every interval, so "hot" reflects recent traffic.
+    A budget_share of 0 disables proactive refreshes (revalidate() still works).
+
+    Args:
+        interval: Seconds between refresh passes
+        refresh_ahead: Refresh entries expiring within this many seconds
+        hot_keys: Number of most requested keys considered per pass
+        upstream_rate: Upstream rate limit in requests per second
+        budget_share: Fraction of upstream_rate refreshes may use
+        max_cost: Largest cost of a single refresh (the budget's burst is
+            at least this, so every refresh is charged in full)
+        healthy: Callable returning False while the upstream is unhealthy
+            (refresh passes are skipped then)
+    """
+
+    def __init__(
+        self,
+        interval: float,
+        refresh_ahead: float,
+        hot_keys: int,
+        upstream_rate: float,
+        budget_share: float,
+        max_cost: float = 1.0,
+        healthy: Callable[[], bool] = lambda: True
+    ):
+        self.interval = max(1.0, interval)
+        self.refresh_ahead = refresh_ahead
+        self.hot_keys = max(1, hot_keys)
+        self.enabled = budget_share > 0
+        budget_rate = max(upstream_rate * budget_share, 0.001)
+        self.budget = TokenBucket(rate=budget_rate, burst=max(budget_rate * self.interval, max_cost), min_rate=budget_rate)
+        self._healthy = healthy
+        self._keys: dict[Hashable, _HotKey] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: set[Hashable] = set()
+        self._background: set[asyncio.Task] = set()
+        self.passes = 0
+        self.refreshed = 0
+        self.revalidated = 0
+        self.failed = 0
+        self.skipped_budget = 0
+
+    def record(
+        self,
+        key: Hashable,
+        refresh: Callable[[], Awaitable[object]],
+        expires_in: Callable[[], Optional[float]],
+        cost: float = 1.0
+    ) -> None:
+        """
+        Count a request for a cache key and make sure the refresh task is running.
+
+        Args:
+            key: Cache key
+            refresh: Coroutine factory that re-fetches the entry and stores it
+            expires_in: Returns seconds until the entry expires (None if not cached)
+            cost: Upstream requests one refresh makes
+        """
+        entry = self._keys.get(key)
+        if entry is None:
+            entry = self._keys[key] = _HotKey(refresh, expires_in, cost)
+            # Keep tracking bounded: drop the coldest keys beyond 4x the hot set
+            if len(self._keys) > 4 * self.hot_keys:
+                for cold in heapq.nsmallest(len(self._keys) - 2 * self.hot_keys, self._keys, key=lambda k: self._keys[k].hits):
+                    del self._keys[cold]
+        entry.hits += 1
+        if self.enabled:
+            self._ensure_started()
+
+    def revalidate(self, key: Hashable, refresh: Callable[[], Awaitable[object]]) -> None:
+        """
+        Re-fetch an expired entry in the background (once per key at a time).
+
+        Args:
+            key: Cache key
+            refresh: Coroutine factory that re-fetches the entry and stores it
+        """
+        if key in self._pending:
+            return
+        self._pending.add(key)
+        task = asyncio.get_running_loop().create_task(self._refresh(key, refresh))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _refresh(self, key: Hashable, refresh: Callable[[], Awaitable[object]], proactive: bool = False) -> bool:
+        self._pending.add(key)
+        try:
+            await refresh()
+        except Exception as e:
+            self.failed += 1
+            logger.warning(f"Background refresh of {key} failed: {e}")
+            return False
+        finally:
+            self._pending.discard(key)
+        if proactive:
+            self.refreshed += 1
+        else:
+            self.revalidated += 1
+        return True
+
+    def _ensure_started(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._loop is not loop:
+            self._loop = loop
+            self._task = loop.create_task(self._run(), name="yokatlas-refresher")
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.refresh_pass()
+            except Exception:
+                logger.exception("Background refresh pass failed")
+
+    async def refresh_pass(self) -> int:
+        """
+        Refresh the hot keys that are about to expire, within the refresh budget.
+
+        Returns:
+            Number of entries refreshed
+        """
+        self.passes += 1
+        hot = heapq.nlargest(self.hot_keys, self._keys.items(), key=lambda item: item[1].hits)
+        for entry in self._keys.values():
+            entry.hits /= 2
+
+        if not self._healthy():
+            return 0
+
+        refreshed = 0
+        for key, entry in hot:
+            remaining = entry.expires_in()
+            if remaining is None or remaining > self.refresh_ahead or key in self._pending:
+                continue
+            if not await self.budget.acquire(entry.cost, max_wait=0):
+                self.skipped_budget += 1
+                break
+            if await self._refresh(key, entry.refresh, proactive=True):
+                refreshed += 1
+        return refreshed
+
+    async def stop(self) -> None:
+        """Cancel the refresh loop and any running revalidations."""
+        task, self._task = self._task, None
+        tasks = [t for t in [task, *self._background] if t is not None and not t.done()]
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        """Return tracking size, pass counters and the refresh budget state."""
+        return {
+            "enabled": self.enabled,
+            "running": self._task is not None and not self._task.done(),
+            "tracked_keys": len(self._keys),
+            "passes": self.passes,
+            "refreshed": self.refreshed,
+            "revalidated": self.revalidated,
+            "in_progress": len(self._pending),
+            "failed": self.failed,
+            "skipped_budget": self.skipped_budget,
+            "budget": self.budget.stats(),
+        }
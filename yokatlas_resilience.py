@@ -0,0 +1,303 @@
+"""
+YOKATLAS MCP Server - Upstream resilience
+
+When YOKATLAS browns out, waiting on every slow request piles up hung
+coroutines. UpstreamGuard wraps each upstream call with:
+
+- an adaptive token bucket (shared per host) that halves its rate on
+  failures and creeps back up on successes,
+- a per-attempt timeout,
+- bounded retries with exponential backoff and full jitter,
+- a circuit breaker that fails fast while the upstream is unhealthy,
+  so callers can serve stale cached data instead.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+__all__ = ["TokenBucket", "CircuitBreaker", "UpstreamGuard", "UpstreamUnavailable", "CircuitOpenError"]
+
+logger = logging.getLogger(__name__)
+
+
+class UpstreamUnavailable(ConnectionError):
+    """The upstream call failed after all retries (or was not attempted)."""
+
+
+class CircuitOpenError(UpstreamUnavailable):
+    """The circuit breaker is open; the call was rejected without contacting the upstream."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} circuit is open; retry in {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter with additive-increase / multiplicative-decrease.
+
+    Args:
+        rate: Maximum refill rate in tokens per second
+        burst: Bucket capacity
+        min_rate: Floor for the adapted rate (default: rate / 10)
+    """
+
+    def __init__(self, rate: float, burst: float, min_rate: Optional[float] = None):
+        self.max_rate = max(rate, 0.001)
+        self.rate = self.max_rate
+        self.min_rate = min(min_rate or self.max_rate / 10, self.max_rate)
+        self.burst = max(burst, 1.0)
+        self.tokens = self.burst
+        self._updated = time.monotonic()
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.rejected = 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, cost: float = 1.0, max_wait: Optional[float] = None) -> bool:
+        """
+        Wait until cost tokens are available and take them.
+
+        Costs above the burst size need a full bucket.
+
+        Args:
+            cost: Number of tokens to take
+            max_wait: Give up instead of waiting longer than this many seconds
+
+        Returns:
+            True if the tokens were taken, False if max_wait would be exceeded
+        """
+        cost = min(cost, self.burst)
+        started = time.monotonic()
+        waited = False
+        while True:
+            self._refill()
+            if self.tokens >= cost:
+                self.tokens -= cost
+                if waited:
+                    self.wait_seconds += time.monotonic() - started
+                return True
+            delay = (cost - self.tokens) / self.rate
+            if max_wait is not None and time.monotonic() - started + delay > max_wait:
+                self.rejected += 1
+                return False
+            if not waited:
+                waited = True
+                self.waits += 1
+            await asyncio.sleep(delay)
+
+    def on_success(self) -> None:
+        """Additive increase: recover 5% of the maximum rate."""
+        self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+
+    def on_failure(self) -> None:
+        """Multiplicative decrease: halve the rate, down to min_rate."""
+        self.rate = max(self.min_rate, self.rate / 2)
+
+    def stats(self) -> dict:
+        self._refill()
+        return {
+            "rate": round(self.rate, 3),
+            "max_rate": self.max_rate,
+            "burst": self.burst,
+            "tokens": round(self.tokens, 2),
+            "waits": self.waits,
+            "wait_seconds": round(self.wait_seconds, 3),
+            "rejected": self.rejected,
+        }
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    Closed: calls pass. After ``failure_threshold`` consecutive failures the
+    breaker opens and rejects calls for ``reset_timeout`` seconds, then lets
+    a single probe through (half-open); its outcome closes or re-opens it.
+
+    Args:
+        failure_threshold: Consecutive failures that open the breaker
+        reset_timeout: Seconds to stay open before probing
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._probe_in_flight = False
+
+    def retry_after(self) -> float:
+        """Seconds until the breaker will allow a probe."""
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def allow(self) -> bool:
+        """Whether a call may proceed now (reserves the probe when half-open)."""
+        if self.state == self.OPEN and self.retry_after() <= 0:
+            self.state = self.HALF_OPEN
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+        self.state = self.CLOSED
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        self._probe_in_flight = False
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.times_opened += 1
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """Give up a reserved probe without an outcome (e.g. the caller was cancelled)."""
+        self._probe_in_flight = False
+
+
+class UpstreamGuard:
+    """
+    Rate limiting, timeouts, retries and circuit breaking for one upstream.
+
+    Args:
+        name: Upstream name used in logs and statistics
+        bucket: Token bucket (may be shared by guards for the same host)
+        breaker: Circuit breaker for this upstream
+        timeout: Per-attempt timeout in seconds
+        retries: Retries after the first attempt
+        base_delay: Backoff base in seconds
+        max_delay: Backoff cap in seconds
+    """
+
+    def __init__(
+        self,
+        name: str,
+        bucket: TokenBucket,
+        breaker: CircuitBreaker,
+        timeout: float,
+        retries: int,
+        base_delay: float,
+        max_delay: float
+    ):
+        self.name = name
+        self.bucket = bucket
+        self.breaker = breaker
+        self.timeout = timeout
+        self.retries = max(0, retries)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.calls = 0
+        self.successes = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.retried = 0
+        self.rejected = 0
+        self.throttled = 0
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: uniform in [0, min(cap, base * 2^attempt)]
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    async def call(
+        self,
+        func: Callable[[], Awaitable[Any]],
+        is_failure: Optional[Callable[[Any], bool]] = None,
+        cost: float = 1.0
+    ) -> Any:
+        """
+        Run an upstream call under the guard.
+
+        Args:
+            func: Coroutine factory performing one attempt
+            is_failure: Classifies a returned value as a failed attempt
+                (for upstream clients that report errors in their results)
+            cost: Tokens taken from the bucket per attempt
+
+        Returns:
+            The first successful result
+
+        Raises:
+            CircuitOpenError: The breaker is open
+            UpstreamUnavailable: Every attempt failed or timed out
+            ValueError: Raised by func (invalid input; not retried)
+        """
+        self.calls += 1
+        last_error = "no attempt made"
+        for attempt in range(self.retries + 1):
+            if not self.breaker.allow():
+                self.rejected += 1
+                raise CircuitOpenError(self.name, self.breaker.retry_after())
+
+            # Waiting for a token counts against the timeout; if the throttled
+            # rate cannot admit the call in time, give up rather than queue
+            if not await self.bucket.acquire(cost, max_wait=self.timeout):
+                self.breaker.release()
+                self.throttled += 1
+                raise UpstreamUnavailable(f"{self.name} rate limited: no upstream capacity within {self.timeout:.0f}s")
+            try:
+                result = await asyncio.wait_for(func(), self.timeout)
+            except ValueError:
+                self.breaker.release()
+                raise
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                last_error = f"timed out after {self.timeout:.0f}s"
+            except asyncio.CancelledError:
+                self.breaker.release()
+                raise
+            except Exception as e:
+                last_error = str(e) or type(e).__name__
+            else:
+                if is_failure is None or not is_failure(result):
+                    self.successes += 1
+                    self.breaker.record_success()
+                    self.bucket.on_success()
+                    return result
+                last_error = "upstream returned an error"
+
+            self.failures += 1
+            self.breaker.record_failure()
+            self.bucket.on_failure()
+            logger.warning(f"{self.name} attempt {attempt + 1}/{self.retries + 1} failed: {last_error}")
+
+            if attempt < self.retries:
+                self.retried += 1
+                await asyncio.sleep(self._backoff(attempt))
+
+        raise UpstreamUnavailable(f"{self.name} failed after {self.retries + 1} attempts: {last_error}")
+
+    def stats(self) -> dict:
+        """Return call/failure counters, breaker state and rate limiter state."""
+        return {
+            "state": self.breaker.state,
+            "consecutive_failures": self.breaker.consecutive_failures,
+            "times_opened": self.breaker.times_opened,
+            "retry_after": round(self.breaker.retry_after(), 1) if self.breaker.state == CircuitBreaker.OPEN else 0.0,
+            "calls": self.calls,
+            "successes": self.successes,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "retries": self.retried,
+            "rejected": self.rejected,
+            "throttled": self.throttled,
+            "rate_limiter": self.bucket.stats(),
+        }
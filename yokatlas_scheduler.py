@@ -0,0 +1,352 @@
+"""
+YOKATLAS MCP Server - Tool call scheduling and per-client quotas
+
+All tool calls share one event loop and one upstream, so a single client
+issuing large searches in a loop slows every other client down. ToolScheduler
+sits in front of the tool handlers (as FastMCP middleware) and:
+
+- caps the number of tool calls running at once; further calls wait in a
+  queue ordered by priority (cheap cached lookups first, cold upstream
+  fetches next, bulk work such as PDF renders last), with waiting calls
+  slowly gaining priority so bulk work is not starved,
+- gives every client a concurrency cap and a token bucket rate quota,
+- sheds load when the queue is full: a call of higher priority than the
+  lowest-priority queued call displaces it, otherwise the new call is
+  rejected. Rejected calls get an error dictionary with a retry hint
+  instead of waiting indefinitely.
+
+Clients are identified by their peer address on HTTP transports and by the
+MCP session on stdio. Caller-chosen values (headers, session ids) would let a
+client pick a fresh quota per call, so the ``X-Client-Id`` header is only
+honoured when a trusted reverse proxy sets it (trust_client_id).
+"""
+
+import asyncio
+import contextlib
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from fastmcp.server.middleware import CallNext, Middleware, MiddlewareContext
+from fastmcp.tools.tool import ToolResult
+
+from yokatlas_resilience import TokenBucket
+
+__all__ = [
+    "ToolScheduler", "SchedulerMiddleware", "Overloaded", "client_key",
+    "PRIORITY_INTERACTIVE", "PRIORITY_NORMAL", "PRIORITY_BULK",
+]
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_INTERACTIVE = 0  # answered from memory (cache hits, offline index)
+PRIORITY_NORMAL = 1  # may need an upstream fetch
+PRIORITY_BULK = 2  # many upstream fetches or a PDF render
+_PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_NORMAL: "normal", PRIORITY_BULK: "bulk"}
+
+# Seconds of waiting that raise a queued call by one priority level
+_AGING_SECONDS = 10.0
+# Idle client states are dropped once this many clients are tracked
+_MAX_TRACKED_CLIENTS = 1024
+
+
+class Overloaded(Exception):
+    """A tool call was rejected by the scheduler."""
+
+    def __init__(self, error: str, details: str, retry_after: float):
+        super().__init__(details)
+        self.error = error
+        self.details = details
+        self.retry_after = retry_after
+
+    def as_dict(self) -> dict:
+        return {"error": self.error, "details": self.details, "retry_after": round(self.retry_after, 1)}
+
+
+@dataclass
+class _Client:
+    bucket: TokenBucket
+    running: int = 0
+    waiting: int = 0
+
+
+@dataclass
+class _Waiter:
+    priority: int
+    seq: int
+    client: str
+    enqueued: float
+    future: asyncio.Future = field(repr=False)
+
+    def rank(self, now: float) -> tuple[float, int]:
+        return (self.priority - (now - self.enqueued) / _AGING_SECONDS, self.seq)
+
+
+class ToolScheduler:
+    """
+    Priority admission control with per-client concurrency and rate quotas.
+
+    Args:
+        max_concurrency: Tool calls running at once across all clients
+        max_queue: Calls allowed to wait for a slot; beyond this, calls are shed
+        client_concurrency: Tool calls running at once per client
+        client_queue: Calls one client may have waiting
+        client_rate: Tool calls per second per client (token refill rate)
+        client_burst: Calls a client may make in a burst
+        max_wait: Seconds a call may wait in the queue before it is rejected
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        max_queue: int,
+        client_concurrency: int,
+        client_queue: int,
+        client_rate: float,
+        client_burst: float,
+        max_wait: float
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.client_concurrency = max(1, client_concurrency)
+        self.client_queue = max(0, client_queue)
+        self.client_rate = client_rate
+        self.client_burst = client_burst
+        self.max_wait = max_wait
+        self._running = 0
+        self._waiters: list[_Waiter] = []
+        self._clients: dict[str, _Client] = {}
+        self._seq = 0
+        self.admitted = 0
+        self.queued = 0
+        self.shed: dict[str, int] = {"queue_full": 0, "displaced": 0, "client_queue_full": 0, "rate_limited": 0, "timed_out": 0}
+
+    def _client(self, key: str) -> _Client:
+        state = self._clients.get(key)
+        if state is None:
+            if len(self._clients) >= _MAX_TRACKED_CLIENTS:
+                for idle in [k for k, c in self._clients.items() if not c.running and not c.waiting]:
+                    del self._clients[idle]
+            # min_rate=rate: the quota is fixed, not adaptive
+            state = self._clients[key] = _Client(TokenBucket(self.client_rate, self.client_burst, min_rate=self.client_rate))
+        return state
+
+    def _retry_after(self) -> float:
+        # Rough time for the queue ahead to drain, assuming one-second calls
+        return max(1.0, len(self._waiters) / self.max_concurrency)
+
+    async def acquire(self, client: str, priority: int = PRIORITY_NORMAL) -> None:
+        """
+        Wait for a slot to run a tool call.
+
+        Args:
+            client: Client key (see client_key())
+            priority: PRIORITY_INTERACTIVE, PRIORITY_NORMAL or PRIORITY_BULK
+
+        Raises:
+            Overloaded: The client's quota is exhausted or the call was shed
+        """
+        state = self._client(client)
+        if not await state.bucket.acquire(1.0, max_wait=0):
+            self.shed["rate_limited"] += 1
+            retry_after = (1.0 - state.bucket.tokens) / state.bucket.rate
+            raise Overloaded(
+                "Rate limit exceeded",
+                f"At most {self.client_rate:g} tool calls per second per client (burst {self.client_burst:g})",
+                retry_after
+            )
+
+        # Queued calls of clients at their concurrency cap must not hold up other clients
+        if (self._running < self.max_concurrency and state.running < self.client_concurrency
+                and not any(self._eligible(w) for w in self._waiters)):
+            self._grant(state)
+            return
+
+        if state.waiting >= self.client_queue:
+            self.shed["client_queue_full"] += 1
+            raise Overloaded(
+                "Server busy",
+                f"This client already has {state.waiting} tool calls waiting; wait for them to finish",
+                self._retry_after()
+            )
+
+        if len(self._waiters) >= self.max_queue:
+            now = time.monotonic()
+            worst = max(self._waiters, key=lambda w: w.rank(now), default=None)
+            if worst is None or worst.priority <= priority:
+                self.shed["queue_full"] += 1
+                raise Overloaded(
+                    "Server busy",
+                    f"{len(self._waiters)} tool calls are already queued; retry later",
+                    self._retry_after()
+                )
+            self._remove(worst)
+            self.shed["displaced"] += 1
+            worst.future.set_exception(Overloaded(
+                "Server busy",
+                "Displaced from the queue by higher-priority calls; retry later",
+                self._retry_after()
+            ))
+
+        self._seq += 1
+        waiter = _Waiter(priority, self._seq, client, time.monotonic(), asyncio.get_running_loop().create_future())
+        self._waiters.append(waiter)
+        state.waiting += 1
+        self.queued += 1
+        self._dispatch()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.max_wait)
+        except asyncio.TimeoutError:
+            self._abandon(waiter)
+            self.shed["timed_out"] += 1
+            raise Overloaded(
+                "Server busy",
+                f"No capacity to run the call within {self.max_wait:.0f}s; retry later",
+                self._retry_after()
+            ) from None
+        except asyncio.CancelledError:
+            self._abandon(waiter)
+            raise
+
+    def _abandon(self, waiter: _Waiter) -> None:
+        """Withdraw a waiter whose caller stopped waiting (timed out or cancelled)."""
+        if waiter.future.done() and not waiter.future.cancelled() and waiter.future.exception() is None:
+            # Granted in the same loop turn the caller gave up: hand the slot on
+            self.release(waiter.client)
+        else:
+            self._remove(waiter)
+
+    def _eligible(self, waiter: _Waiter) -> bool:
+        return self._clients[waiter.client].running < self.client_concurrency
+
+    def _grant(self, state: _Client) -> None:
+        self._running += 1
+        state.running += 1
+        self.admitted += 1
+
+    def _remove(self, waiter: _Waiter) -> None:
+        if waiter in self._waiters:
+            self._waiters.remove(waiter)
+            self._clients[waiter.client].waiting -= 1
+
+    def release(self, client: str) -> None:
+        """Give back the slot taken by acquire() and start the next eligible queued call."""
+        self._running -= 1
+        state = self._clients.get(client)
+        if state is not None:
+            state.running -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        now = time.monotonic()
+        while self._running < self.max_concurrency and self._waiters:
+            eligible = [w for w in self._waiters if self._eligible(w)]
+            if not eligible:
+                return
+            waiter = min(eligible, key=lambda w: w.rank(now))
+            self._remove(waiter)
+            self._grant(self._clients[waiter.client])
+            waiter.future.set_result(None)
+
+    @contextlib.asynccontextmanager
+    async def slot(self, client: str, priority: int = PRIORITY_NORMAL):
+        """Hold a slot for the duration of the block (see acquire())."""
+        await self.acquire(client, priority)
+        try:
+            yield
+        finally:
+            self.release(client)
+
+    def stats(self) -> dict:
+        """Return running/queued counts by priority, shed counters and quota settings."""
+        queued_by_priority = {name: 0 for name in _PRIORITY_NAMES.values()}
+        for waiter in self._waiters:
+            queued_by_priority[_PRIORITY_NAMES.get(waiter.priority, str(waiter.priority))] += 1
+        return {
+            "running": self._running,
+            "max_concurrency": self.max_concurrency,
+            "queued": len(self._waiters),
+            "max_queue": self.max_queue,
+            "queued_by_priority": queued_by_priority,
+            "admitted": self.admitted,
+            "waited": self.queued,
+            "shed": dict(self.shed),
+            "clients": len(self._clients),
+            "client_concurrency": self.client_concurrency,
+            "client_rate": self.client_rate,
+            "client_burst": self.client_burst,
+        }
+
+
+def client_key(context: MiddlewareContext, trust_client_id: bool = False) -> str:
+    """
+    Identify the client making a tool call.
+
+    Args:
+        context: Middleware context of the call
+        trust_client_id: Key HTTP calls on the X-Client-Id header when present.
+            Only enable this behind a reverse proxy that sets (and overwrites)
+            the header, since clients could otherwise choose a new key per call.
+
+    Returns:
+        'client-id:<header>' (if trusted), 'addr:<peer host>' on HTTP
+        transports, 'session:<id>' on stdio, or 'default'
+    """
+    ctx = context.fastmcp_context
+    if ctx is None:
+        return "default"
+    try:
+        request = ctx.request_context.request
+    except (AttributeError, LookupError, ValueError):
+        return "default"
+    if request is None:
+        # stdio: one client per process, keyed on its MCP session
+        return f"session:{ctx.session_id}"
+    if trust_client_id:
+        value = request.headers.get("x-client-id")
+        if value:
+            return f"client-id:{value}"
+    peer = getattr(request, "client", None)
+    return f"addr:{peer.host}" if peer is not None else "default"
+
+
+class SchedulerMiddleware(Middleware):
+    """
+    FastMCP middleware admitting tool calls through a ToolScheduler.
+
+    Args:
+        scheduler: Scheduler to admit calls through
+        classify: Returns the priority of a call from (tool name, arguments)
+        identify: Returns the client key of a call (default: client_key)
+    """
+
+    def __init__(
+        self,
+        scheduler: ToolScheduler,
+        classify: Callable[[str, dict], int],
+        identify: Callable[[MiddlewareContext], str] = client_key
+    ):
+        self.scheduler = scheduler
+        self.classify = classify
+        self.identify = identify
+
+    async def on_call_tool(self, context: MiddlewareContext, call_next: CallNext) -> Any:
+        tool = context.message.name
+        arguments = context.message.arguments or {}
+        try:
+            priority = self.classify(tool, arguments)
+        except Exception:
+            logger.exception(f"Could not classify {tool} call; scheduling it as normal priority")
+            priority = PRIORITY_NORMAL
+
+        client = self.identify(context)
+        try:
+            await self.scheduler.acquire(client, priority)
+        except Overloaded as e:
+            logger.warning(f"Rejected {tool} call from {client}: {e.details}")
+            return ToolResult(structured_content=e.as_dict())
+        try:
+            return await call_next(context)
+        finally:
+            self.scheduler.release(client)
@@ -0,0 +1,529 @@
+"""
+YOKATLAS MCP Server - Shared snapshot stores
+
+An optional store for atlas-detail and search payloads shared by every server
+worker, so a restarted or newly added worker does not hit YOKATLAS cold and
+workers do not fetch the same program independently. Two backends:
+
+- SnapshotStore: a SQLite database in WAL mode, shared by the server
+  processes on one host. When the total size exceeds the configured limit,
+  the least recently accessed snapshots are evicted.
+- RedisStore: any Redis-compatible server (Redis, Valkey, KeyDB, ...),
+  shared across hosts; eviction is left to the server's maxmemory policy.
+
+Payloads are stored as zlib-compressed JSON. Both backends also provide
+short-lived leases, which let one worker fetch a missing key while the
+others wait for its result instead of fetching it too.
+"""
+
+import abc
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import struct
+import threading
+import time
+import uuid
+import zlib
+from typing import Any, Optional
+
+from yokatlas_config import env_int, env_str
+
+__all__ = ["SharedStore", "SnapshotStore", "RedisStore", "store_from_env", "SCHEMA_VERSION"]
+
+logger = logging.getLogger(__name__)
+
+# Bump when the table layout changes; stores with another version are rebuilt
+SCHEMA_VERSION = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    namespace   TEXT NOT NULL,
+    key         TEXT NOT NULL,
+    payload     BLOB NOT NULL,
+    size        INTEGER NOT NULL,
+    stored_at   REAL NOT NULL,
+    expires_at  REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS idx_snapshots_accessed ON snapshots (accessed_at);
+CREATE TABLE IF NOT EXISTS snapshot_size (
+    id          INTEGER PRIMARY KEY CHECK (id = 1),
+    bytes       INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO snapshot_size (id, bytes) SELECT 1, COALESCE(SUM(size), 0) FROM snapshots;
+CREATE TRIGGER IF NOT EXISTS snapshots_size_insert AFTER INSERT ON snapshots BEGIN
+    UPDATE snapshot_size SET bytes = bytes + new.size WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS snapshots_size_update AFTER UPDATE OF size ON snapshots BEGIN
+    UPDATE snapshot_size SET bytes = bytes - old.size + new.size WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS snapshots_size_delete AFTER DELETE ON snapshots BEGIN
+    UPDATE snapshot_size SET bytes = bytes - old.size WHERE id = 1;
+END;
+CREATE TABLE IF NOT EXISTS leases (
+    namespace   TEXT NOT NULL,
+    key         TEXT NOT NULL,
+    token       TEXT NOT NULL,
+    expires_at  REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+"""
+
+# Reads only refresh accessed_at when it is older than this, to keep reads
+# from turning into writes on hot keys
+_TOUCH_INTERVAL = 60.0
+
+# Eviction deletes the least recently used snapshots this many at a time
+_EVICT_BATCH = 256
+
+
+def _encode(value: Any) -> bytes:
+    return zlib.compress(json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+
+def _decode(payload: bytes) -> Any:
+    return json.loads(zlib.decompress(payload))
+
+
+class SharedStore(abc.ABC):
+    """
+    Interface of the shared snapshot stores.
+
+    Subclasses implement the blocking get/put/touch/acquire_lease/release_lease;
+    the ``a``-prefixed async variants run them off the event loop and treat
+    backend failures (listed in ``_errors``) as misses, so a broken store
+    never fails the request that is reading through it.
+    """
+
+    backend = ""
+    _errors: tuple[type[BaseException], ...] = (zlib.error, ValueError, TypeError, OSError)
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.leases_acquired = 0
+        self.leases_contended = 0
+
+    @abc.abstractmethod
+    def get(self, namespace: str, key: str, allow_stale: bool = False) -> Optional[Any]:
+        """Return a stored payload, or None if it is missing or expired."""
+
+    @abc.abstractmethod
+    def put(self, namespace: str, key: str, value: Any, ttl: float) -> None:
+        """Store a payload for ttl seconds."""
+
+    @abc.abstractmethod
+    def touch(self, namespace: str, key: str, ttl: float) -> bool:
+        """
+        Keep a stored payload for another ttl seconds without rewriting it.
+
+        Expired payloads that have not been evicted yet are revived as well.
+
+        Args:
+            namespace: Payload kind (e.g. 'atlas', 'search')
+            key: Payload key within the namespace
+            ttl: New time to live in seconds
+
+        Returns:
+            True if the payload was present, False if it has to be stored again
+        """
+
+    @abc.abstractmethod
+    def acquire_lease(self, namespace: str, key: str, ttl: float) -> Optional[str]:
+        """
+        Take the lease on a key unless another worker holds an unexpired one.
+
+        Args:
+            namespace: Payload kind (e.g. 'atlas', 'search')
+            key: Payload key within the namespace
+            ttl: Seconds until the lease expires on its own
+
+        Returns:
+            A token for release_lease(), or None if the lease is held elsewhere
+        """
+
+    @abc.abstractmethod
+    def release_lease(self, namespace: str, key: str, token: str) -> None:
+        """Release a lease taken with acquire_lease() (no-op if it has expired and been taken over)."""
+
+    async def aget(self, namespace: str, key: str, allow_stale: bool = False) -> Optional[Any]:
+        """Async variant of get(); failures are logged and treated as a miss."""
+        try:
+            return await asyncio.to_thread(self.get, namespace, key, allow_stale)
+        except self._errors as e:
+            logger.warning(f"{self.backend} store read failed for {namespace}/{key}: {e}")
+            return None
+
+    async def aput(self, namespace: str, key: str, value: Any, ttl: float) -> None:
+        """Async variant of put(); failures are logged and ignored."""
+        try:
+            await asyncio.to_thread(self.put, namespace, key, value, ttl)
+        except self._errors as e:
+            logger.warning(f"{self.backend} store write failed for {namespace}/{key}: {e}")
+
+    async def atouch(self, namespace: str, key: str, ttl: float) -> bool:
+        """Async variant of touch(); failures are logged and reported as a missing payload."""
+        try:
+            return await asyncio.to_thread(self.touch, namespace, key, ttl)
+        except self._errors as e:
+            logger.warning(f"{self.backend} store touch failed for {namespace}/{key}: {e}")
+            return False
+
+    async def alease(self, namespace: str, key: str, ttl: float) -> Optional[str]:
+        """
+        Async variant of acquire_lease().
+
+        If the store fails, a dummy token is returned so the caller proceeds
+        with its own fetch rather than waiting on a lease nobody holds.
+        """
+        try:
+            return await asyncio.to_thread(self.acquire_lease, namespace, key, ttl)
+        except self._errors as e:
+            logger.warning(f"{self.backend} store lease failed for {namespace}/{key}: {e}")
+            return ""
+
+    async def arelease(self, namespace: str, key: str, token: str) -> None:
+        """Async variant of release_lease(); failures are logged (the lease then expires on its own)."""
+        if not token:
+            return
+        try:
+            await asyncio.to_thread(self.release_lease, namespace, key, token)
+        except self._errors as e:
+            logger.warning(f"{self.backend} store lease release failed for {namespace}/{key}: {e}")
+
+    def _lease_result(self, acquired: bool, token: str) -> Optional[str]:
+        if acquired:
+            self.leases_acquired += 1
+            return token
+        self.leases_contended += 1
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.backend,
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "leases_acquired": self.leases_acquired,
+            "leases_contended": self.leases_contended,
+        }
+
+    def close(self) -> None:
+        pass
+
+
+class SnapshotStore(SharedStore):
+    """
+    Size-bounded SQLite snapshot store.
+
+    The total payload size is kept in the snapshot_size row by triggers, so
+    writes from every worker sharing the file keep it current without a
+    SUM over the table.
+
+    The database is opened lazily on first use. All methods are blocking;
+    use the ``a``-prefixed variants from async code.
+
+    Args:
+        path: Path of the SQLite database file
+        max_bytes: Upper bound for the total (compressed) payload size
+    """
+
+    backend = "sqlite"
+    _errors = SharedStore._errors + (sqlite3.Error,)
+
+    def __init__(self, path: str, max_bytes: int):
+        super().__init__()
+        self.path = path
+        self.max_bytes = max_bytes
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is not None:
+            return self._conn
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+
+        conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=10000")
+
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version not in (0, SCHEMA_VERSION):
+            logger.warning(f"Snapshot store {self.path} has schema v{version}, rebuilding as v{SCHEMA_VERSION}")
+            conn.execute("DROP TABLE IF EXISTS snapshots")
+            conn.execute("DROP TABLE IF EXISTS snapshot_size")
+            conn.execute("DROP TABLE IF EXISTS leases")
+        conn.executescript(_SCHEMA)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+        self._conn = conn
+        return conn
+
+    def get(self, namespace: str, key: str, allow_stale: bool = False) -> Optional[Any]:
+        """
+        Return a stored payload, or None if it is missing or expired.
+
+        Args:
+            namespace: Payload kind (e.g. 'atlas', 'search')
+            key: Payload key within the namespace
+            allow_stale: Also return expired payloads that have not been evicted yet
+
+        Returns:
+            The decoded payload or None
+        """
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT payload, expires_at, accessed_at FROM snapshots WHERE namespace = ? AND key = ?",
+                (namespace, key),
+            ).fetchone()
+            if row is None or (row[1] <= now and not allow_stale):
+                self.misses += 1
+                return None
+            if now - row[2] > _TOUCH_INTERVAL:
+                conn.execute(
+                    "UPDATE snapshots SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                    (now, namespace, key),
+                )
+            self.hits += 1
+        return _decode(row[0])
+
+    def put(self, namespace: str, key: str, value: Any, ttl: float) -> None:
+        """
+        Store a payload for ttl seconds and evict old snapshots if over the size limit.
+
+        Args:
+            namespace: Payload kind (e.g. 'atlas', 'search')
+            key: Payload key within the namespace
+            value: JSON-serializable payload
+            ttl: Time to live in seconds; values <= 0 are not stored
+        """
+        if ttl <= 0:
+            return
+
+        payload = _encode(value)
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # An upsert rather than INSERT OR REPLACE: the implicit delete
+                # of a replace would not fire the size triggers
+                conn.execute(
+                    "INSERT INTO snapshots "
+                    "(namespace, key, payload, size, stored_at, expires_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (namespace, key) DO UPDATE SET payload = excluded.payload, size = excluded.size, "
+                    "stored_at = excluded.stored_at, expires_at = excluded.expires_at, accessed_at = excluded.accessed_at",
+                    (namespace, key, payload, len(payload), now, now + ttl, now),
+                )
+                self._evict(conn)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            self.writes += 1
+
+    def touch(self, namespace: str, key: str, ttl: float) -> bool:
+        """Extend a stored payload's expiry (see SharedStore.touch)."""
+        now = time.time()
+        with self._lock:
+            cursor = self._connect().execute(
+                "UPDATE snapshots SET expires_at = ?, accessed_at = ? WHERE namespace = ? AND key = ?",
+                (now + ttl, now, namespace, key),
+            )
+            return cursor.rowcount == 1
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        total = conn.execute("SELECT bytes FROM snapshot_size").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        # Trim to 90% of the limit so eviction does not run on every write
+        target = int(self.max_bytes * 0.9)
+        while total > target:
+            rows = conn.execute(
+                "SELECT rowid, size FROM snapshots ORDER BY accessed_at LIMIT ?", (_EVICT_BATCH,)
+            ).fetchall()
+            if not rows:
+                break
+            doomed = []
+            for rowid, size in rows:
+                if total <= target:
+                    break
+                doomed.append((rowid,))
+                total -= size
+            conn.executemany("DELETE FROM snapshots WHERE rowid = ?", doomed)
+            self.evictions += len(doomed)
+
+    def acquire_lease(self, namespace: str, key: str, ttl: float) -> Optional[str]:
+        token = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            cursor = self._connect().execute(
+                "INSERT INTO leases (namespace, key, token, expires_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (namespace, key) DO UPDATE SET token = excluded.token, expires_at = excluded.expires_at "
+                "WHERE leases.expires_at <= ?",
+                (namespace, key, token, now + ttl, now),
+            )
+            return self._lease_result(cursor.rowcount == 1, token)
+
+    def release_lease(self, namespace: str, key: str, token: str) -> None:
+        with self._lock:
+            self._connect().execute(
+                "DELETE FROM leases WHERE namespace = ? AND key = ? AND token = ?",
+                (namespace, key, token),
+            )
+
+    def stats(self) -> dict:
+        """Return hit/miss/write/eviction counters and the current store size."""
+        stats = super().stats()
+        stats.update({
+            "path": self.path,
+            "schema_version": SCHEMA_VERSION,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+        })
+        if self._conn is not None:
+            with self._lock:
+                count, size = self._conn.execute(
+                    "SELECT (SELECT COUNT(*) FROM snapshots), bytes FROM snapshot_size"
+                ).fetchone()
+            stats.update({"entries": count, "bytes": size})
+        return stats
+
+    def close(self) -> None:
+        """Close the database connection; it is reopened on next use."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# Compare-and-delete, so a worker never releases a lease another worker took over
+_RELEASE_SCRIPT = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) else return 0 end"
+# Rewrite the expiry header and key lifetime of an existing payload; never creates the key
+_TOUCH_SCRIPT = (
+    "if redis.call('exists', KEYS[1]) == 0 then return 0 end "
+    "redis.call('setrange', KEYS[1], 0, ARGV[1]) redis.call('pexpire', KEYS[1], ARGV[2]) return 1"
+)
+
+
+class RedisStore(SharedStore):
+    """
+    Snapshot store on a Redis-compatible server (needs the optional 'redis' package).
+
+    Each payload is kept for its ttl plus stale_ttl seconds, so get() with
+    allow_stale can still serve it while YOKATLAS is unavailable.
+
+    Args:
+        url: Server URL (e.g. 'redis://localhost:6379/0')
+        prefix: Prefix for every key this store writes
+        stale_ttl: Seconds an expired payload is kept for allow_stale reads
+    """
+
+    backend = "redis"
+
+    def __init__(self, url: str, prefix: str = "yokatlas:", stale_ttl: float = 0):
+        import redis
+
+        super().__init__()
+        self.url = url
+        self.prefix = prefix
+        self.stale_ttl = max(0.0, stale_ttl)
+        self._errors = SharedStore._errors + (redis.RedisError, struct.error)
+        self._client = redis.Redis.from_url(url, socket_timeout=5, socket_connect_timeout=5)
+        self._release = self._client.register_script(_RELEASE_SCRIPT)
+        self._touch = self._client.register_script(_TOUCH_SCRIPT)
+
+    def _key(self, namespace: str, key: str) -> str:
+        return f"{self.prefix}{namespace}:{key}"
+
+    def get(self, namespace: str, key: str, allow_stale: bool = False) -> Optional[Any]:
+        """Return a stored payload, or None if it is missing or expired (see SnapshotStore.get)."""
+        raw = self._client.get(self._key(namespace, key))
+        if raw is None:
+            self.misses += 1
+            return None
+        (expires_at,) = struct.unpack_from("!d", raw)
+        if expires_at <= time.time() and not allow_stale:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return _decode(raw[8:])
+
+    def put(self, namespace: str, key: str, value: Any, ttl: float) -> None:
+        """Store a payload for ttl seconds (kept stale_ttl longer for allow_stale reads)."""
+        if ttl <= 0:
+            return
+        raw = struct.pack("!d", time.time() + ttl) + _encode(value)
+        self._client.set(self._key(namespace, key), raw, px=int((ttl + self.stale_ttl) * 1000))
+        self.writes += 1
+
+    def touch(self, namespace: str, key: str, ttl: float) -> bool:
+        """Extend a stored payload's expiry (see SharedStore.touch)."""
+        header = struct.pack("!d", time.time() + ttl)
+        return bool(self._touch(keys=[self._key(namespace, key)], args=[header, int((ttl + self.stale_ttl) * 1000)]))
+
+    def acquire_lease(self, namespace: str, key: str, ttl: float) -> Optional[str]:
+        token = uuid.uuid4().hex
+        acquired = self._client.set(self._key("lease:" + namespace, key), token, nx=True, px=max(1, int(ttl * 1000)))
+        return self._lease_result(bool(acquired), token)
+
+    def release_lease(self, namespace: str, key: str, token: str) -> None:
+        self._release(keys=[self._key("lease:" + namespace, key)], args=[token])
+
+    def stats(self) -> dict:
+        """Return hit/miss/write counters and the server URL (without credentials)."""
+        stats = super().stats()
+        stats.update({"url": self.url.rsplit("@", 1)[-1], "prefix": self.prefix, "stale_ttl": self.stale_ttl})
+        return stats
+
+    def close(self) -> None:
+        """Close the connection pool; connections are reopened on next use."""
+        self._client.close()
+
+
+def store_from_env(stale_ttl: float = 0) -> Optional[SharedStore]:
+    """
+    Create the shared store selected by YOKATLAS_MCP_CACHE_BACKEND.
+
+    'memory' (the default unless YOKATLAS_MCP_STORE_PATH is set) keeps every
+    cache inside the process; 'sqlite' uses the SnapshotStore at STORE_PATH;
+    'redis' uses a RedisStore at YOKATLAS_MCP_REDIS_URL. If the redis package
+    is missing, the server falls back to in-process caching.
+
+    Args:
+        stale_ttl: Seconds expired payloads stay readable (Redis key lifetime)
+
+    Returns:
+        The configured store, or None for in-process caching only
+    """
+    backend = (env_str("CACHE_BACKEND") or ("sqlite" if env_str("STORE_PATH") else "memory")).lower()
+    if backend == "memory":
+        return None
+    if backend == "sqlite":
+        path = env_str("STORE_PATH") or os.path.join(os.path.expanduser("~"), ".cache", "yokatlas-mcp", "snapshots.db")
+        return SnapshotStore(path, max_bytes=env_int("STORE_MAX_MB", 256, minimum=1) * 1024 * 1024)
+    if backend == "redis":
+        try:
+            return RedisStore(
+                env_str("REDIS_URL", "redis://localhost:6379/0"),
+                prefix=env_str("REDIS_PREFIX", "yokatlas:"),
+                stale_ttl=stale_ttl
+            )
+        except ImportError:
+            logger.warning("CACHE_BACKEND=redis needs the 'redis' package (pip install \"yokatlas-mcp[redis]\"); using in-process caching")
+            return None
+    logger.warning(f"Unknown CACHE_BACKEND '{backend}'; using in-process caching")
+    return None
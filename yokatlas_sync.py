@@ -0,0 +1,341 @@
+"""
+YOKATLAS MCP Server - Incremental (delta) sync of a year's data
+
+YOKATLAS publishes a year's data in a few bursts; between them, and for past
+years altogether, program records do not change. Re-crawling every program's
+atlas details on a schedule therefore mostly re-downloads what the shared
+store already has.
+
+YOKATLAS search only lists the current placement cycle, but every record
+carries its values for the last few years. A sync for one of those years:
+
+1. harvests the current program lists (a few hundred search requests) and
+   hashes, per program, its identity fields and its values for that year
+   only, so newer years' changes do not mark past-year data as changed,
+2. compares the hashes with the manifest of the previous run for that year,
+3. fetches atlas details only for new and changed YÖP codes (and for codes
+   whose stored payload was evicted) and writes them to the shared store,
+4. extends the store expiry of unchanged payloads without re-fetching them;
+   for past years this includes programs no longer listed, whose data cannot
+   change any more,
+5. rewrites the offline index file and the manifest.
+
+Programs that closed before the first sync of a past year are not listed and
+cannot be discovered. The year defaults to the newest year in the harvest.
+
+Atlas fetches go through the server's rate limiter, circuit breaker and
+retries (YOKATLAS_MCP_RATE_LIMIT etc.), and payloads are stored under the same
+keys the server reads. Run it nightly, e.g. from cron:
+
+    yokatlas-mcp-sync --index-dir ./index
+
+with the server's YOKATLAS_MCP_CACHE_BACKEND / STORE_PATH / REDIS_URL settings.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Optional
+
+from yokatlas_index import NO_DATA_VALUES, YEARLY_FIELDS, ProgramIndex, data_year, harvest_programs
+
+__all__ = ["record_hash", "diff_records", "load_manifest", "save_manifest", "sync_programs", "main"]
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FORMAT_VERSION = 2
+
+# Fields that identify a program; hashed together with one year's values
+_IDENTITY_FIELDS = ("yop_kodu", "uni_adi", "fakulte", "program_adi", "program_detay", "sehir_adi",
+                    "universite_turu", "ucret_burs", "ogretim_turu", "puan_turu")
+
+# Log progress every this many atlas fetches
+_PROGRESS_INTERVAL = 100
+
+
+def year_values(record: dict, year: int) -> dict:
+    """
+    Return a search record's values for one year.
+
+    Args:
+        record: Search record with {year: value} fields
+        year: Data year
+
+    Returns:
+        {field: value} for the yearly fields that have data for the year (empty if none)
+    """
+    values = {}
+    for field in YEARLY_FIELDS:
+        value = (record.get(field) or {}).get(str(year))
+        if value is not None and str(value).strip() not in NO_DATA_VALUES:
+            values[field] = value
+    return values
+
+
+def record_hash(record: dict, year: int) -> str:
+    """
+    Hash the part of a search record that describes one year.
+
+    Args:
+        record: Search record (tagged with 'puan_turu' by the harvest)
+        year: Data year whose values are hashed
+
+    Returns:
+        Hex digest of the identity fields and the year's values
+    """
+    identity = {field: record.get(field) for field in _IDENTITY_FIELDS}
+    canonical = json.dumps([identity, year_values(record, year)], sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def diff_records(previous: dict[str, str], current: dict[str, str]) -> dict[str, list[str]]:
+    """
+    Compare two {YÖP code: record hash} mappings.
+
+    Args:
+        previous: Hashes recorded by the last sync
+        current: Hashes of the records just harvested
+
+    Returns:
+        Dictionary with 'new', 'changed', 'unchanged' and 'removed' YÖP code lists
+    """
+    return {
+        "new": [code for code in current if code not in previous],
+        "changed": [code for code, digest in current.items() if code in previous and previous[code] != digest],
+        "unchanged": [code for code, digest in current.items() if previous.get(code) == digest],
+        "removed": [code for code in previous if code not in current],
+    }
+
+
+def _manifest_path(directory: str, program_type: str, year: int) -> str:
+    # Not matched by ProgramIndex.load_latest's '<program_type>_*.json.gz' pattern
+    return os.path.join(directory, f"{program_type}_{year}.sync.json")
+
+
+def load_manifest(directory: str, program_type: str, year: int) -> dict[str, str]:
+    """
+    Load the record hashes of the last sync, if there was one.
+
+    Args:
+        directory: Index directory
+        program_type: 'bachelor' or 'associate_degree'
+        year: Data year
+
+    Returns:
+        {YÖP code: record hash}; empty if there is no (readable) manifest
+    """
+    path = _manifest_path(directory, program_type, year)
+    try:
+        with open(path, encoding="utf-8") as f:
+            document = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable sync manifest {path}: {e}")
+        return {}
+    if document.get("version") != MANIFEST_FORMAT_VERSION:
+        logger.warning(f"Ignoring sync manifest {path} with format version {document.get('version')}")
+        return {}
+    return document["hashes"]
+
+
+def save_manifest(directory: str, program_type: str, year: int, hashes: dict[str, str]) -> str:
+    """
+    Write the record hashes of the programs whose atlas details are in the store.
+
+    Args:
+        directory: Index directory (created if missing)
+        program_type: 'bachelor' or 'associate_degree'
+        year: Data year
+        hashes: {YÖP code: record hash}
+
+    Returns:
+        Path of the written file
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = _manifest_path(directory, program_type, year)
+    document = {
+        "version": MANIFEST_FORMAT_VERSION,
+        "program_type": program_type,
+        "year": year,
+        "synced_at": time.time(),
+        "hashes": hashes,
+    }
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(document, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+    return path
+
+
+async def sync_programs(
+    program_type: str,
+    index_dir: str,
+    year: Optional[int] = None,
+    concurrency: int = 4,
+    ttl: float = 48 * 3600,
+    dry_run: bool = False
+) -> dict:
+    """
+    Sync one program type's index and atlas details for a year.
+
+    Args:
+        program_type: 'bachelor' or 'associate_degree'
+        index_dir: Directory of the offline index files and sync manifests
+        year: Data year; must have values in the current listing (default: the newest)
+        concurrency: Atlas details fetched at once
+        ttl: Minimum seconds synced payloads stay fresh in the store; should
+            exceed the interval between sync runs
+        dry_run: Only harvest and report what would be fetched
+
+    Returns:
+        Summary with the program counts per change kind and the fetch results
+
+    Raises:
+        ValueError: If no shared store is configured or the listing has no data for the year
+    """
+    # The server module provides the guarded upstream access and the store
+    import yokatlas_mcp_server as server
+
+    if not server.has_shared_store() and not dry_run:
+        raise ValueError(
+            "Sync needs a shared store; set YOKATLAS_MCP_CACHE_BACKEND=sqlite (or STORE_PATH) or redis"
+        )
+
+    started = time.monotonic()
+    records = await asyncio.to_thread(harvest_programs, server.search_function(program_type), program_type)
+    newest = data_year(records)
+    if newest is None:
+        raise ValueError(f"Harvested {program_type} records have no yearly data")
+    year = year or newest
+    current = {record["yop_kodu"]: record_hash(record, year) for record in records if year_values(record, year)}
+    if not current:
+        raise ValueError(f"The current {program_type} listing has no data for {year} (newest year: {newest})")
+    previous = load_manifest(index_dir, program_type, year)
+    changes = diff_records(previous, current)
+    summary: dict[str, Any] = {
+        "program_type": program_type,
+        "year": year,
+        "programs": len(current),
+        **{kind: len(codes) for kind, codes in changes.items()},
+    }
+    logger.info(
+        f"{program_type} {year}: {len(current)} programs, {len(changes['new'])} new, "
+        f"{len(changes['changed'])} changed, {len(changes['removed'])} removed"
+    )
+    if dry_run:
+        return summary
+
+    synced = {}
+    to_fetch = changes["new"] + changes["changed"]
+
+    # Unchanged payloads only need a longer expiry; evicted ones are fetched again
+    for code in changes["unchanged"]:
+        if await server.touch_atlas_payload(program_type, code, year, ttl):
+            synced[code] = current[code]
+        else:
+            to_fetch.append(code)
+    summary["touched"] = len(synced)
+    summary["evicted"] = len(to_fetch) - len(changes["new"]) - len(changes["changed"])
+
+    # A past year's data of programs no longer listed cannot change; keep it while it is stored
+    kept = 0
+    if year < newest:
+        for code in changes["removed"]:
+            if await server.touch_atlas_payload(program_type, code, year, ttl):
+                synced[code] = previous[code]
+                kept += 1
+    summary["kept_unlisted"] = kept
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    failures: dict[str, str] = {}
+    done = 0
+
+    async def fetch(code: str) -> None:
+        nonlocal done
+        async with semaphore:
+            result = await server.load_atlas_for_sync(program_type, code, year)
+        done += 1
+        if done % _PROGRESS_INTERVAL == 0:
+            logger.info(f"Fetched {done}/{len(to_fetch)} {program_type} atlas details")
+
+        if not await server.store_atlas_payload(program_type, code, year, result, ttl):
+            failures[code] = (result.get("details") or result.get("error")) if isinstance(result, dict) else None
+            failures[code] = failures[code] or "all sections failed"
+            return
+        # Payloads with failed sections are stored but fetched again next run
+        if not server.atlas_payload_complete(result):
+            failures[code] = "some sections failed"
+        else:
+            synced[code] = current[code]
+
+    try:
+        await asyncio.gather(*(fetch(code) for code in to_fetch))
+    finally:
+        # Keep the progress of an interrupted run
+        save_manifest(index_dir, program_type, year, synced)
+
+    # The index always holds the current listing, named after its newest year
+    index = ProgramIndex(program_type, newest, time.time(), records)
+    summary.update({
+        "fetched": len(to_fetch) - len(failures),
+        "failed": len(failures),
+        "failures": dict(list(failures.items())[:20]),
+        "index_path": index.save(index_dir),
+        "seconds": round(time.monotonic() - started, 1),
+    })
+    return summary
+
+
+async def _sync(program_types: list[str], args: argparse.Namespace) -> list[dict]:
+    import yokatlas_mcp_server as server
+
+    try:
+        return [
+            await sync_programs(program_type, args.index_dir, args.year, args.concurrency, args.ttl_hours * 3600, args.dry_run)
+            for program_type in program_types
+        ]
+    finally:
+        await server.close_upstream()
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    """Command line entry point for the delta sync."""
+    parser = argparse.ArgumentParser(description="Incrementally sync the YOKATLAS index and atlas details of a year.")
+    parser.add_argument("--index-dir", required=True, help="Directory of the index files and sync manifests")
+    parser.add_argument(
+        "--year", type=int,
+        help="Data year to sync; one of the years in the current listing (default: the newest)"
+    )
+    parser.add_argument(
+        "--program-type",
+        choices=["bachelor", "associate_degree", "all"],
+        default="all",
+        help="Which program list to sync"
+    )
+    parser.add_argument("--concurrency", type=int, default=4, help="Atlas details fetched at once")
+    parser.add_argument(
+        "--ttl-hours", type=float, default=48,
+        help="Keep synced payloads fresh in the store at least this long (longer than the sync interval)"
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Only report new/changed/removed programs")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    program_types = ["bachelor", "associate_degree"] if args.program_type == "all" else [args.program_type]
+    try:
+        summaries = asyncio.run(_sync(program_types, args))
+    except (ValueError, ConnectionError) as e:
+        raise SystemExit(f"Sync failed: {e}")
+
+    print(json.dumps(summaries, ensure_ascii=False, indent=2))
+    if any(summary.get("failed") for summary in summaries):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
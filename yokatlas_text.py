@@ -0,0 +1,43 @@
+"""
+YOKATLAS MCP Server - Turkish text normalization
+
+Helpers for comparing user input with YOKATLAS names regardless of casing and
+Turkish diacritics ("boğaziçi", "BOĞAZİÇİ" and "BOGAZICI" all fold to the
+same string).
+"""
+
+import re
+import unicodedata
+
+__all__ = ["fold_turkish"]
+
+# Python's str.lower() maps 'I' to 'i' and 'İ' to 'i̇' (with a combining dot),
+# so Turkish letters are folded explicitly before lowercasing.
+_TURKISH_FOLD = str.maketrans({
+    "İ": "i", "I": "i", "ı": "i",
+    "Ş": "s", "ş": "s",
+    "Ğ": "g", "ğ": "g",
+    "Ü": "u", "ü": "u",
+    "Ö": "o", "ö": "o",
+    "Ç": "c", "ç": "c",
+    "Â": "a", "â": "a",
+    "Î": "i", "î": "i",
+    "Û": "u", "û": "u",
+})
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def fold_turkish(text: str) -> str:
+    """
+    Fold text to a lowercase ASCII-ish form for case/accent-insensitive matching.
+
+    Args:
+        text: Input text
+
+    Returns:
+        Folded text with collapsed whitespace
+    """
+    text = unicodedata.normalize("NFC", text).translate(_TURKISH_FOLD).lower()
+    text = "".join(ch for ch in unicodedata.normalize("NFKD", text) if not unicodedata.combining(ch))
+    return _WHITESPACE.sub(" ", text).strip()
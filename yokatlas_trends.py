@@ -0,0 +1,135 @@
+"""
+YOKATLAS MCP Server - Yearly metric extraction
+
+Atlas detail payloads are nested, label-keyed tables scraped from YOKATLAS
+pages. The helpers here pull the handful of numbers most questions are about
+(quota, placed students, last-placed base score and success rank) out of a
+payload and arrange several years of them as a compact time series.
+"""
+
+from typing import Any, Optional
+
+__all__ = ["extract_year_metrics", "extract_program_info", "build_trend", "parse_tr_decimal", "parse_tr_int", "TREND_METRICS"]
+
+TREND_METRICS = ("quota", "placed", "base_score", "success_rank")
+
+# Row label used by YOKATLAS for the general (non-special) quota
+_GENERAL_QUOTA = "Genel Kontenjan"
+# Column holding the last placed student's score / rank (0.12 OBP coefficient)
+_VALUE_COLUMN = "0,12 Katsayı ile"
+
+
+def parse_tr_decimal(value: Any) -> Optional[float]:
+    """Parse a Turkish-formatted decimal ('452,12345' or '1.234,5'); None if not a number."""
+    if value is None:
+        return None
+    text = str(value).strip()
+    if "," in text:
+        text = text.replace(".", "").replace(",", ".")
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def parse_tr_int(value: Any) -> Optional[int]:
+    """Parse a Turkish-formatted integer ('12.345' or '85+3' -> 85); None if not a number."""
+    if value is None:
+        return None
+    text = str(value).strip().split("+")[0].replace(".", "").replace(",", "")
+    try:
+        return int(text)
+    except ValueError:
+        return None
+
+
+def _general_row(rows: Any) -> Optional[dict]:
+    """Pick the general-quota row from a taban puan table (or its first row)."""
+    if not isinstance(rows, list) or not rows:
+        return None
+    for row in rows:
+        if isinstance(row, dict) and row.get("Kontenjan Türü") == _GENERAL_QUOTA:
+            return row
+    return rows[0] if isinstance(rows[0], dict) else None
+
+
+def extract_year_metrics(details: dict) -> dict:
+    """
+    Extract quota, placed count, base score and success rank from an atlas payload.
+
+    Args:
+        details: Payload returned by fetch_all_details()
+
+    Returns:
+        Dictionary with the TREND_METRICS keys; missing values are None
+    """
+    metrics: dict[str, Any] = dict.fromkeys(TREND_METRICS)
+
+    sections = details.get("girdi_gostergeleri") if isinstance(details, dict) else None
+    stats = sections.get("taban_puan_ve_basari_sirasi_istatistikleri") if isinstance(sections, dict) else None
+    if not isinstance(stats, dict) or "error" in stats:
+        return metrics
+
+    score_row = _general_row(stats.get("son_kisi_puan_bilgileri"))
+    rank_row = _general_row(stats.get("son_kisi_basari_sirasi_bilgileri"))
+
+    if score_row:
+        metrics["quota"] = parse_tr_int(score_row.get("Kontenjan"))
+        metrics["placed"] = parse_tr_int(score_row.get("Yerleşen Sayısı"))
+        metrics["base_score"] = parse_tr_decimal(score_row.get(_VALUE_COLUMN))
+    if rank_row:
+        metrics["success_rank"] = parse_tr_int(rank_row.get(_VALUE_COLUMN))
+        if metrics["quota"] is None:
+            metrics["quota"] = parse_tr_int(rank_row.get("Kontenjan"))
+        if metrics["placed"] is None:
+            metrics["placed"] = parse_tr_int(rank_row.get("Yerleşen Sayısı"))
+
+    return metrics
+
+
+def extract_program_info(details: dict) -> dict:
+    """
+    Extract university, program name and score type from an atlas payload's general information.
+
+    Args:
+        details: Payload returned by fetch_all_details() (needs the genel_bilgiler section)
+
+    Returns:
+        Dictionary with 'university', 'program' and 'score_type' (upper case,
+        e.g. 'SAY'); missing values are None
+    """
+    sections = details.get("girdi_gostergeleri") if isinstance(details, dict) else None
+    general = sections.get("genel_bilgiler") if isinstance(sections, dict) else None
+    info = general.get("program_info") if isinstance(general, dict) else None
+    if not isinstance(info, dict):
+        info = {}
+
+    score_type = info.get("Puan Türü")
+    return {
+        "university": info.get("Üniversite"),
+        "program": info.get("Program"),
+        "score_type": score_type.strip().upper() if isinstance(score_type, str) and score_type.strip() else None,
+    }
+
+
+def build_trend(points: dict[int, dict]) -> dict:
+    """
+    Arrange per-year metrics as parallel arrays.
+
+    Args:
+        points: Mapping of year -> metrics from extract_year_metrics()
+
+    Returns:
+        Dictionary with a 'years' list and one list per metric (same order),
+        plus first-to-last changes for base score and success rank
+    """
+    years = sorted(points)
+    trend: dict[str, Any] = {"years": years}
+    for metric in TREND_METRICS:
+        trend[metric] = [points[year].get(metric) for year in years]
+
+    for metric in ("base_score", "success_rank"):
+        values = [v for v in trend[metric] if v is not None]
+        trend[f"{metric}_change"] = round(values[-1] - values[0], 5) if len(values) >= 2 else None
+
+    return trend